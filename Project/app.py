@@ -1,16 +1,18 @@
-from flask import Flask, render_template, jsonify, request
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, render_template, jsonify, request, g, has_request_context, make_response
 import os
 from dotenv import load_dotenv
 import requests
-from datetime import datetime, timezone
-import pickle
+from datetime import datetime, timedelta
 import numpy as np
 import json
-import pandas as pd
 import logging
 from flask_caching import Cache
-import gzip
-from functools import lru_cache
+import hashlib
+import sys
+from functools import wraps
 
 # Configure logging for development
 logging.basicConfig(
@@ -25,56 +27,115 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-# Load the machine learning model
+# Make the Project package importable when running app.py directly.
+# Imported after load_dotenv so the modules see settings from .env.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.inference import compile_model
+from Project.forecast import ForecastStore
+from Project.snapshot import StationSnapshot
+from Project.upstream import client as http_client
+from Project.singleflight import SingleFlight
+from Project.swr import SWRCache
+from Project.memoize import ttl_cache, LocalBackend, CachelibBackend, all_stats as memo_stats
+from Project.history import HistoryIndex, BAND_NAMES, WEEKDAYS, WEEKEND
+from Project.columnar import ColumnarDataset, CSV_DTYPES
+from Project.cachestore import CacheEntries
+from Project.payload import EncodedPayload, PayloadCache
+from Project.changes import ChangeLog
+from Project.stream import Broadcaster, AvailabilityPoller, format_event
+from Project.grid import PredictionGrid, GridMiss
+from Project import resources
+
+# The model and the historical data are loaded on first use, or up front by
+# warmup(), so importing the app stays cheap
 model_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'bike_availability_model.pkl')
-try:
-    if not os.path.exists(model_path):
-        raise Exception("Model file not found")
-    with open(model_path, 'rb') as f:
-        model = pickle.load(f)
+
+def load_model():
+    """Unpickle the machine learning model, None if it cannot be loaded"""
+    # Unpickling imports sklearn, which is most of the load time
+    import pickle
+    try:
+        if not os.path.exists(model_path):
+            raise Exception("Model file not found")
+        with open(model_path, 'rb') as f:
+            loaded = pickle.load(f)
+        if loaded is None:
+            raise Exception("Model loaded but is None")
+        return loaded
+    except Exception as e:
+        logger.error(f"Error loading model: {str(e)}")
+        return None
+
+model_resource = resources.lazy('model', load_model)
+model = None
+
+def get_model():
+    """The model, loading it on first use"""
+    global model
     if model is None:
-        raise Exception("Model loaded but is None")
-except Exception as e:
-    logger.error(f"Error loading model: {str(e)}")
-    model = None
+        model = model_resource.get()
+    return model
 
-# Load historical data
+# Historical data. The columnar build of the dataset (see
+# scripts/build_columnar.py) is memory-mapped when present, otherwise the CSV
+# is parsed as before.
 data_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'final_data_for_ml.csv')
-try:
-    if not os.path.exists(data_path):
-        raise Exception("Historical data file not found")
-    
-    # Read CSV with explicit data types
-    historical_data = pd.read_csv(data_path, dtype={
-        'station_id': float,
-        'temperature': float,
-        'humidity': float,
-        'pressure': float,
-        'hour': int,
-        'day_of_week': int,
-        'num_bikes_available': int
-    })
-    
-    if historical_data is None or historical_data.empty:
-        raise Exception("Historical data loaded but is empty")
-    
-    # Verify required columns exist
-    required_columns = ['station_id', 'hour', 'num_bikes_available']
-    missing_columns = [col for col in required_columns if col not in historical_data.columns]
-    if missing_columns:
-        raise Exception(f"Missing required columns: {missing_columns}")
-    
-    # Log sample of data for debugging
-    logger.info("Sample of loaded historical data:")
-    logger.info(historical_data.head().to_string())
-    logger.info(f"Total records: {len(historical_data)}")
-    logger.info(f"Unique stations: {historical_data['station_id'].nunique()}")
-    logger.info(f"Value ranges:")
-    logger.info(f"num_bikes_available: {historical_data['num_bikes_available'].min()} to {historical_data['num_bikes_available'].max()}")
-    
-except Exception as e:
-    logger.error(f"Error loading historical data: {str(e)}")
-    historical_data = None
+columnar_path = os.environ.get(
+    'HISTORY_COLUMNAR_PATH',
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'final_data_for_ml')
+)
+
+def load_historical_data():
+    """Load the historical data, None if it cannot be loaded"""
+    try:
+        if ColumnarDataset.exists(columnar_path):
+            data = ColumnarDataset(columnar_path)
+            logger.info(f"Memory-mapped columnar historical data from {columnar_path} ({data.nbytes} bytes)")
+        elif os.path.exists(data_path):
+            import pandas as pd
+            # Read CSV with explicit data types
+            data = pd.read_csv(data_path, dtype=CSV_DTYPES)
+        else:
+            raise Exception("Historical data file not found")
+
+        if len(data) == 0:
+            raise Exception("Historical data loaded but is empty")
+
+        # Verify required columns exist
+        required_columns = ['station_id', 'hour', 'num_bikes_available']
+        missing_columns = [col for col in required_columns if col not in data]
+        if missing_columns:
+            raise Exception(f"Missing required columns: {missing_columns}")
+
+        bikes = np.asarray(data['num_bikes_available'])
+        logger.info(f"Total records: {len(data)}")
+        logger.info(f"Unique stations: {len(np.unique(np.asarray(data['station_id'])))}")
+        logger.info(f"num_bikes_available: {bikes.min()} to {bikes.max()}")
+        return data
+
+    except Exception as e:
+        logger.error(f"Error loading historical data: {str(e)}")
+        return None
+
+def load_history():
+    """
+    Load the historical data together with its index of hourly history per
+    station, weekday and temperature band, computed once so history requests
+    are a slice of a precomputed cube
+    """
+    data = load_historical_data()
+    return data, HistoryIndex.from_frame(data) if data is not None else None
+
+history_resource = resources.lazy('history', load_history)
+historical_data = None
+history_index = None
+
+def get_history_index():
+    """The history index, loading the historical data on first use"""
+    global historical_data, history_index
+    if history_index is None:
+        historical_data, history_index = history_resource.get()
+    return history_index
 
 # Create Flask app
 app = Flask(__name__)
@@ -112,106 +173,330 @@ app.config['DB_PORT'] = os.environ.get('DB_PORT', '3306')
 app.config['DB_NAME'] = os.environ.get('DB_NAME')
 app.config['DB_HOST'] = os.environ.get('DB_HOST', '127.0.0.1')
 
-# Configure cache
+# Report how old the station snapshot behind a response was
+@app.after_request
+def add_snapshot_age_header(response):
+    if 'snapshot_age' in g and g.snapshot_age is not None:
+        response.headers['X-Snapshot-Age'] = f"{g.snapshot_age:.1f}"
+    return response
+
+# Configure cache. CACHE_BACKEND picks where cached payloads live (see
+# cachestore.make_store); anything but 'simple' is shared between workers.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'simple')
 cache = Cache(app, config={
-    'CACHE_TYPE': 'simple',
+    'CACHE_TYPE': 'Project.cachestore.ByteCache',
+    'CACHE_BACKEND': CACHE_BACKEND,
+    'CACHE_DIR': os.environ.get('CACHE_DIR'),
+    'CACHE_REDIS_URL': os.environ.get('CACHE_REDIS_URL'),
     'CACHE_DEFAULT_TIMEOUT': 300
 })
 
+def shared_entries(prefix, timeout):
+    """Store for an SWRCache's entries: the process by default, the app cache if it is shared"""
+    if CACHE_BACKEND == 'simple':
+        return None
+    return CacheEntries(cache.cache, prefix, timeout)
+
+# Concurrent cache misses for the same key share one upstream fetch
+single_flight = SingleFlight(lock_dir=os.environ.get('SINGLEFLIGHT_LOCK_DIR'))
+
+def coalesced_cache(timeout):
+    """
+    Cache a view's response by path and query string like cache.cached, but let
+    concurrent misses wait for one computation instead of all going upstream.
+    Cached responses get an ETag and are served gzipped to clients that accept it.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = f"view/{request.full_path}"
+
+            def compute():
+                rv = make_response(f(*args, **kwargs))
+                # Encoded and compressed once, then served from the cache
+                entry = (EncodedPayload(rv.get_data(), rv.mimetype), rv.status_code)
+                if rv.status_code == 200:
+                    cache.set(key, entry, timeout=timeout)
+                return entry
+
+            entry = cache.get(key) or single_flight.do(key, compute, check=lambda: cache.get(key))
+            payload, status = entry
+            return payload.respond(request, app.response_class, status)
+        return wrapper
+    return decorator
+
+def memo_backend(maxsize):
+    """
+    In-process LRU, or the app cache with MEMO_BACKEND=shared. Defaults to
+    shared whenever the app cache is.
+    """
+    default = 'local' if CACHE_BACKEND == 'simple' else 'shared'
+    if os.environ.get('MEMO_BACKEND', default) == 'shared':
+        return CachelibBackend(cache)
+    return LocalBackend(maxsize)
+
 # Cache for weather data
-@lru_cache(maxsize=100)
+@ttl_cache(ttl=300, backend=memo_backend(100))
 def get_cached_weather(lat, lng):
     return fetch_weather_data(lat, lng)
 
-# Cache for station data
-@lru_cache(maxsize=100)
+# Cache for station data, short-lived so availability stays live
+@ttl_cache(ttl=60, backend=memo_backend(200))
 def get_cached_station(station_id):
     return fetch_station_data(station_id)
 
-# Compress response data
-def compress_response(data):
-    return gzip.compress(jsonify(data).data)
-
 # Home page route
 @app.route('/')
 def index():
     return render_template('index.html', google_maps_api_key=app.config['GOOGLE_MAPS_API_KEY'])
 
+def download_stations():
+    """Fetch every station in the contract from JCDecaux in one call"""
+    api_key = os.environ.get('JCDECAUX_API_KEY')
+    contract = os.environ.get('JCDECAUX_CONTRACT', "dublin")
+    # Overridable so the station feeds can be run against a local stub
+    base_url = os.environ.get('JCDECAUX_STATIONS_URL', "https://api.jcdecaux.com/vls/v1/stations")
+    url = f"{base_url}?contract={contract}&apiKey={api_key}"
+    
+    response = http_client.get(url)
+    response.raise_for_status()
+    return response.json()
+
+# All stations, refreshed by one bulk call and shared by every station route
+station_snapshot = StationSnapshot(
+    lambda: download_stations(),
+    max_age=int(os.environ.get('STATION_SNAPSHOT_MAX_AGE', 60)),
+    max_stale=int(os.environ.get('STATION_SNAPSHOT_MAX_STALE', 600)),
+    flight=single_flight,
+    entries=shared_entries('swr/stations', int(os.environ.get('STATION_SNAPSHOT_MAX_STALE', 600)))
+)
+
+def get_snapshot_station(station_id):
+    """Look up a station in the snapshot and remember the snapshot age for the response"""
+    station = station_snapshot.get(station_id)
+    if has_request_context():
+        g.snapshot_age = station_snapshot.age()
+    return station
+
+def transform_stations(stations):
+    """Static station details with validated coordinates, as served by /stations"""
+    # Transform the stations to use the new position structure
+    transformed_stations = []
+    for station in stations:
+        try:
+            # Handle different possible position formats
+            position = station.get('position', {})
+            lat = position.get('lat')
+            lng = position.get('lng')
+            
+            # Log the raw position data
+            logger.debug(f"Raw position data for station {station.get('number')}: {json.dumps(position)}")
+            
+            # If lat/lng are not in the expected format, try alternative keys
+            if lat is None or lng is None:
+                lat = position.get('latitude')
+                lng = position.get('longitude')
+                logger.debug(f"Trying alternative keys for station {station.get('number')}: lat={lat}, lng={lng}")
+            
+            # Ensure we have valid coordinates
+            if lat is None or lng is None:
+                logger.error(f"Missing coordinates for station {station.get('number')}")
+                continue
+            
+            # Convert to float and validate
+            try:
+                lat = float(lat)
+                lng = float(lng)
+                logger.debug(f"Converted coordinates for station {station.get('number')}: lat={lat}, lng={lng}")
+            except (ValueError, TypeError):
+                logger.error(f"Invalid coordinate format for station {station.get('number')}: lat={lat}, lng={lng}")
+                continue
+            
+            transformed_station = {
+                'number': station['number'],
+                'name': station['name'],
+                'address': station['address'],
+                'position': {
+                    'lat': lat,
+                    'lng': lng
+                },
+                'banking': station['banking'],
+                'bonus': station['bonus'],
+                'status': station['status'],
+                'bike_stands': station['bike_stands']
+            }
+            transformed_stations.append(transformed_station)
+            
+        except Exception as e:
+            logger.error(f"Error processing station {station.get('number')}: {str(e)}")
+            continue
+        
+    # Log the transformed data for debugging
+    logger.debug(f"Transformed stations data: {json.dumps(transformed_stations[:1])}")  # Log first station only
+    return transformed_stations
+
+# Encoded once per snapshot and served as is until the snapshot changes
+payload_cache = PayloadCache()
+
 # API route to get all stations
 @app.route('/stations')
-@cache.cached(timeout=300)
 def get_stations():
     try:
-        api_key = os.environ.get('JCDECAUX_API_KEY')
-        contract = "dublin"
-        url = f"https://api.jcdecaux.com/vls/v1/stations?contract={contract}&apiKey={api_key}"
-        
-        response = requests.get(url)
-        response.raise_for_status()
-        stations = response.json()
-        
+        stations, fetched_at = station_snapshot.snapshot()
+        g.snapshot_age = time.time() - fetched_at
+
         # Log the raw response for debugging
         logger.debug(f"Raw stations data: {json.dumps(stations[:1])}")  # Log first station only
-        
-        # Transform the stations to use the new position structure
-        transformed_stations = []
-        for station in stations:
-            try:
-                # Handle different possible position formats
-                position = station.get('position', {})
-                lat = position.get('lat')
-                lng = position.get('lng')
-                
-                # Log the raw position data
-                logger.debug(f"Raw position data for station {station.get('number')}: {json.dumps(position)}")
-                
-                # If lat/lng are not in the expected format, try alternative keys
-                if lat is None or lng is None:
-                    lat = position.get('latitude')
-                    lng = position.get('longitude')
-                    logger.debug(f"Trying alternative keys for station {station.get('number')}: lat={lat}, lng={lng}")
-                
-                # Ensure we have valid coordinates
-                if lat is None or lng is None:
-                    logger.error(f"Missing coordinates for station {station.get('number')}")
-                    continue
-                
-                # Convert to float and validate
-                try:
-                    lat = float(lat)
-                    lng = float(lng)
-                    logger.debug(f"Converted coordinates for station {station.get('number')}: lat={lat}, lng={lng}")
-                except (ValueError, TypeError):
-                    logger.error(f"Invalid coordinate format for station {station.get('number')}: lat={lat}, lng={lng}")
-                    continue
-                
-                transformed_station = {
-                    'number': station['number'],
-                    'name': station['name'],
-                    'address': station['address'],
-                    'position': {
-                        'lat': lat,
-                        'lng': lng
-                    },
-                    'banking': station['banking'],
-                    'bonus': station['bonus'],
-                    'status': station['status'],
-                    'bike_stands': station['bike_stands']
-                }
-                transformed_stations.append(transformed_station)
-                
-            except Exception as e:
-                logger.error(f"Error processing station {station.get('number')}: {str(e)}")
-                continue
-            
-        # Log the transformed data for debugging
-        logger.debug(f"Transformed stations data: {json.dumps(transformed_stations[:1])}")  # Log first station only
-        
-        return jsonify({'stations': transformed_stations})
+
+        # The fetch time is left out of the body (X-Snapshot-Age has the
+        # age) so a refresh with unchanged stations keeps the same ETag
+        payload = payload_cache.get('stations', fetched_at, lambda: {
+            'stations': transform_stations(stations)
+        })
+        return payload.respond(request, app.response_class)
     except Exception as e:
         logger.error(f"Error fetching stations: {str(e)}")
         return jsonify({'error': 'Failed to fetch stations'}), 500
     
+# Fields /api/stations/live can return, in response order
+LIVE_FIELDS = (
+    'number', 'name', 'address', 'position', 'banking', 'bonus', 'status',
+    'bike_stands', 'available_bikes', 'available_bike_stands', 'last_update'
+)
+
+def parse_live_fields(value):
+    """
+    Turn a comma separated ?fields= value into the fields to return, in
+    LIVE_FIELDS order. number is always included. Raises ValueError for
+    unknown fields.
+    """
+    if not value:
+        return LIVE_FIELDS
+    requested = {field.strip() for field in value.split(',') if field.strip()}
+    unknown = sorted(requested - set(LIVE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from {', '.join(LIVE_FIELDS)}")
+    return tuple(field for field in LIVE_FIELDS if field == 'number' or field in requested)
+
+def live_stations(stations, fields):
+    """Station details and live availability together, projected to fields"""
+    raw = {station['number']: station for station in stations}
+    rows = []
+    for station in transform_stations(stations):
+        source = raw[station['number']]
+        station['available_bikes'] = source.get('available_bikes')
+        station['available_bike_stands'] = source.get('available_bike_stands')
+        station['last_update'] = source.get('last_update')
+        rows.append({field: station[field] for field in fields})
+    return rows
+
+# Every station with its live availability, from the same bulk snapshot as /stations
+@app.route('/api/stations/live')
+def get_live_stations():
+    try:
+        try:
+            fields = parse_live_fields(request.args.get('fields'))
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+
+        stations, fetched_at = station_snapshot.snapshot()
+        g.snapshot_age = time.time() - fetched_at
+
+        # One encoded payload per snapshot and field selection
+        payload = payload_cache.get(f"live:{','.join(fields)}", fetched_at, lambda: {
+            'stations': live_stations(stations, fields)
+        })
+        return payload.respond(request, app.response_class)
+    except Exception as e:
+        logger.error(f"Error fetching live stations: {str(e)}")
+        return jsonify({'error': 'Failed to fetch stations'}), 500
+
+# Versioned availability and a short log of what changed in each version
+station_changes = ChangeLog(maxlen=int(os.environ.get('STATION_CHANGELOG_SIZE', 100)))
+
+def sync_station_changes():
+    """Fold the current station snapshot into the change log"""
+    stations, fetched_at = station_snapshot.snapshot()
+    if fetched_at is not None:
+        station_changes.update(int(fetched_at * 1000), stations)
+
+def poll_station_changes():
+    """Fetch the stations now and return what changed since the last poll, or None"""
+    previous = station_changes.version
+    station_snapshot.refresh(force=True)
+    sync_station_changes()
+    if station_changes.version == previous:
+        return None
+    return station_changes.since(previous)
+
+# Only the stations whose availability changed since a version the client has seen
+@app.route('/stations/changes')
+def get_station_changes():
+    try:
+        since = request.args.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return jsonify({'error': 'since must be a version number'}), 400
+
+        sync_station_changes()
+        g.snapshot_age = station_snapshot.age()
+        return jsonify(station_changes.since(since))
+    except Exception as e:
+        logger.error(f"Error fetching station changes: {str(e)}")
+        return jsonify({'error': 'Failed to fetch station changes'}), 500
+
+# Live availability pushed to every connected client from one background poller
+availability_broadcaster = Broadcaster(queue_size=int(os.environ.get('STREAM_QUEUE_SIZE', 100)))
+availability_poller = AvailabilityPoller(
+    poll_station_changes,
+    availability_broadcaster,
+    interval=int(os.environ.get('STREAM_POLL_INTERVAL', 30))
+)
+STREAM_KEEPALIVE = 15
+
+def changes_event(changes):
+    return format_event('reset' if changes['reset'] else 'changes', changes, changes['version'])
+
+@app.route('/stream/availability')
+def stream_availability():
+    """
+    Server-Sent Events stream of station availability. The first event is
+    every station (or the changes since Last-Event-ID when reconnecting),
+    after that only the stations that changed.
+    """
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        since = None
+
+    subscriber = availability_broadcaster.subscribe()
+    availability_poller.start()
+    try:
+        sync_station_changes()
+        initial = station_changes.since(since)
+    except Exception as e:
+        logger.error(f"Error starting availability stream: {str(e)}")
+        initial = None
+
+    def generate():
+        try:
+            if initial is not None:
+                yield changes_event(initial)
+            while not subscriber.dropped:
+                changes = subscriber.get(STREAM_KEEPALIVE)
+                # A comment line keeps the connection open and notices when the client has gone
+                yield changes_event(changes) if changes is not None else ': keepalive\n\n'
+        finally:
+            availability_broadcaster.unsubscribe(subscriber)
+
+    return app.response_class(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # API route to get availability for a specific station
 @app.route("/available/<int:station_id>")
 def get_station_availability(station_id):
@@ -223,12 +508,35 @@ def get_station_availability(station_id):
         return jsonify({
             'available_bikes': station_data['available_bikes'],
             'available_bike_stands': station_data['available_bike_stands'],
-            'last_update': station_data['last_update']
+            'last_update': station_data['last_update'],
+            'snapshot_age': g.snapshot_age
         })
     except Exception as e:
         logger.error(f"Error getting station availability: {str(e)}")
         return jsonify({'error': 'Failed to get station availability'}), 500
 
+def download_current_weather(api_key):
+    url = (
+        "https://api.openweathermap.org/data/2.5/weather?"
+        "lat=53.3498&lon=-6.2603&"
+        f"appid={api_key}&"
+        "units=metric&"
+        "lang=en"
+    )
+    
+    response = http_client.get(url)
+    response.raise_for_status()
+    return response.json()
+
+# Current weather is served from cache and refreshed in the background
+weather_cache = SWRCache(
+    soft_ttl=int(os.environ.get('WEATHER_SOFT_TTL', 300)),
+    hard_ttl=int(os.environ.get('WEATHER_HARD_TTL', 1800)),
+    stale_if_error=int(os.environ.get('WEATHER_STALE_IF_ERROR', 3600)),
+    flight=single_flight,
+    entries=shared_entries('swr/weather', int(os.environ.get('WEATHER_STALE_IF_ERROR', 3600)))
+)
+
 @app.route('/api/weather')
 def get_weather():
     """Get current weather data for Dublin."""
@@ -238,24 +546,9 @@ def get_weather():
             logger.error("OpenWeather API key not found")
             return jsonify({'error': 'Weather API configuration error'}), 500
 
-        url = (
-            "https://api.openweathermap.org/data/2.5/weather?"
-            "lat=53.3498&lon=-6.2603&"
-            f"appid={api_key}&"
-            "units=metric&"
-            "lang=en"
-        )
-        
-        timestamp = int(datetime.now().timestamp())
-        url = f"{url}&_={timestamp}"
-        
-        response = requests.get(url, headers={
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache'
-        })
-        response.raise_for_status()
-        
-        data = response.json()
+        # Keyed by API key so a key change is never answered from cache
+        key = f"current_weather:{hashlib.sha1(api_key.encode('utf-8')).hexdigest()[:12]}"
+        data = weather_cache.get(key, lambda: download_current_weather(api_key))
         return jsonify(data)
     except requests.exceptions.HTTPError as e:
         if e.response.status_code == 401:
@@ -273,41 +566,215 @@ def get_weather():
 
 
 ### PREDICTION
-def fetch_openweather_forecast(datetime):
+MAX_STATION_ID = 117
+MAX_PREDICTED_BIKES = 40
+MAX_BATCH_SIZE = 5000
+
+# Size of the prediction memo and how long its entries live. An entry is
+# keyed on every model input and the model version, so it never goes stale;
+# the TTL only keeps shared caches from filling up.
+PREDICTION_MEMO_SIZE = int(os.environ.get('PREDICTION_MEMO_SIZE', 8192))
+PREDICTION_MEMO_TTL = int(os.environ.get('PREDICTION_MEMO_TTL', 86400))
+
+FEATURE_COLUMNS = ['station_id', 'temperature', 'humidity', 'pressure', 'hour', 'station_hour', 'day_of_week']
+
+def download_openweather_forecast():
     # Pulling 5-day weather forecast from openweather
     api_key = os.environ.get('OPENWEATHER_API_KEY')
     url = (f"https://api.openweathermap.org/data/2.5/forecast?q=Dublin&appid={api_key}&units=metric"
         )
-    response = requests.get(url)
+    response = http_client.get(url)
     response.raise_for_status()
-    data = response.json()
+    return response.json()
+
+# Forecast is downloaded once per refresh interval and shared by all predictions
+forecast_store = ForecastStore(
+    lambda: download_openweather_forecast(),
+    refresh_interval=int(os.environ.get('FORECAST_REFRESH_SECONDS', 600)),
+    flight=single_flight
+)
 
+def fetch_openweather_forecast(datetime, interpolate=False):
+    return forecast_store.lookup(datetime, interpolate)
+
+def fetch_openweather_forecasts(datetimes, interpolate=False):
+    """Look up forecasts for many datetimes from the shared forecast store"""
+    return forecast_store.lookup_many(datetimes, interpolate)
+
+def parse_flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+def parse_prediction_time(date, time):
+    """Parse a date and time pair, raising ValueError for bad or past values"""
     try:
-        target_dt = int(datetime.replace(tzinfo=timezone.utc).timestamp())
-    except ValueError as ve:
-        logger.error(f"Date/time parsing error: {ve}")
-        return None
+        dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M:%S")
+    except (ValueError, TypeError):
+        raise ValueError("Invalid date or time format. Use YYYY-MM-DD HH:MM:SS")
+    if dt < datetime.now():
+        raise ValueError("Prediction only for future time")
+    return dt
 
-    # Find the closest forecast time
-    closest = None
-    smallest_diff = float("inf")
+def parse_station_id(station_id):
+    """Validate a station id, raising ValueError if it is out of range"""
+    try:
+        station_id = int(station_id)
+    except (ValueError, TypeError):
+        raise ValueError("station_id must be a number")
+    if station_id > MAX_STATION_ID:
+        raise ValueError(f"Invalid station_id: {station_id}")
+    return station_id
 
-    for item in data.get("list", []):
-        forecast_time = item["dt"]  # already a UNIX timestamp
-        diff = abs(forecast_time - target_dt)
-        if diff < smallest_diff:
-            smallest_diff = diff
-            closest = item
+def split_datetime(value):
+    """Split a 'YYYY-MM-DD HH:MM:SS' string into its date and time parts"""
+    parts = str(value).split(' ', 1)
+    return parts if len(parts) == 2 else (parts[0], None)
 
-    if closest:
-        return {
-            "temperature": closest["main"]["temp"],
-            "humidity": closest["main"]["humidity"],
-            "pressure": closest["main"]["pressure"],
-        }
+def build_features(rows, weather):
+    """
+    Build the model input columns for a list of (station_id, datetime) rows,
+    using the forecast looked up for each row's datetime
+    """
+    return build_feature_columns(rows, [weather[dt] for _, dt in rows])
+
+def build_feature_columns(rows, forecasts):
+    """Build the model input columns for rows given the forecast for each row"""
+    return {
+        'station_id': np.array([station_id for station_id, _ in rows]),
+        'temperature': np.array([f["temperature"] for f in forecasts], dtype=float),
+        'humidity': np.array([f["humidity"] for f in forecasts], dtype=float),
+        'pressure': np.array([f["pressure"] for f in forecasts], dtype=float),
+        'hour': np.array([dt.hour for _, dt in rows]),
+        'station_hour': [f"{str(station_id)}_{dt.hour}" for station_id, dt in rows],
+        'day_of_week': np.array([dt.weekday() for _, dt in rows]),
+    }
+
+def clamp_predictions(predictions):
+    """Round raw predictions and keep them between 0 and MAX_PREDICTED_BIKES"""
+    return np.clip(np.rint(np.asarray(predictions, dtype=float)), 0, MAX_PREDICTED_BIKES).astype(int)
+
+# Compiled inference engine, rebuilt whenever the model object changes
+inference_engine = None
+
+# Bumped each time a different model is loaded, so results from an older
+# model are never served
+model_version = 0
+
+def get_inference_engine():
+    global inference_engine, model_version
+    current = get_model()
+    if inference_engine is None or inference_engine.model is not current:
+        inference_engine = compile_model(current, FEATURE_COLUMNS)
+        model_version += 1
+        predict_inputs.invalidate_all()
+        logger.info(f"Model version {model_version} loaded")
+    return inference_engine
 
-    return None
+def current_model_version():
+    get_inference_engine()
+    return model_version
 
+def predict_features(features):
+    """
+    Score every row with one call to the inference engine. Rows the model
+    cannot score (e.g. a station it has never seen) come back as None.
+    """
+    raw = get_inference_engine().predict(features)
+    valid = ~np.isnan(raw)
+    clamped = clamp_predictions(np.where(valid, raw, 0))
+    return [int(p) if ok else None for p, ok in zip(clamped, valid)]
+
+def expand_batch_request(payload):
+    """
+    Turn a batch request body into a list of (station_id, datetime) rows.
+    Accepts either explicit items or all stations over a time range.
+    """
+    if 'items' in payload:
+        if not isinstance(payload['items'], list):
+            raise ValueError("items must be a list")
+        rows = []
+        for item in payload['items']:
+            if not isinstance(item, dict):
+                raise ValueError("Each item must be an object with station_id, date and time")
+            rows.append((parse_station_id(item.get('station_id')),
+                         parse_prediction_time(item.get('date'), item.get('time'))))
+        return rows
+
+    if 'start' in payload:
+        start = parse_prediction_time(*split_datetime(payload['start']))
+        end = parse_prediction_time(*split_datetime(payload.get('end', payload['start'])))
+        if end < start:
+            raise ValueError("end must not be before start")
+        step_minutes = int(payload.get('step_minutes', 60))
+        if step_minutes <= 0:
+            raise ValueError("step_minutes must be positive")
+
+        station_ids = payload.get('station_ids', 'all')
+        if station_ids == 'all':
+            station_ids = range(1, MAX_STATION_ID + 1)
+        elif not isinstance(station_ids, list) or not station_ids:
+            raise ValueError("station_ids must be 'all' or a non-empty list")
+        station_ids = [parse_station_id(s) for s in station_ids]
+
+        # The time steps are capped on their own too, so a huge range stops
+        # early whatever the number of stations
+        times = []
+        current = start
+        while current <= end and len(times) <= MAX_BATCH_SIZE and len(times) * len(station_ids) <= MAX_BATCH_SIZE:
+            times.append(current)
+            current += timedelta(minutes=step_minutes)
+        return [(station_id, dt) for dt in times for station_id in station_ids]
+
+    raise ValueError("Request must contain 'items' or 'start'")
+
+
+# Decimal places OpenWeather reports each forecast value to. Interpolated
+# values are rounded back to these, so they share cache entries.
+FORECAST_RESOLUTION = {'temperature': 2, 'humidity': 0, 'pressure': 0}
+
+def quantize_forecast(forecast):
+    return tuple(round(float(forecast[column]), digits) for column, digits in FORECAST_RESOLUTION.items())
+
+# Keyed on exactly what the model sees, so every request for the same station,
+# hour and weekday under the same forecast shares one entry whatever its
+# minute or date. The model version in the key, and the invalidation when a
+# new model is loaded, keep results from an old model out.
+@ttl_cache(ttl=PREDICTION_MEMO_TTL, backend=memo_backend(PREDICTION_MEMO_SIZE), key_prefix='predict_inputs', cache_none=True)
+def predict_inputs(version, station_id, hour, day_of_week, temperature, humidity, pressure):
+    """Predicted bikes for one set of model inputs, None for an unknown station"""
+    logger.info(f"Input features: {json.dumps([station_id, temperature, humidity, pressure, hour, day_of_week])}")
+    features = {
+        'station_id': np.array([station_id]),
+        'temperature': np.array([temperature], dtype=float),
+        'humidity': np.array([humidity], dtype=float),
+        'pressure': np.array([pressure], dtype=float),
+        'hour': np.array([hour]),
+        'station_hour': [f"{str(station_id)}_{hour}"],
+        'day_of_week': np.array([day_of_week]),
+    }
+    return predict_features(features)[0]
+
+def predict_station_at(station_id, dt, interpolate=False):
+    """Predict bikes at one station and time, or None if there is no forecast"""
+    # Get weather forecast
+    openweather_data = fetch_openweather_forecast(dt, interpolate)
+    if not openweather_data:
+        return None
+
+    predicted_bikes = predict_inputs(current_model_version(), station_id, dt.hour, dt.weekday(),
+                                     *quantize_forecast(openweather_data))
+    if predicted_bikes is None:
+        raise ValueError(f"Station {station_id} not known to the model")
+    return predicted_bikes
+
+# Every station x forecast slot prediction, rebuilt in the background when
+# the forecast or the model changes
+prediction_grid = PredictionGrid(
+    forecast_store,
+    lambda rows, forecasts: predict_features(build_feature_columns(rows, forecasts)),
+    current_model_version,
+    station_ids=range(1, MAX_STATION_ID + 1),
+    interval=int(os.environ.get('PREDICTION_GRID_INTERVAL', 60))
+)
 
 # Define a route for predictions
 @app.route("/predict", methods=["GET"])
@@ -323,67 +790,119 @@ def predict():
             return jsonify({"error": "Missing date, time, or station_id parameter"}), 400
         
         try:
-            station_id = int(station_id)
-            if station_id > 117:
-                return jsonify({"error": f"Invalid station_id: {station_id}"}), 400
-        except ValueError:
-            return jsonify({"error": "station_id must be a number"}), 400
+            station_id = parse_station_id(station_id)
+            dt = parse_prediction_time(date, time)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
 
+        interpolate = parse_flag(request.args.get("interpolate"))
         try:
-            dt = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M:%S")
-            if dt < datetime.now():
-                return jsonify({"error": f"Prediction only for future time"}), 400
-        except ValueError:
-            return jsonify({"error": "Invalid date or time format. Use YYYY-MM-DD HH:MM:SS"}), 400
-            
-        hour = dt.hour
-        day_of_week = dt.weekday()
-        station_hour = f"{str(station_id)}_{hour}"
-
-        # Get weather forecast
-        openweather_data = fetch_openweather_forecast(dt)
-        if not openweather_data:
-            return jsonify({"error": "Failed to fetch weather forecast"}), 500
-            
-        logger.info(f"Weather data: {json.dumps(openweather_data)}")
-
-        # Combine data into input features
-        input_features = [
-            station_id,
-            openweather_data["temperature"],
-            openweather_data["humidity"],
-            openweather_data["pressure"],
-            hour,
-            station_hour,
-            day_of_week,
-        ]
-        
-        # Convert to DataFrame
-        columns = ['station_id', 'temperature', 'humidity', 'pressure', 'hour', 'station_hour', 'day_of_week']
-        input_df = pd.DataFrame([input_features], columns=columns)
-        
-        logger.info(f"Input features: {json.dumps(input_features)}")
+            # Straight from the precomputed grid when it covers the request
+            if interpolate:
+                raise GridMiss("Interpolated forecasts are not precomputed")
+            predicted_bikes = prediction_grid.lookup(station_id, dt)
+            if predicted_bikes is None:
+                raise ValueError(f"Station {station_id} not known to the model")
+        except GridMiss:
+            predicted_bikes = predict_station_at(station_id, dt, interpolate)
+            if predicted_bikes is None:
+                return jsonify({"error": "Failed to fetch weather forecast"}), 500
         
-        # Make prediction
-        prediction = model.predict(input_df)
-        predicted_bikes = max(0, min(round(prediction[0]), 40))  # Ensure prediction is between 0 and 40
-        
-        return jsonify({"predicted_available_bikes": predicted_bikes})
+        return jsonify({
+            "predicted_available_bikes": predicted_bikes,
+            "forecast_fetched_at": forecast_store.fetched_at()
+        })
 
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         return jsonify({"error": "Failed to make prediction"}), 500
 
+# Predicted bikes at a station for every forecast slot
+@app.route("/predict/curve", methods=["GET"])
+def predict_curve():
+    try:
+        try:
+            station_id = parse_station_id(request.args.get("station_id"))
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        if not prediction_grid.ready():
+            # Cold start: build the grid once rather than waiting for the background job
+            prediction_grid.refresh()
+        try:
+            curve = prediction_grid.curve(station_id)
+        except GridMiss:
+            return jsonify({"error": "Predictions are not available yet"}), 503
+        if all(predicted_bikes is None for _, predicted_bikes in curve):
+            return jsonify({"error": "Station not known to the model"}), 404
+
+        return jsonify({
+            "station_id": station_id,
+            "curve": [{
+                "date": dt.strftime("%Y-%m-%d"),
+                "time": dt.strftime("%H:%M:%S"),
+                "predicted_available_bikes": predicted_bikes
+            } for dt, predicted_bikes in curve],
+            "forecast_fetched_at": forecast_store.fetched_at()
+        })
+    except Exception as e:
+        logger.error(f"Prediction curve error: {str(e)}")
+        return jsonify({"error": "Failed to make predictions"}), 500
+
+# Predict many (station, time) pairs with a single model call
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    try:
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+
+        try:
+            rows = expand_batch_request(payload)
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+
+        if not rows:
+            return jsonify({"error": "No predictions requested"}), 400
+        if len(rows) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Batch too large, limit is {MAX_BATCH_SIZE} predictions"}), 400
+
+        # One forecast lookup for every distinct time in the batch
+        weather = fetch_openweather_forecasts([dt for _, dt in rows], parse_flag(payload.get('interpolate')))
+        if any(forecast is None for forecast in weather.values()):
+            return jsonify({"error": "Failed to fetch weather forecast"}), 500
+
+        predictions = predict_features(build_features(rows, weather))
+
+        results = []
+        for (station_id, dt), predicted_bikes in zip(rows, predictions):
+            result = {
+                "station_id": station_id,
+                "date": dt.strftime("%Y-%m-%d"),
+                "time": dt.strftime("%H:%M:%S"),
+                "predicted_available_bikes": predicted_bikes
+            }
+            if predicted_bikes is None:
+                result["error"] = "Station not known to the model"
+            results.append(result)
+
+        logger.info(f"Batch prediction: {len(results)} rows, {len(weather)} distinct times")
+        return jsonify({
+            "predictions": results,
+            "count": len(results),
+            "forecast_fetched_at": forecast_store.fetched_at()
+        })
+
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}")
+        return jsonify({"error": "Failed to make predictions"}), 500
+
 def get_station(station_id):
-    """Get station data from JCDecaux API"""
+    """Get station data from the station snapshot"""
     try:
-        api_key = os.environ.get('JCDECAUX_API_KEY')
-        contract = "dublin"
-        url = f"https://api.jcdecaux.com/vls/v1/stations/{station_id}?contract={contract}&apiKey={api_key}"
-        
-        response = requests.get(url)
-        response.raise_for_status()
-        station_data = response.json()
+        station_data = get_snapshot_station(station_id)
+        if station_data is None:
+            raise KeyError(f"Station {station_id} not in snapshot")
         
         return {
             'number': station_data['number'],
@@ -405,7 +924,7 @@ def get_weather_data():
         api_key = os.environ.get('OPENWEATHER_API_KEY')
         url = f"https://api.openweathermap.org/data/2.5/weather?lat=53.3498&lon=-6.2603&appid={api_key}&units=metric"
         
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -431,41 +950,78 @@ def normalize_prediction(raw_prediction, max_bikes):
     
     return normalized
 
+def parse_history_filters(args):
+    """
+    Turn history query parameters into (days, bands) for the history cube.
+    dow is a day of week 0-6 (Monday is 0), day_type is weekday or weekend
+    and temp_band is one of BAND_NAMES. Raises ValueError for bad values,
+    or a dow that is not a day of the given day_type.
+    """
+    days = None
+    if args.get('dow') is not None:
+        try:
+            dow = int(args.get('dow'))
+        except ValueError:
+            raise ValueError("dow must be a number from 0 (Monday) to 6")
+        if not 0 <= dow <= 6:
+            raise ValueError("dow must be a number from 0 (Monday) to 6")
+        days = [dow]
+
+    day_type = args.get('day_type')
+    if day_type is not None:
+        if day_type not in ('weekday', 'weekend'):
+            raise ValueError("day_type must be weekday or weekend")
+        allowed = WEEKDAYS if day_type == 'weekday' else WEEKEND
+        if days is not None and days[0] not in allowed:
+            raise ValueError(f"dow {days[0]} is not a {day_type} day")
+        days = days if days is not None else list(allowed)
+
+    bands = None
+    temp_band = args.get('temp_band')
+    if temp_band is not None:
+        if temp_band not in BAND_NAMES:
+            raise ValueError(f"temp_band must be one of {', '.join(BAND_NAMES)}")
+        bands = [BAND_NAMES.index(temp_band)]
+
+    return days, bands
+
 @app.route('/api/station/<int:station_id>/history')
-@cache.cached(timeout=300)
+@coalesced_cache(timeout=300)
 def get_station_history(station_id):
     try:
-        if historical_data is None:
+        try:
+            days, bands = parse_history_filters(request.args)
+        except ValueError as ve:
+            return jsonify({'error': str(ve)}), 400
+
+        index = get_history_index()
+        if index is None:
             logger.error("Historical data is None")
             return jsonify({'error': 'Historical data not available'}), 500
 
         # Get current station data for total stands
-        api_key = os.environ.get('JCDECAUX_API_KEY')
-        contract = "dublin"
-        url = f"https://api.jcdecaux.com/vls/v1/stations/{station_id}?contract={contract}&apiKey={api_key}"
-        
-        response = requests.get(url)
-        response.raise_for_status()
-        station_data = response.json()
+        station_data = get_snapshot_station(station_id)
+        if station_data is None:
+            return jsonify({'error': 'Station not found'}), 404
         total_stands = station_data['bike_stands']
         
-        # Filter historical data for this station
-        station_history = historical_data[historical_data['station_id'] == float(station_id)].copy()
+        # Precomputed hourly averages for this station and filter
+        profile = index.profile(station_id, days, bands)
         
-        if station_history.empty:
+        if profile is None:
             logger.warning(f"No historical data found for station {station_id}")
             return jsonify({'error': 'No historical data available'}), 404
         
-        # Calculate hourly averages
-        hourly_stats = station_history.groupby('hour')['num_bikes_available'].agg(['mean', 'count']).reset_index()
+        means, counts = profile
+        if counts.sum() == 0:
+            # Don't make up a flat profile the client can't tell from real history
+            return jsonify({'error': 'No historical data for this filter'}), 404
         
         # Create data points for all 24 hours
         data_points = []
         for hour in range(24):
-            hour_data = hourly_stats[hourly_stats['hour'] == hour]
-            
-            if not hour_data.empty:
-                avg_bikes = int(round(hour_data['mean'].iloc[0]))
+            if counts[hour] > 0:
+                avg_bikes = int(round(means[hour]))
                 # Ensure the average is within bounds
                 avg_bikes = max(0, min(avg_bikes, total_stands))
                 avg_stands = total_stands - avg_bikes
@@ -480,9 +1036,6 @@ def get_station_history(station_id):
                 'available_stands': avg_stands
             })
         
-        # Sort data points by hour
-        data_points.sort(key=lambda x: int(x['timestamp'].split(':')[0]))
-        
         return jsonify(data_points)
             
     except Exception as e:
@@ -490,6 +1043,7 @@ def get_station_history(station_id):
         return jsonify({'error': 'Failed to fetch station history'}), 500
 
 def prepare_features(station, weather_data, prediction_time):
+    import pandas as pd
     try:
         # Prepare features to match the model's expected input
         features = pd.DataFrame([{
@@ -520,21 +1074,18 @@ def fetch_weather_data(lat, lng):
     try:
         api_key = os.getenv('OPENWEATHER_API_KEY')
         url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lng}&appid={api_key}&units=metric"
-        response = requests.get(url)
+        response = http_client.get(url)
         return response.json() if response.status_code == 200 else None
     except Exception:
         return None
 
 def fetch_station_data(station_id):
-    """Get station data from JCDecaux API"""
+    """Get station data from the station snapshot"""
     try:
-        api_key = os.environ.get('JCDECAUX_API_KEY')
-        contract = "dublin"
-        url = f"https://api.jcdecaux.com/vls/v1/stations/{station_id}?contract={contract}&apiKey={api_key}"
-        
-        response = requests.get(url)
-        response.raise_for_status()
-        station_data = response.json()
+        station_data = get_snapshot_station(station_id)
+        if station_data is None:
+            logger.warning(f"Station {station_id} not in snapshot")
+            return None
         
         # Transform the data to match our expected format
         transformed_data = {
@@ -557,6 +1108,81 @@ def fetch_station_data(station_id):
         logger.error(f"Error fetching station {station_id}: {str(e)}")
         return None
 
+# Hit/miss statistics for the response and memoization caches
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    return jsonify({
+        'weather': weather_cache.stats(),
+        'stations': station_snapshot.cache.stats(),
+        'memoized': memo_stats(),
+        'backend': cache.cache.stats(),
+        'payloads': payload_cache.stats(),
+        'station_changes': station_changes.stats(),
+        'prediction_grid': prediction_grid.stats()
+    })
+
+# Latency and error counters for JCDecaux and OpenWeather
+@app.route('/api/upstream/stats')
+def get_upstream_stats():
+    return jsonify({
+        'hosts': http_client.stats(),
+        'single_flight': single_flight.stats()
+    })
+
+# Connected availability stream clients and the poller feeding them
+@app.route('/api/stream/stats')
+def get_stream_stats():
+    return jsonify({
+        'clients': availability_broadcaster.stats(),
+        'poller': availability_poller.stats()
+    })
+
+# How long importing the app and loading each lazy resource took
+@app.route('/api/startup/stats')
+def get_startup_stats():
+    return jsonify(resources.report())
+
+def warmup():
+    """Load the model and historical data now instead of on the first request"""
+    resources.warmup()
+    get_model()
+    get_history_index()
+    get_inference_engine()
+    # Build the grid now so forked workers start with it. It is kept fresh
+    # by start_background() in the processes that serve requests, not in a
+    # gunicorn master that only forks them.
+    prediction_grid.refresh()
+    return resources.report()
+
+def start_background():
+    """Start the background refresh threads in a process that serves requests"""
+    prediction_grid.start()
+
+def after_fork():
+    """
+    Reset per-process state in a freshly forked worker. The read-only
+    resources loaded by warmup() in the master are kept and shared
+    copy-on-write; connection pools, locks and background refresh threads
+    are not safe to inherit. Only the forking thread survives a fork, so a
+    lock another thread held then would never be released, and pooled
+    sockets would be shared with the master. Each reset() below replaces
+    that state in its own object.
+    """
+    http_client.reset()
+    single_flight.reset()
+    weather_cache.reset()
+    station_snapshot.cache.reset()
+    forecast_store.reset()
+    availability_poller.reset()
+    prediction_grid.reset()
+    start_background()
+    logger.info(f"Worker {os.getpid()} reset after fork")
+
+resources.import_seconds = time.perf_counter() - _import_started
+
 # Run the app
+
 if __name__ == '__main__':
+    warmup()
+    start_background()
     app.run(host='0.0.0.0', port=5500, debug=True, use_reloader=False)
\ No newline at end of file
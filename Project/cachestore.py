@@ -0,0 +1,224 @@
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+from cachelib import SimpleCache, FileSystemCache
+from flask_caching.backends.base import BaseCache
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('simple', 'filesystem', 'shm', 'redis')
+
+# tmpfs mount used by the shared-memory backend
+SHM_DIR = '/dev/shm'
+
+
+def make_store(backend, cache_dir=None, redis_url=None, threshold=5000):
+    """
+    Create the cachelib store behind the app cache:
+
+    - simple: in-process dictionary, nothing is shared between workers
+    - filesystem: one file per key under cache_dir, shared by every worker
+    - shm: the filesystem store kept in shared memory (tmpfs), so reads and
+      writes never touch a disk
+    - redis: a Redis (or Redis-compatible) server at redis_url
+    """
+    if backend == 'simple':
+        return SimpleCache(threshold=threshold)
+    if backend == 'filesystem':
+        return FileSystemCache(cache_dir or os.path.join(tempfile.gettempdir(), 'dublinbikes-cache'), threshold=threshold)
+    if backend == 'shm':
+        if not os.path.isdir(SHM_DIR):
+            raise RuntimeError(f"Shared memory cache needs {SHM_DIR}")
+        return FileSystemCache(cache_dir or os.path.join(SHM_DIR, 'dublinbikes-cache'), threshold=threshold)
+    if backend == 'redis':
+        try:
+            from cachelib import RedisCache
+            import redis  # noqa: F401
+        except ImportError:
+            raise RuntimeError("The redis cache backend needs the redis package (pip install redis)")
+        url = urlparse(redis_url or 'redis://127.0.0.1:6379/0')
+        return RedisCache(
+            host=url.hostname or '127.0.0.1',
+            port=url.port or 6379,
+            password=url.password,
+            db=int(url.path.lstrip('/') or 0),
+            key_prefix='dublinbikes:'
+        )
+    raise ValueError(f"Unknown cache backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+
+class OperationStats:
+    """Count and latency of one kind of cache operation"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+
+    def record(self, elapsed, size=0):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.bytes += size
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(1000 * self.total / self.count, 3) if self.count else None,
+            'max_ms': round(1000 * self.max, 3),
+            'bytes': self.bytes,
+        }
+
+
+class ByteCache(BaseCache):
+    """
+    App cache that pickles every value to bytes before handing it to the
+    configured store, so all backends hold the same payloads, and times
+    every operation. Store errors are logged and treated as misses so a
+    cache outage never fails a request.
+
+    Selected in the Flask-Caching config with
+    CACHE_TYPE='Project.cachestore.ByteCache' and CACHE_BACKEND set to one of
+    BACKENDS.
+    """
+
+    def __init__(self, store, backend='simple', default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.store = store
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.ops = {'get': OperationStats(), 'set': OperationStats(), 'delete': OperationStats()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        backend = config.get('CACHE_BACKEND', 'simple')
+        store = make_store(
+            backend,
+            cache_dir=config.get('CACHE_DIR'),
+            redis_url=config.get('CACHE_REDIS_URL'),
+            threshold=config.get('CACHE_THRESHOLD', 5000)
+        )
+        logger.info(f"App cache backend: {backend}")
+        return cls(store, backend, **kwargs)
+
+    def _record(self, op, started, size=0):
+        with self._lock:
+            self.ops[op].record(time.perf_counter() - started, size)
+
+    def _error(self, op, key, e):
+        with self._lock:
+            self.errors += 1
+        logger.warning(f"Cache {op} of {key} failed on {self.backend}: {str(e)}")
+
+    def get(self, key):
+        started = time.perf_counter()
+        try:
+            raw = self.store.get(key)
+        except Exception as e:
+            self._error('get', key, e)
+            return None
+        self._record('get', started, len(raw) if raw is not None else 0)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value, timeout=None):
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        started = time.perf_counter()
+        try:
+            result = self.store.set(key, raw, timeout=self._normalize_timeout(timeout))
+        except Exception as e:
+            self._error('set', key, e)
+            return False
+        self._record('set', started, len(raw))
+        return result
+
+    def add(self, key, value, timeout=None):
+        raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            return self.store.add(key, raw, timeout=self._normalize_timeout(timeout))
+        except Exception as e:
+            self._error('add', key, e)
+            return False
+
+    def delete(self, key):
+        started = time.perf_counter()
+        try:
+            result = self.store.delete(key)
+        except Exception as e:
+            self._error('delete', key, e)
+            return False
+        self._record('delete', started)
+        return result
+
+    def has(self, key):
+        try:
+            return self.store.has(key)
+        except Exception as e:
+            self._error('has', key, e)
+            return False
+
+    def clear(self):
+        try:
+            return self.store.clear()
+        except Exception as e:
+            self._error('clear', '*', e)
+            return False
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'errors': self.errors,
+            **{op: stats.as_dict() for op, stats in self.ops.items()},
+        }
+
+
+class CacheEntries:
+    """
+    Dict-like view of part of the app cache, so an SWRCache can keep its
+    entries in a store shared between workers instead of in the process.
+    Entries expire from the store after `timeout` seconds.
+    """
+
+    def __init__(self, cache, prefix, timeout):
+        self.cache = cache
+        self.prefix = prefix
+        self.timeout = timeout
+        self._keys = set()
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key, default=None):
+        value = self.cache.get(self._key(key))
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._keys.add(key)
+        self.cache.set(self._key(key), value, timeout=self.timeout)
+
+    def clear(self):
+        """Drop the entries this process has written"""
+        for key in self._keys:
+            self.cache.delete(self._key(key))
+        self._keys = set()
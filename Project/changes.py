@@ -0,0 +1,95 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Fields sent for each station in the changes feed
+FIELDS = ('number', 'status', 'available_bikes', 'available_bike_stands', 'last_update')
+
+# A station counts as changed when one of these differs
+COMPARED = ('status', 'available_bikes', 'available_bike_stands')
+
+
+def station_row(station):
+    return {field: station.get(field) for field in FIELDS}
+
+
+class ChangeLog:
+    """
+    Versioned copy of station availability with a short log of which
+    stations changed in each version, so a client that has seen version v
+    can be sent just the stations that changed since.
+
+    Versions only ever increase. The app uses the snapshot's fetch time in
+    milliseconds, so workers that share a snapshot also agree on versions.
+    Only the last `maxlen` versions are kept; a client older than that gets
+    a full reset instead. So does a client holding a version this log never
+    recorded, such as one issued by another worker with its own log: its
+    state is unknown here even if the version falls inside the log's range.
+    """
+
+    def __init__(self, maxlen=100):
+        self.version = 0
+        self.rows = {}
+        self._log = deque(maxlen=maxlen)
+        # Oldest version the log can still answer from
+        self._base = 0
+        self._lock = threading.Lock()
+
+    def update(self, version, stations):
+        """
+        Record a new snapshot of stations as `version`. Returns the rows of
+        the stations that changed (empty if nothing did or the version is
+        not newer than the current one).
+        """
+        with self._lock:
+            if version <= self.version:
+                return []
+            rows = {station['number']: station_row(station) for station in stations}
+            changed = {
+                number for number, row in rows.items()
+                if number not in self.rows or any(row[f] != self.rows[number][f] for f in COMPARED)
+            }
+            removed = set(self.rows) - set(rows)
+            first = not self.rows
+            self.rows = rows
+            if first:
+                # Nothing to diff against, clients start from a full reset
+                self.version = self._base = version
+                return []
+            if not changed and not removed:
+                return []
+            if len(self._log) == self._log.maxlen:
+                self._base = self._log[0][0]
+            self._log.append((version, changed, removed))
+            self.version = version
+        logger.info(f"Station changes: version {version}, {len(changed)} changed, {len(removed)} removed")
+        return [rows[number] for number in sorted(changed)]
+
+    def since(self, version):
+        """
+        What changed after `version`: either {'reset': False, 'changed',
+        'removed'} or, if the version is unknown or too old, {'reset': True,
+        'stations'} with every station.
+        """
+        with self._lock:
+            current, rows = self.version, self.rows
+            known = version == self._base or any(entry[0] == version for entry in self._log)
+            if version is None or not known:
+                return {'version': current, 'reset': True, 'stations': [rows[n] for n in sorted(rows)]}
+            changed, removed = set(), set()
+            for entry_version, entry_changed, entry_removed in self._log:
+                if entry_version > version:
+                    changed |= entry_changed
+                    removed |= entry_removed
+            changed &= set(rows)
+            return {
+                'version': current,
+                'reset': False,
+                'changed': [rows[n] for n in sorted(changed)],
+                'removed': sorted(removed - set(rows)),
+            }
+
+    def stats(self):
+        return {'version': self.version, 'entries': len(self._log), 'base': self._base, 'stations': len(self.rows)}
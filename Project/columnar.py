@@ -0,0 +1,142 @@
+import json
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+
+# Storage dtype for every column of the ML dataset. Integer columns are
+# downcast further to the smallest type that holds their range when built.
+COLUMN_DTYPES = {
+    'station_id': 'category',
+    'temperature': np.float32,
+    'humidity': np.float32,
+    'pressure': np.float32,
+    'hour': np.uint8,
+    'day_of_week': np.uint8,
+    'num_bikes_available': np.uint16,
+}
+
+# How the CSV has always been parsed, used as the baseline for the report
+CSV_DTYPES = {
+    'station_id': float,
+    'temperature': float,
+    'humidity': float,
+    'pressure': float,
+    'hour': int,
+    'day_of_week': int,
+    'num_bikes_available': int,
+}
+
+
+def smallest_int_dtype(values):
+    """Smallest unsigned integer dtype that holds every value"""
+    high = int(values.max()) if len(values) else 0
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if high <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+def build(csv_path, out_dir):
+    """
+    Convert the CSV dataset into one .npy file per column plus a manifest.
+    station_id is stored as small integer codes into a table of station
+    numbers. Returns a report of the memory used before and after.
+    """
+    import pandas as pd
+    frame = pd.read_csv(csv_path, dtype=CSV_DTYPES)
+    os.makedirs(out_dir, exist_ok=True)
+
+    columns = {}
+    for name, dtype in COLUMN_DTYPES.items():
+        if name not in frame.columns:
+            continue
+        values = frame[name].to_numpy()
+        if dtype == 'category':
+            categories, codes = np.unique(values.astype(np.int64), return_inverse=True)
+            categories = categories.astype(smallest_int_dtype(categories))
+            codes = codes.astype(smallest_int_dtype(codes))
+            np.save(os.path.join(out_dir, f"{name}.categories.npy"), categories)
+            np.save(os.path.join(out_dir, f"{name}.codes.npy"), codes)
+            columns[name] = {'kind': 'category', 'dtype': str(codes.dtype)}
+        else:
+            if np.issubdtype(np.dtype(dtype), np.integer):
+                dtype = smallest_int_dtype(values)
+            np.save(os.path.join(out_dir, f"{name}.npy"), values.astype(dtype))
+            columns[name] = {'kind': 'plain', 'dtype': np.dtype(dtype).name}
+
+    manifest = {'rows': len(frame), 'columns': columns}
+    with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    before = int(frame.memory_usage(deep=True).sum())
+    after = ColumnarDataset(out_dir).nbytes
+    report = {
+        'rows': len(frame),
+        'csv_bytes': os.path.getsize(csv_path),
+        'dataframe_bytes': before,
+        'columnar_bytes': after,
+        'saved_bytes': before - after,
+        'saved_percent': round(100 * (before - after) / before, 1) if before else 0.0,
+    }
+    logger.info(f"Columnar dataset written to {out_dir}: {report}")
+    return report
+
+
+class ColumnarDataset:
+    """
+    Read-only, memory-mapped view of a dataset written by build(). Opening it
+    only reads the manifest; pages are read on first access and shared
+    between processes through the OS page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        self.rows = manifest['rows']
+        self.columns = {}
+        self.categories = {}
+        for name, info in manifest['columns'].items():
+            if info['kind'] == 'category':
+                self.columns[name] = np.load(os.path.join(path, f"{name}.codes.npy"), mmap_mode='r')
+                self.categories[name] = np.load(os.path.join(path, f"{name}.categories.npy"))
+            else:
+                self.columns[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, MANIFEST))
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        """A column's values; categorical columns are decoded to their labels"""
+        values = self.columns[name]
+        if name in self.categories:
+            return self.categories[name][values]
+        return values
+
+    def codes(self, name):
+        """The raw codes and label table of a categorical column"""
+        return self.columns[name], self.categories[name]
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.columns.values()) + \
+            sum(labels.nbytes for labels in self.categories.values())
+
+    def to_frame(self):
+        """Materialise the dataset as a DataFrame in the CSV's dtypes"""
+        import pandas as pd
+        return pd.DataFrame({
+            name: np.asarray(self[name]).astype(CSV_DTYPES.get(name, float))
+            for name in self.columns
+        })
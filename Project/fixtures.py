@@ -0,0 +1,78 @@
+"""Test data and a local JCDecaux stub shared by the tests and benchmarks"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+
+def stations(bikes):
+    """JCDecaux stations numbered from 1 with the given bike counts"""
+    return [{
+        "number": number,
+        "contract_name": "dublin",
+        "name": f"Station {number}",
+        "address": "Test Address",
+        "position": {"lat": 53.35, "lng": -6.26},
+        "banking": False,
+        "bonus": False,
+        "status": "OPEN",
+        "bike_stands": 20,
+        "available_bikes": count,
+        "available_bike_stands": 20 - count,
+        "last_update": 1700000000000 + number
+    } for number, count in enumerate(bikes, start=1)]
+
+
+class StubJCDecaux:
+    """
+    Local stand-in for the JCDecaux stations API. Each contract's payload is
+    a JSON value, pre-encoded bytes or a function returning either (read on
+    every request, so a test can change it); unknown contracts get a 404.
+    Every answer is delayed by `delay` seconds, and the most requests
+    handled at once is counted.
+    """
+
+    def __init__(self, payloads, delay=0):
+        self.payloads = payloads
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                contract = parse_qs(urlsplit(self.path).query).get('contract', [''])[0]
+                with lock:
+                    stub.requests += 1
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                time.sleep(stub.delay)
+                with lock:
+                    stub.active -= 1
+                payload = stub.payloads.get(contract)
+                if payload is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if callable(payload):
+                    payload = payload()
+                body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/vls/v1/stations"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
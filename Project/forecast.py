@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from Project.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('temperature', 'humidity', 'pressure')
+
+
+def to_timestamp(dt):
+    """Convert a naive datetime to a UNIX timestamp the same way the forecast lookup always has"""
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def empty_slots():
+    return np.empty(0, dtype=np.int64), {column: np.empty(0) for column in COLUMNS}
+
+
+class ForecastStore:
+    """
+    In-memory copy of the OpenWeather 5-day forecast. The slots are kept in a
+    sorted timestamp array with one array per weather column, so finding the
+    nearest slot is a binary search. The forecast is downloaded at most once
+    per refresh interval.
+    """
+
+    def __init__(self, fetch, refresh_interval=600, flight=None):
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        # Concurrent refreshes share one download
+        self.flight = flight or SingleFlight()
+        self._slots = empty_slots()
+        self.last_fetched = None
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._slots = empty_slots()
+            self.last_fetched = None
+
+    def reset(self):
+        """Replace the lock guarding loads of the forecast"""
+        self._lock = threading.Lock()
+
+    def slots(self):
+        """(slot timestamps, {column: values}), always from the same forecast"""
+        return self._slots
+
+    def is_stale(self):
+        return self.last_fetched is None or time.time() - self.last_fetched >= self.refresh_interval
+
+    def load(self, data):
+        """Index the slots of a raw forecast response"""
+        items = sorted(data.get("list", []), key=lambda item: item["dt"])
+        times = np.array([item["dt"] for item in items], dtype=np.int64)
+        values = {
+            'temperature': np.array([item["main"]["temp"] for item in items], dtype=float),
+            'humidity': np.array([item["main"]["humidity"] for item in items], dtype=float),
+            'pressure': np.array([item["main"]["pressure"] for item in items], dtype=float),
+        }
+        with self._lock:
+            # One assignment, so readers never pair new times with old columns
+            self._slots = (times, values)
+            self.last_fetched = time.time()
+        logger.info(f"Forecast store loaded {len(times)} slots")
+
+    def refresh(self, force=False):
+        """Download the forecast again if it is older than the refresh interval"""
+        if not force and not self.is_stale():
+            return
+        self.flight.do('forecast', lambda: self._refresh(force))
+
+    def _refresh(self, force):
+        # Another caller may have refreshed just before this flight started
+        if not force and not self.is_stale():
+            return
+        try:
+            self.load(self.fetch())
+        except Exception as e:
+            # Keep answering from the previous forecast if we have one
+            if len(self._slots[0]) == 0:
+                raise
+            logger.warning(f"Forecast refresh failed, serving previous forecast: {str(e)}")
+
+    def lookup_many(self, datetimes, interpolate=False):
+        """Return {datetime: forecast} for every requested datetime"""
+        self.refresh()
+        times, values = self._slots
+        datetimes = list(set(datetimes))
+        if len(times) == 0:
+            return {dt: None for dt in datetimes}
+
+        targets = np.array([to_timestamp(dt) for dt in datetimes], dtype=np.int64)
+        if interpolate:
+            # np.interp holds the first/last slot outside the forecast window
+            columns = {column: np.interp(targets, times, values[column]) for column in COLUMNS}
+        else:
+            right = np.clip(np.searchsorted(times, targets), 0, len(times) - 1)
+            left = np.clip(right - 1, 0, len(times) - 1)
+            # On a tie prefer the earlier slot
+            nearest = np.where(np.abs(targets - times[left]) <= np.abs(times[right] - targets), left, right)
+            columns = {column: values[column][nearest] for column in COLUMNS}
+
+        return {
+            dt: {column: float(columns[column][i]) for column in COLUMNS}
+            for i, dt in enumerate(datetimes)
+        }
+
+    def lookup(self, dt, interpolate=False):
+        """Return the forecast for the slot nearest to dt, or None if there is no forecast"""
+        return self.lookup_many([dt], interpolate)[dt]
+
+    def fetched_at(self):
+        """When the forecast was last downloaded, as an ISO timestamp"""
+        if self.last_fetched is None:
+            return None
+        return datetime.fromtimestamp(self.last_fetched, tz=timezone.utc).isoformat()
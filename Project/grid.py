@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from Project.forecast import COLUMNS, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+# A time is served by its nearest forecast slot, so it lies within 1.5h of
+# it: one of the four whole hours starting 2h before the slot
+OFFSETS = (-2, -1, 0, 1)
+
+# Stored for stations the model cannot score
+UNKNOWN = -1
+
+
+class GridMiss(Exception):
+    """Raised when a lookup falls outside the precomputed grid"""
+
+
+def slot_datetime(timestamp):
+    """Inverse of forecast.to_timestamp"""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).replace(tzinfo=None)
+
+
+class PredictionGrid:
+    """
+    Every prediction the forecast allows, computed in one go: an array of
+    shape (stations, forecast slots, hour offsets) holding the predicted
+    bikes for each station at each whole hour served by each slot. It is
+    rebuilt in the background whenever the forecast or the model changes,
+    so requests are answered by indexing, without calling the model or any
+    upstream API.
+
+    score(rows, forecasts) predicts a list of (station_id, datetime) rows
+    given the forecast for each row, returning None for stations the model
+    does not know. model_version() identifies the current model.
+    """
+
+    def __init__(self, forecast_store, score, model_version, station_ids, interval=60):
+        self.forecast_store = forecast_store
+        self.score = score
+        self.model_version = model_version
+        self.station_ids = np.asarray(station_ids, dtype=np.int64)
+        self.interval = interval
+        # (slot timestamps, predictions), replaced together on each rebuild
+        self._grid = (np.empty(0, dtype=np.int64), np.empty((len(self.station_ids), 0, len(OFFSETS)), dtype=np.int16))
+        self.version = None
+        self.built_at = None
+        self.builds = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ready(self):
+        return len(self._grid[0]) > 0
+
+    def current_version(self):
+        return (self.forecast_store.last_fetched, self.model_version())
+
+    def rebuild(self):
+        """Recompute the grid from the current forecast and model"""
+        started = time.perf_counter()
+        version = self.current_version()
+        times, values = self.forecast_store.slots()
+        if len(times) == 0:
+            return False
+
+        # Every (slot, offset) hour with the weather of its slot. The same
+        # hour can sit next to two slots, so weather goes with each row
+        # rather than being looked up by time.
+        slot_times, slot_forecasts = [], []
+        for i, timestamp in enumerate(times):
+            forecast = {column: float(values[column][i]) for column in COLUMNS}
+            for offset in OFFSETS:
+                slot_times.append(slot_datetime(timestamp + offset * 3600))
+                slot_forecasts.append(forecast)
+        rows = [(int(station_id), dt) for station_id in self.station_ids for dt in slot_times]
+        predictions = self.score(rows, slot_forecasts * len(self.station_ids))
+
+        grid = np.array([UNKNOWN if p is None else p for p in predictions], dtype=np.int16)
+        grid = grid.reshape(len(self.station_ids), len(times), len(OFFSETS))
+        with self._lock:
+            self._grid = (times, grid)
+            self.version = version
+            self.built_at = time.time()
+            self.builds += 1
+        logger.info(f"Prediction grid rebuilt: {grid.size} predictions in {time.perf_counter() - started:.3f}s")
+        return True
+
+    def refresh(self):
+        """Refresh the forecast and rebuild the grid if the forecast or model changed"""
+        try:
+            self.forecast_store.refresh()
+            if self.current_version() != self.version or not self.ready():
+                self.rebuild()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prediction grid refresh failed: {str(e)}")
+
+    def lookup(self, station_id, dt):
+        """
+        Predicted bikes at a station and time, None if the model does not
+        know the station. Raises GridMiss if the grid does not cover it.
+        """
+        times, values = self._grid
+        if len(times) == 0:
+            raise GridMiss("Prediction grid not built")
+        row = int(station_id) - int(self.station_ids[0])
+        if row < 0 or row >= len(self.station_ids) or self.station_ids[row] != station_id:
+            raise GridMiss(f"Station {station_id} not in grid")
+
+        # Nearest slot, preferring the earlier one on a tie, as ForecastStore does
+        target = to_timestamp(dt)
+        right = min(int(np.searchsorted(times, target)), len(times) - 1)
+        left = max(right - 1, 0)
+        slot = left if abs(target - times[left]) <= abs(times[right] - target) else right
+        offset = (target - int(times[slot])) // 3600
+        if offset not in OFFSETS:
+            raise GridMiss(f"{dt} is outside the forecast")
+
+        value = int(values[row, slot, OFFSETS.index(offset)])
+        return None if value == UNKNOWN else value
+
+    def curve(self, station_id):
+        """[(slot datetime, predicted bikes)] over the whole forecast for a station"""
+        times, values = self._grid
+        row = int(station_id) - int(self.station_ids[0])
+        if len(times) == 0 or row < 0 or row >= len(self.station_ids):
+            raise GridMiss(f"Station {station_id} not in grid")
+        at_slot = values[row, :, OFFSETS.index(0)]
+        return [(slot_datetime(t), None if v == UNKNOWN else int(v)) for t, v in zip(times, at_slot)]
+
+    def start(self):
+        """Keep the grid up to date from a background thread"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='prediction-grid', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        self.refresh()
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def reset(self):
+        """Forget the refresh thread, its stop event and the lock guarding rebuilds"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stats(self):
+        return {
+            'ready': self.ready(),
+            'slots': len(self._grid[0]),
+            'stations': len(self.station_ids),
+            'builds': self.builds,
+            'errors': self.errors,
+            'built_at': self.built_at,
+        }
@@ -0,0 +1,27 @@
+import os
+
+# Load the app once in the master and fork workers from it, see Project/wsgi.py
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5500')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+
+# Every open page holds a /stream/availability connection, so requests are
+# served from a thread pool in each worker. With sync workers four open tabs
+# would take every worker, until the timeout killed them.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+
+def post_fork(server, worker):
+    # Pools, locks and refresh threads must not be shared between workers
+    if preload_app:
+        from Project.app import after_fork
+        after_fork()
+
+
+def post_worker_init(worker):
+    # Without preloading each worker loaded the app itself, after the fork
+    if not preload_app:
+        from Project.app import start_background
+        start_background()
@@ -0,0 +1,109 @@
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HOURS = 24
+DAYS = 7
+WEEKDAYS = (0, 1, 2, 3, 4)
+WEEKEND = (5, 6)
+
+# Temperature bands in degrees C: (name, upper edge); the last band is open ended
+TEMPERATURE_BANDS = (('cold', 5.0), ('cool', 10.0), ('mild', 15.0), ('warm', None))
+TEMPERATURE_EDGES = np.array([edge for _, edge in TEMPERATURE_BANDS if edge is not None])
+BAND_NAMES = tuple(name for name, _ in TEMPERATURE_BANDS)
+
+
+def temperature_band(temperatures):
+    """Band index for each temperature"""
+    return np.digitize(np.asarray(temperatures, dtype=float), TEMPERATURE_EDGES)
+
+
+class HistoryIndex:
+    """
+    Availability history for every station, pre-aggregated into a dense
+    cube of sums and counts with shape (stations, hour, day of week,
+    temperature band), plus a station number -> row index. Any slice of the
+    history is a handful of array sums with no groupby at request time. Sums
+    are kept rather than means so new rows can be folded in without a full
+    rebuild.
+    """
+
+    def __init__(self):
+        # (rows, sums, counts), replaced as one so readers never mix an old
+        # part with a new one
+        self._state = ({}, np.zeros((0, HOURS, DAYS, len(BAND_NAMES))),
+                       np.zeros((0, HOURS, DAYS, len(BAND_NAMES)), dtype=np.int64))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Build the index from a DataFrame or ColumnarDataset of historical observations"""
+        index = cls()
+        index.add(
+            np.asarray(frame['station_id']),
+            np.asarray(frame['hour']),
+            np.asarray(frame['day_of_week']),
+            np.asarray(frame['temperature']),
+            np.asarray(frame['num_bikes_available'])
+        )
+        return index
+
+    def add(self, station_ids, hours, days, temperatures, values):
+        """Fold new observations into the index"""
+        station_ids = np.asarray(station_ids).astype(np.int64)
+        hours = np.asarray(hours).astype(np.intp)
+        days = np.asarray(days).astype(np.intp)
+        temperatures = np.asarray(temperatures, dtype=float)
+        values = np.asarray(values, dtype=float)
+        valid = ((hours >= 0) & (hours < HOURS) & (days >= 0) & (days < DAYS)
+                 & ~np.isnan(temperatures) & ~np.isnan(values))
+        station_ids, hours, days, values = station_ids[valid], hours[valid], days[valid], values[valid]
+        bands = temperature_band(temperatures[valid])
+
+        with self._lock:
+            # Work on copies and swap them in at the end, so readers never
+            # see a half-applied update
+            old_rows, old_sums, old_counts = self._state
+            rows = dict(old_rows)
+            for station in np.unique(station_ids):
+                rows.setdefault(int(station), len(rows))
+            grow = len(rows) - len(old_rows)
+            sums = np.concatenate([old_sums, np.zeros((grow,) + old_sums.shape[1:])])
+            counts = np.concatenate([old_counts, np.zeros((grow,) + old_counts.shape[1:], dtype=np.int64)])
+
+            numbers = np.fromiter(rows.keys(), dtype=np.int64, count=len(rows))
+            positions = np.fromiter(rows.values(), dtype=np.intp, count=len(rows))
+            order = np.argsort(numbers)
+            row_idx = positions[order][np.searchsorted(numbers[order], station_ids)]
+            np.add.at(sums, (row_idx, hours, days, bands), values)
+            np.add.at(counts, (row_idx, hours, days, bands), 1)
+            self._state = (rows, sums, counts)
+        logger.info(f"History index: added {len(values)} rows, {len(rows)} stations")
+
+    def profile(self, station_id, days=None, bands=None):
+        """
+        Return (means, counts) over the 24 hours for a station, restricted to
+        the given days of week and temperature band indexes (all if None).
+        Returns None if the station has no history at all.
+        """
+        rows, sums, counts = self._state
+        row = rows.get(int(station_id))
+        if row is None:
+            return None
+        sums, counts = sums[row], counts[row]
+        if not counts.any():
+            return None
+        if days is not None:
+            sums, counts = sums[:, list(days)], counts[:, list(days)]
+        if bands is not None:
+            sums, counts = sums[:, :, list(bands)], counts[:, :, list(bands)]
+        sums = sums.sum(axis=(1, 2))
+        counts = counts.sum(axis=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        return means, counts
+
+    def __len__(self):
+        return len(self._state[0])
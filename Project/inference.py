@@ -0,0 +1,178 @@
+import logging
+import warnings
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How closely the compiled model must agree with model.predict
+VERIFY_RTOL = 1e-7
+VERIFY_ATOL = 1e-6
+VERIFY_SAMPLE_SIZE = 64
+
+
+class PipelineModel:
+    """Fallback engine that runs the full sklearn pipeline"""
+
+    compiled = False
+
+    def __init__(self, model, columns):
+        self.model = model
+        self.columns = columns
+
+    def predict(self, features):
+        """
+        Predict from a dict of column name -> values. Rows the model rejects
+        (e.g. unknown categories) come back as NaN instead of failing the batch.
+        """
+        import pandas as pd
+
+        input_df = pd.DataFrame({name: features[name] for name in self.columns}, columns=self.columns)
+        try:
+            return np.asarray(self.model.predict(input_df), dtype=float)
+        except ValueError as e:
+            if len(input_df) == 1:
+                raise
+            logger.warning(f"Batch prediction failed, retrying per row: {str(e)}")
+
+        results = np.full(len(input_df), np.nan)
+        for i in range(len(input_df)):
+            try:
+                results[i] = self.model.predict(input_df.iloc[[i]])[0]
+            except ValueError:
+                pass
+        return results
+
+
+class CompiledModel:
+    """
+    Linear model flattened into an intercept, a numeric weight vector and one
+    category -> weight lookup per one-hot encoded column. Scoring a row is a
+    dot product plus a few array lookups, with no pandas or sklearn involved.
+    """
+
+    compiled = True
+
+    def __init__(self, model, intercept, numeric_columns, numeric_weights, categorical):
+        self.model = model
+        self.intercept = float(intercept)
+        self.numeric_columns = numeric_columns
+        self.numeric_weights = np.asarray(numeric_weights, dtype=float)
+        # column -> (category -> code dict, weights by code, reject unknown)
+        self.categorical = categorical
+
+    def predict(self, features):
+        """Predict from a dict of column name -> values, NaN for unknown categories"""
+        n = len(next(iter(features.values())))
+        result = np.full(n, self.intercept)
+
+        if self.numeric_columns:
+            numeric = np.column_stack([np.asarray(features[name], dtype=float) for name in self.numeric_columns])
+            result += numeric @ self.numeric_weights
+
+        for name, (codes, weights, reject_unknown) in self.categorical.items():
+            idx = np.fromiter((codes.get(str(value), -1) for value in features[name]), dtype=np.intp, count=n)
+            unknown = idx < 0
+            # Unknown categories contribute nothing, like handle_unknown='ignore'
+            result += np.where(unknown, 0.0, weights[idx])
+            if reject_unknown and unknown.any():
+                result[unknown] = np.nan
+
+        return result
+
+
+def _compile_pipeline(model):
+    """Extract coefficients from a ColumnTransformer/OneHotEncoder + LinearRegression pipeline"""
+    from sklearn.pipeline import Pipeline
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder
+    from sklearn.linear_model import LinearRegression
+
+    if not isinstance(model, Pipeline) or len(model.steps) != 2:
+        raise TypeError(f"Unsupported model type: {type(model).__name__}")
+    preprocessor, regressor = model.steps[0][1], model.steps[1][1]
+    if not isinstance(preprocessor, ColumnTransformer) or not isinstance(regressor, LinearRegression):
+        raise TypeError("Expected ColumnTransformer followed by LinearRegression")
+
+    coef = np.asarray(regressor.coef_, dtype=float)
+    if coef.ndim != 1:
+        raise TypeError("Multi-output regressors are not supported")
+
+    input_names = list(preprocessor.feature_names_in_)
+    numeric_columns = []
+    numeric_weights = []
+    categorical = {}
+
+    # Older sklearn warns that remainder columns are stored as indices
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)
+        transformers = preprocessor.transformers_
+
+    for name, transformer, columns in transformers:
+        if transformer == 'drop':
+            continue
+        out = preprocessor.output_indices_[name]
+        weights = coef[out]
+        columns = [input_names[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+
+        if transformer == 'passthrough' or (name == 'remainder' and preprocessor.remainder == 'passthrough'):
+            numeric_columns.extend(columns)
+            numeric_weights.extend(weights)
+        elif isinstance(transformer, OneHotEncoder):
+            if transformer.min_frequency is not None or transformer.max_categories is not None:
+                raise TypeError("Infrequent category grouping is not supported")
+            offset = 0
+            for i, column in enumerate(columns):
+                categories = transformer.categories_[i]
+                drop = transformer.drop_idx_[i] if transformer.drop_idx_ is not None else None
+                column_weights = np.zeros(len(categories))
+                for code in range(len(categories)):
+                    if code == drop:
+                        continue
+                    column_weights[code] = weights[offset]
+                    offset += 1
+                codes = {str(category): code for code, category in enumerate(categories)}
+                categorical[column] = (codes, column_weights, transformer.handle_unknown == 'error')
+        else:
+            raise TypeError(f"Unsupported transformer: {type(transformer).__name__}")
+
+    return CompiledModel(model, regressor.intercept_, numeric_columns, numeric_weights, categorical)
+
+
+def _verification_sample(engine, size=VERIFY_SAMPLE_SIZE):
+    """Build a deterministic sample that covers categories from across each lookup"""
+    rng = np.random.default_rng(0)
+    features = {}
+    for name in engine.numeric_columns:
+        features[name] = rng.uniform(0, 1000, size)
+    for name, (codes, _, _) in engine.categorical.items():
+        categories = list(codes)
+        features[name] = [categories[i] for i in np.linspace(0, len(categories) - 1, size).astype(int)]
+    return features
+
+
+def verify(engine, model, columns):
+    """Check the compiled engine against model.predict on a sample, return max abs error"""
+    sample = _verification_sample(engine)
+    expected = PipelineModel(model, columns).predict({name: sample.get(name, np.zeros(VERIFY_SAMPLE_SIZE)) for name in columns})
+    actual = engine.predict(sample)
+    if not np.allclose(actual, expected, rtol=VERIFY_RTOL, atol=VERIFY_ATOL):
+        raise ValueError(f"Compiled model disagrees with pipeline (max error {np.nanmax(np.abs(actual - expected))})")
+    return float(np.max(np.abs(actual - expected)))
+
+
+def compile_model(model, columns):
+    """
+    Compile the model into a coefficient lookup engine if possible, otherwise
+    wrap it so predictions go through the full pipeline. `columns` are the
+    feature columns the app builds for the fallback path.
+    """
+    try:
+        engine = _compile_pipeline(model)
+        error = verify(engine, model, columns)
+        logger.info(f"Compiled model: {len(engine.numeric_columns)} numeric weights, "
+                    f"{sum(len(c[0]) for c in engine.categorical.values())} category weights, "
+                    f"max error {error:.2e}")
+        return engine
+    except Exception as e:
+        logger.warning(f"Using full pipeline for predictions: {str(e)}")
+        return PipelineModel(model, columns)
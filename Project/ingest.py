@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from Project.upstream import UpstreamStats
+
+logger = logging.getLogger(__name__)
+
+
+class IngestEngine:
+    """
+    Polls many JCDecaux contracts at once. Each poll fetches every contract
+    concurrently, at most `concurrency` at a time, and returns the stations
+    of each contract that answered; a failing contract is logged and left
+    out without holding up the others.
+
+    fetch(contract) is a blocking call returning the contract's stations.
+    It runs in a worker thread, so the engine can use the shared pooled
+    client (with its retries and host stats) rather than a second HTTP
+    stack.
+    """
+
+    def __init__(self, fetch, contracts, concurrency=8):
+        self.fetch = fetch
+        self.contracts = list(contracts)
+        self.concurrency = concurrency
+        self.polls = 0
+        self.last_duration = None
+        # The same counters the HTTP client keeps per host, here per contract
+        self._stats = {contract: UpstreamStats() for contract in self.contracts}
+        self._stations = {contract: 0 for contract in self.contracts}
+
+    async def _fetch(self, executor, semaphore, contract):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                stations = await asyncio.get_running_loop().run_in_executor(executor, self.fetch, contract)
+            except Exception as e:
+                self._stats[contract].record(time.perf_counter() - started, error=True)
+                logger.warning(f"Fetching contract {contract} failed: {str(e)}")
+                return contract, None
+            self._stats[contract].record(time.perf_counter() - started, error=False)
+            self._stations[contract] = len(stations)
+            return contract, stations
+
+    async def poll_async(self):
+        """{contract: stations} for every contract fetched successfully"""
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Sized to the limit, the loop's default executor can be smaller
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ingest') as executor:
+            results = await asyncio.gather(*(self._fetch(executor, semaphore, contract) for contract in self.contracts))
+        self.polls += 1
+        self.last_duration = time.perf_counter() - started
+        return {contract: stations for contract, stations in results if stations is not None}
+
+    def poll(self):
+        """Run one poll from synchronous code"""
+        return asyncio.run(self.poll_async())
+
+    def stats(self):
+        return {
+            'polls': self.polls,
+            'concurrency': self.concurrency,
+            'last_poll_ms': round(1000 * self.last_duration, 1) if self.last_duration is not None else None,
+            'contracts': {
+                contract: dict(stats.as_dict(), stations=self._stations[contract])
+                for contract, stats in self._stats.items()
+            },
+        }
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+logger = logging.getLogger(__name__)
+
+# Every memoized function, so their stats can be reported together
+registry = {}
+
+
+class LocalBackend:
+    """In-process LRU store where every entry carries its own expiry time"""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def generation(self, prefix):
+        return self._generations.get(prefix, 0)
+
+    def bump_generation(self, prefix):
+        with self._lock:
+            self._generations[prefix] = self._generations.get(prefix, 0) + 1
+            self._entries.clear()
+
+
+class CachelibBackend:
+    """
+    Adapter for a cachelib/flask_caching cache (e.g. the app's `cache`), so
+    memoized values can live in a store shared between workers. Expiry and
+    eviction are left to the underlying cache.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        # Values are wrapped so a cached None can be told apart from a miss
+        entry = self.cache.get(key)
+        if entry is None:
+            return False, None
+        return True, entry[0]
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, (value,), timeout=max(1, int(ttl)))
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    def size(self):
+        # Not tracked for shared caches
+        return None
+
+    # The generation lives in the shared cache so invalidation reaches every worker
+    def generation(self, prefix):
+        return self.cache.get(f"{prefix}:generation") or 0
+
+    def bump_generation(self, prefix):
+        self.cache.set(f"{prefix}:generation", self.generation(prefix) + 1, timeout=0)
+
+
+class Memoized:
+    """Bookkeeping behind a @ttl_cache function"""
+
+    def __init__(self, f, ttl, backend, key_prefix, cache_none):
+        self.f = f
+        self.ttl = ttl
+        self.backend = backend
+        self.key_prefix = key_prefix
+        self.cache_none = cache_none
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, args, kwargs):
+        # The generation is bumped by invalidate_all, so old entries are never read again
+        generation = self.backend.generation(self.key_prefix)
+        return f"{self.key_prefix}:{generation}:{args!r}:{sorted(kwargs.items())!r}"
+
+    def __call__(self, *args, **kwargs):
+        key = self.key(args, kwargs)
+        found, value = self.backend.get(key)
+        if found:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = self.f(*args, **kwargs)
+        if value is not None or self.cache_none:
+            ttl = self.ttl(value) if callable(self.ttl) else self.ttl
+            if ttl > 0:
+                self.backend.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *args, **kwargs):
+        """Drop the cached result for one set of arguments"""
+        self.backend.delete(self.key(args, kwargs))
+
+    def invalidate_all(self):
+        """Drop every cached result of this function"""
+        self.backend.bump_generation(self.key_prefix)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': self.backend.evictions,
+            'expirations': self.backend.expirations,
+            'size': self.backend.size(),
+        }
+
+
+def ttl_cache(ttl, maxsize=128, backend=None, key_prefix=None, cache_none=False):
+    """
+    Memoize a function with a per-entry TTL. `ttl` is seconds, or a function
+    of the result returning seconds. Results are kept in an in-process LRU of
+    `maxsize` entries unless another backend is given. None results are not
+    cached unless cache_none is set, so failures are retried.
+
+    The wrapped function gets invalidate(*args), invalidate_all() and stats().
+    """
+    def decorator(f):
+        name = key_prefix or f"{f.__module__}.{f.__qualname__}"
+        memo = Memoized(f, ttl, backend if backend is not None else LocalBackend(maxsize), name, cache_none)
+        registry[name] = memo
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return memo(*args, **kwargs)
+
+        wrapper.invalidate = memo.invalidate
+        wrapper.invalidate_all = memo.invalidate_all
+        wrapper.stats = memo.stats
+        wrapper.memo = memo
+        return wrapper
+    return decorator
+
+
+def all_stats():
+    """Stats for every memoized function"""
+    return {name: memo.stats() for name, memo in registry.items()}
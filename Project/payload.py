@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import json
+import threading
+
+# Bodies smaller than this are not worth compressing
+MIN_GZIP_SIZE = 512
+
+
+def content_etag(body):
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+class EncodedPayload:
+    """
+    A response body serialized and gzip-compressed once, with an ETag taken
+    from a hash of its content, so repeat requests cost no JSON encoding or
+    compression at all.
+    """
+
+    def __init__(self, body, mimetype='application/json'):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = content_etag(body)
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= MIN_GZIP_SIZE else None
+        # Only keep the compressed copy if it actually saves something
+        self.gzipped = compressed if compressed is not None and len(compressed) < len(body) else None
+
+    @classmethod
+    def from_data(cls, data):
+        """Encode a JSON-serializable value"""
+        return cls(encode(data))
+
+    def respond(self, request, response_class, status=200):
+        """
+        Build the response for a request: 304 if it already has this ETag,
+        otherwise the gzipped body if the client accepts gzip, else the plain
+        body.
+        """
+        if status == 200 and self.etag in request.if_none_match:
+            response = response_class(status=304)
+        elif self.gzipped is not None and request.accept_encodings['gzip']:
+            response = response_class(self.gzipped, status=status, mimetype=self.mimetype)
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = response_class(self.body, status=status, mimetype=self.mimetype)
+        response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+class PayloadCache:
+    """
+    Keeps the encoded payload of each named resource until its version
+    changes. A new version whose content is byte-identical keeps the old
+    payload, so its ETag (and clients' conditional requests) survive a
+    refresh that changed nothing.
+    """
+
+    def __init__(self):
+        self._payloads = {}
+        self._lock = threading.Lock()
+        self.encodes = 0
+        self.reuses = 0
+        self.unchanged = 0
+
+    def get(self, name, version, build):
+        """Encoded payload for `name` at `version`, calling build() only when the version is new"""
+        entry = self._payloads.get(name)
+        if entry is not None and entry[0] == version:
+            self.reuses += 1
+            return entry[1]
+        body = encode(build())
+        if entry is not None and entry[1].etag == content_etag(body):
+            # Same content under a new version: skip compressing it again
+            payload = entry[1]
+            self.unchanged += 1
+        else:
+            payload = EncodedPayload(body)
+            self.encodes += 1
+        with self._lock:
+            self._payloads[name] = (version, payload)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._payloads = {}
+
+    def stats(self):
+        return {'encodes': self.encodes, 'reuses': self.reuses, 'unchanged': self.unchanged, 'payloads': len(self._payloads)}
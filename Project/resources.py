@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Every lazily loaded resource, so they can be warmed up and reported together
+registry = {}
+
+# Filled in by the app once its module has been imported
+import_seconds = None
+
+
+class LazyResource:
+    """
+    A value that is loaded on first use (or by warmup) and then kept. The
+    loader runs once even if several threads ask at the same time, and the
+    time it took is recorded for the startup report.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.value = None
+        self.loaded = False
+        self.seconds = None
+        self.loaded_at = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.loaded:
+            return self.value
+        with self._lock:
+            if not self.loaded:
+                started = time.perf_counter()
+                try:
+                    self.value = self.loader()
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Error loading {self.name}: {str(e)}")
+                    self.value = None
+                self.seconds = time.perf_counter() - started
+                self.loaded_at = time.time()
+                self.loaded = True
+                logger.info(f"Loaded {self.name} in {self.seconds:.3f}s")
+        return self.value
+
+    def reset(self):
+        """Forget the loaded value so the next get() loads it again"""
+        with self._lock:
+            self.value = None
+            self.loaded = False
+            self.seconds = None
+            self.loaded_at = None
+            self.error = None
+
+    def stats(self):
+        return {
+            'loaded': self.loaded,
+            'seconds': round(self.seconds, 4) if self.seconds is not None else None,
+            'error': self.error,
+        }
+
+
+def lazy(name, loader):
+    """Register a lazily loaded resource"""
+    resource = LazyResource(name, loader)
+    registry[name] = resource
+    return resource
+
+
+def warmup(names=None):
+    """Load the given resources (all by default) now rather than on first use"""
+    started = time.perf_counter()
+    for name in names or list(registry):
+        registry[name].get()
+    elapsed = time.perf_counter() - started
+    logger.info(f"Warmup finished in {elapsed:.3f}s")
+    return elapsed
+
+
+def report():
+    """How long importing the app and loading each resource took"""
+    return {
+        'import_seconds': round(import_seconds, 4) if import_seconds is not None else None,
+        'resources': {name: resource.stats() for name, resource in registry.items()},
+    }
@@ -0,0 +1,129 @@
+import logging
+import math
+import signal
+import threading
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Timing stats for one scheduled function"""
+
+    def __init__(self, name, interval):
+        self.name = name
+        self.interval = interval
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.busy_seconds = 0.0
+        self.last_duration = None
+        self.max_duration = 0.0
+
+    def record(self, duration):
+        self.runs += 1
+        self.busy_seconds += duration
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+    def stats(self):
+        mean = self.busy_seconds / self.runs if self.runs else None
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed': self.missed,
+            'mean_duration': round(mean, 3) if mean is not None else None,
+            'max_duration': round(self.max_duration, 3),
+            # Share of each interval spent working
+            'utilisation': round(mean / self.interval, 3) if mean is not None else None,
+        }
+
+
+class Scheduler:
+    """
+    Runs functions on wall-clock-aligned intervals: a job every 300s runs at
+    :00, :05, :10..., however long each run takes, instead of drifting by
+    its run time as `sleep(300)` after each run does. A run that overruns
+    its interval skips the ticks it overlapped, which are counted as
+    missed. Exceptions are counted and logged and the job keeps going.
+
+    Every job stops at its next tick once stop() is called, so the threads
+    running them can be joined.
+    """
+
+    def __init__(self, stop_event=None, clock=time.time):
+        self.stop_event = stop_event or threading.Event()
+        self.clock = clock
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def next_tick(self, interval, now):
+        """Index of the first multiple of interval after now"""
+        return math.floor(now / interval) + 1
+
+    def run_every(self, interval, func, name=None, run_now=True):
+        """
+        Call func every interval seconds from the calling thread until
+        stop() is called. With run_now the first call is made straight
+        away rather than at the first aligned tick.
+        """
+        name = name or getattr(func, '__name__', 'job')
+        job = Job(name, interval)
+        with self._lock:
+            self.jobs[name] = job
+
+        # Ticks are counted as whole multiples of the interval, so missed
+        # ticks are exact however large the timestamps get
+        tick = self.next_tick(interval, self.clock())
+        if run_now:
+            tick -= 1
+        while not self.stop_event.wait(max(0, tick * interval - self.clock())):
+            started = time.perf_counter()
+            try:
+                func()
+            except Exception:
+                job.errors += 1
+                logger.error(f"Scheduled job {name} failed: {traceback.format_exc()}")
+            job.record(time.perf_counter() - started)
+
+            # The wait can wake a moment early, never run the same tick twice
+            next_tick = max(self.next_tick(interval, self.clock()), tick + 1)
+            # Ticks that passed while the job was running
+            job.missed += max(0, next_tick - tick - 1)
+            tick = next_tick
+        return job
+
+    def wait(self, duration=None):
+        """Block until duration seconds have passed (None for ever) or stop() is called"""
+        return self.stop_event.wait(duration)
+
+    def run(self, targets, duration=None):
+        """
+        Run each target (typically a function calling run_every) in its own
+        thread for duration seconds, or until stop() is called, then stop
+        them and wait for them to finish. Returns the job stats.
+        """
+        threads = [threading.Thread(target=target, daemon=True) for target in targets]
+        for thread in threads:
+            thread.start()
+        self.wait(duration)
+        self.stop()
+        for thread in threads:
+            thread.join()
+        return self.stats()
+
+    def stop_on_signals(self, signals=(signal.SIGINT, signal.SIGTERM)):
+        """Stop cleanly on Ctrl-C or a kill, must be called from the main thread"""
+        for signum in signals:
+            signal.signal(signum, lambda *_: self.stop())
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stopped(self):
+        return self.stop_event.is_set()
+
+    def stats(self):
+        return {name: job.stats() for name, job in self.jobs.items()}
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight call that other callers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key: the first caller runs the
+    function and everyone who arrives while it is running waits and shares
+    its result (or its exception).
+
+    With lock_dir set, callers that pass a `check` function are also
+    coalesced across worker processes. The leader in each process takes a
+    file lock for the key, and once it has the lock calls `check` to see if
+    another worker already produced the value (e.g. in a shared cache)
+    before running the function itself.
+    """
+
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.coalesced_across_workers = 0
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key, fn, check=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run(key, fn, check)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _run(self, key, fn, check):
+        if not self.lock_dir or check is None:
+            self._count_execution()
+            return fn()
+
+        with self._file_lock(key):
+            result = check()
+            if result is not None:
+                with self._lock:
+                    self.coalesced_across_workers += 1
+                return result
+            self._count_execution()
+            return fn()
+
+    def _count_execution(self):
+        with self._lock:
+            self.executions += 1
+
+    @contextmanager
+    def _file_lock(self, key):
+        import fcntl
+
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        with open(os.path.join(self.lock_dir, f"{name}.lock"), 'a+') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self):
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'coalesced_across_workers': self.coalesced_across_workers,
+            'in_flight': len(self._calls),
+        }
+
+    def reset(self):
+        """Forget in-flight calls, whose leaders are not running in this process"""
+        self._lock = threading.Lock()
+        self._calls = {}
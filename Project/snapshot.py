@@ -0,0 +1,76 @@
+import logging
+from Project.swr import SWRCache
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'station_snapshot'
+
+
+class SnapshotUnavailable(Exception):
+    """Raised when there is no snapshot young enough to serve"""
+
+
+class StationSnapshot:
+    """
+    In-process copy of every station in the contract, refreshed by a single
+    bulk JCDecaux call and indexed by station number.
+
+    max_age is how old the snapshot may get before a read triggers a refresh.
+    The refresh runs in the background while the old snapshot keeps being
+    served, until it is max_stale old; after that reads wait for the refresh
+    and fail if it does not work.
+    """
+
+    def __init__(self, fetch, max_age=60, max_stale=600, flight=None, entries=None):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.max_stale = max_stale
+        self.cache = SWRCache(soft_ttl=max_age, hard_ttl=max_stale, flight=flight, entries=entries)
+
+    def _load(self):
+        indexed = {station['number']: station for station in self.fetch()}
+        logger.info(f"Station snapshot loaded {len(indexed)} stations")
+        return indexed
+
+    def _entry(self):
+        try:
+            return self.cache.get_entry(SNAPSHOT_KEY, self._load)
+        except Exception as e:
+            raise SnapshotUnavailable(f"No usable station snapshot: {str(e)}")
+
+    def _stations(self):
+        return self._entry()[0]
+
+    def age(self):
+        """Seconds since the snapshot was fetched, None if it never was"""
+        return self.cache.age(SNAPSHOT_KEY)
+
+    def fetched_at(self):
+        """When the snapshot was fetched as a UNIX timestamp, None if it never was"""
+        return self.cache.fetched_at(SNAPSHOT_KEY)
+
+    def refresh(self, force=False):
+        """Fetch the bulk station list now if forced, otherwise only if it is due"""
+        if force:
+            self.cache.refresh(SNAPSHOT_KEY, self._load)
+        else:
+            self._stations()
+
+    def get(self, number):
+        """Return the raw station record for a station number, or None"""
+        return self._stations().get(number)
+
+    def all(self):
+        """Return every raw station record"""
+        return list(self._stations().values())
+
+    def snapshot(self):
+        """
+        (every raw station record, UNIX time they were fetched), both from
+        the same snapshot even if a refresh replaces it in between
+        """
+        indexed, fetched_at = self._entry()
+        return list(indexed.values()), fetched_at
+
+    def clear(self):
+        self.cache.clear()
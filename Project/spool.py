@@ -0,0 +1,249 @@
+import fcntl
+import gzip
+import json
+import logging
+import os
+import random
+import re
+import threading
+import zlib
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r'^segment-(\d+)\.ndjson\.gz$')
+CHECKPOINT = 'checkpoint.json'
+LOCK = 'spool.lock'
+QUARANTINE = 'quarantine.ndjson'
+
+# Compressed bytes fed to the decompressor at a time. Feeding a whole
+# segment would copy everything after each record into unused_data.
+READ_CHUNK = 16 * 1024
+
+
+class SpoolLocked(Exception):
+    """Raised when another process already has the spool open"""
+
+
+def segment_name(seq):
+    return f"segment-{seq:08d}.ndjson.gz"
+
+
+class Spool:
+    """
+    Local append-only log of records (e.g. one scraper poll each), kept as
+    numbered gzip-compressed NDJSON segments in `directory`.
+
+    Every append is written as its own gzip member and fsynced, so a record
+    is on disk before append returns, and a crash can at worst leave a
+    truncated member at the end of a segment. Readers stop there, and a
+    restarted spool always begins a new segment so nothing is ever
+    appended after a damaged tail. A segment is sealed once it reaches
+    `segment_bytes`.
+
+    The checkpoint records the segment and byte offset of the next record
+    to load, so a SpoolFlusher seeks straight to it and carries on where it
+    stopped. Records that can never be loaded are set aside in a
+    quarantine file.
+
+    Only one process may have a spool open at a time: it holds an exclusive
+    lock on the directory until close(), and anyone else gets SpoolLocked.
+    Otherwise a second process would take the first one's active segment
+    for sealed, load it and delete it while records are still appended.
+    """
+
+    def __init__(self, directory, segment_bytes=8 * 1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, LOCK), 'a')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            raise SpoolLocked(f"Spool {directory} is in use by another process")
+        existing = [int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(directory)) if m]
+        self._seq = max(existing, default=0) + 1
+        self.appended = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        """Name of the segment being appended to"""
+        return segment_name(self._seq)
+
+    def append(self, record):
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode()
+        member = gzip.compress(line)
+        with self._lock:
+            path = os.path.join(self.directory, self.active)
+            with open(path, 'ab') as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            self.appended += 1
+            if size >= self.segment_bytes:
+                self._seq += 1
+
+    def segments(self):
+        """Segment names, oldest first"""
+        return sorted(name for name in os.listdir(self.directory) if SEGMENT_PATTERN.match(name))
+
+    def entries(self, name, offset=0):
+        """
+        [(record, offset of the next record)] for the records in a segment
+        from byte `offset` on, up to any damaged tail
+        """
+        with self._lock:
+            with open(os.path.join(self.directory, name), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        entries = []
+        view = memoryview(data)
+        pos = 0
+        try:
+            while pos < len(data):
+                # One gzip member per record. eof is only set once the
+                # member's CRC and length trailer have been checked.
+                member = zlib.decompressobj(wbits=31)
+                parts = []
+                while not member.eof:
+                    if pos >= len(data):
+                        # A record cut short by a crash
+                        raise EOFError
+                    chunk = view[pos:pos + READ_CHUNK]
+                    parts.append(member.decompress(chunk))
+                    pos += len(chunk) - len(member.unused_data)
+                entries.append((json.loads(b''.join(parts)), offset + pos))
+        except (EOFError, ValueError, zlib.error):
+            logger.warning(f"Spool segment {name} ends in a damaged record at byte {offset + pos}")
+        return entries
+
+    def read(self, name, offset=0):
+        """Records in a segment from byte `offset` on, up to any damaged tail"""
+        return [record for record, _ in self.entries(name, offset)]
+
+    def remove(self, name):
+        os.remove(os.path.join(self.directory, name))
+
+    def checkpoint(self):
+        """(segment, byte offset of the next record to load in it), or (None, 0)"""
+        try:
+            with open(os.path.join(self.directory, CHECKPOINT)) as f:
+                data = json.load(f)
+            return data['segment'], data['offset']
+        except (OSError, ValueError, KeyError):
+            return None, 0
+
+    def save_checkpoint(self, segment, offset):
+        # Written to a temporary file and renamed, so it is never half written
+        path = os.path.join(self.directory, CHECKPOINT)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'segment': segment, 'offset': offset}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def quarantine(self, record, error):
+        """Set aside a record that cannot be loaded, with the reason, for someone to look at"""
+        line = json.dumps({'error': error, 'record': record}, separators=(',', ':')) + '\n'
+        with self._lock:
+            with open(os.path.join(self.directory, QUARANTINE), 'a') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        """Release the spool for other processes"""
+        if not self._lock_file.closed:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+
+    def stats(self):
+        segments = self.segments()
+        return {
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(os.path.join(self.directory, name)) for name in segments),
+            'appended': self.appended,
+        }
+
+
+class SpoolFlusher:
+    """
+    Loads spooled records into the database through write(record), oldest
+    first, saving the checkpoint after each one. Sealed segments are
+    deleted once loaded.
+
+    When write raises one of `retry_on` (the database is down, say) the
+    flusher waits with jittered exponential backoff, up to max_backoff
+    seconds, and tries again; the records stay in the spool meanwhile. Any
+    other error means the record itself is bad, so it is quarantined and
+    skipped rather than holding up everything behind it. Delivery is at
+    least once: a crash between a write and its checkpoint loads that
+    record again.
+    """
+
+    def __init__(self, spool, write, interval=10, backoff=1, max_backoff=300, retry_on=(OSError,)):
+        self.spool = spool
+        self.write = write
+        self.interval = interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+        self.flushed = 0
+        self.quarantined = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    def flush_once(self):
+        """Load everything spooled so far. Returns the number of records loaded."""
+        flushed = 0
+        checkpoint_segment, checkpoint_offset = self.spool.checkpoint()
+        for name in self.spool.segments():
+            # Only a segment sealed before reading it can be finished with
+            sealed = name != self.spool.active
+            offset = checkpoint_offset if name == checkpoint_segment else 0
+            for record, next_offset in self.spool.entries(name, offset):
+                try:
+                    self.write(record)
+                    flushed += 1
+                    self.flushed += 1
+                except self.retry_on:
+                    raise
+                except Exception as e:
+                    self.quarantined += 1
+                    self.spool.quarantine(record, f"{type(e).__name__}: {e}")
+                    logger.error(f"Quarantined a spooled record from {name} that failed to load: {type(e).__name__}: {e}")
+                self.spool.save_checkpoint(name, next_offset)
+            if sealed:
+                self.spool.remove(name)
+        return flushed
+
+    def run(self, stop_event):
+        """Flush every interval until stop_event is set, backing off while writes fail"""
+        while not stop_event.is_set():
+            try:
+                flushed = self.flush_once()
+                if flushed:
+                    logger.info(f"Flushed {flushed} spooled records")
+                self.consecutive_failures = 0
+                delay = self.interval
+            except Exception as e:
+                self.failures += 1
+                self.consecutive_failures += 1
+                self.last_error = str(e)
+                # Full jitter: anywhere up to the exponential backoff
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** self.consecutive_failures))
+                logger.warning(f"Spool flush failed ({self.consecutive_failures} in a row), retrying in {delay:.1f}s: {str(e)}")
+            stop_event.wait(delay)
+
+    def stats(self):
+        return {
+            'flushed': self.flushed,
+            'quarantined': self.quarantined,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'spool': self.spool.stats(),
+        }
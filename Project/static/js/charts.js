@@ -377,9 +377,22 @@ const ChartsModule = (function() {
     });
   }
   
+  // Build the history query string from optional filters
+  // (dow: 0-6, day_type: weekday/weekend, temp_band: cold/cool/mild/warm)
+  function historyQuery(filters) {
+    const params = new URLSearchParams();
+    Object.entries(filters || {}).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== "") {
+        params.set(key, value);
+      }
+    });
+    const query = params.toString();
+    return query ? `?${query}` : "";
+  }
+
   // Get cached data if available and not expired
-  function getCachedData(stationId) {
-    const cached = dataCache.get(stationId);
+  function getCachedData(cacheKey) {
+    const cached = dataCache.get(cacheKey);
     if (cached && Date.now() - cached.timestamp < CACHE_EXPIRY) {
       return cached.data;
     }
@@ -387,16 +400,18 @@ const ChartsModule = (function() {
   }
 
   // Update cache with new data
-  function updateCache(stationId, data) {
-    dataCache.set(stationId, {
+  function updateCache(cacheKey, data) {
+    dataCache.set(cacheKey, {
       data: data,
       timestamp: Date.now()
     });
   }
 
   // Fetch station data
-  function fetchStationData(stationId) {
-    const cachedData = getCachedData(stationId);
+  function fetchStationData(stationId, filters) {
+    const query = historyQuery(filters);
+    const cacheKey = `${stationId}${query}`;
+    const cachedData = getCachedData(cacheKey);
     
     // If we have valid cached data, use it immediately
     if (cachedData) {
@@ -408,7 +423,7 @@ const ChartsModule = (function() {
     showLoadingState();
     
     // Fetch fresh data
-    fetch(`/api/station/${stationId}/history`)
+    fetch(`/api/station/${stationId}/history${query}`)
       .then(response => {
         if (!response.ok) throw new Error('Network response was not ok');
         return response.json();
@@ -419,7 +434,7 @@ const ChartsModule = (function() {
         }
         
         // Update cache with fresh data
-        updateCache(stationId, data);
+        updateCache(cacheKey, data);
         
         // Update the charts
         updateChartsWithData(data);
@@ -459,9 +474,9 @@ const ChartsModule = (function() {
   }
   
   // Update charts with station data
-  const updateCharts = debounce(function(stationId) {
+  const updateCharts = debounce(function(stationId, filters) {
     currentStationId = stationId;
-    fetchStationData(stationId);
+    fetchStationData(stationId, filters);
   }, 300);
   
   // Public API
@@ -1,33 +1,53 @@
 const StationsModule = (function () {
   let stationData = [];
   const AVAILABILITY_CACHE = {};
-  const PENDING_REQUESTS = {};
   const CACHE_EXPIRY = 5 * 60 * 1000; // 5 minutes in milliseconds
-  const MAX_CONCURRENT_REQUESTS = 6; // Match browser limits
-  const REQUEST_QUEUE = [];
-  let activeRequests = 0;
+  // Fields needed to refresh availability without re-sending station details
+  const AVAILABILITY_FIELDS = "number,available_bikes,available_bike_stands,last_update";
+  let pendingRefresh = null;
   let refreshInterval = null;
-  let isProcessingQueue = false;
+  let availabilityStream = null;
+
+  // Fetch every station with its live availability in a single request
+  async function fetchLiveStations(fields) {
+    const query = fields ? `?fields=${fields}` : "";
+    const response = await fetch(`/api/stations/live${query}`);
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    const data = await response.json();
+    return data.stations || [];
+  }
+
+  // Store the availability part of live station rows in the cache
+  function cacheAvailability(stations) {
+    const timestamp = Date.now();
+    stations.forEach((station) => {
+      AVAILABILITY_CACHE[station.number] = {
+        data: {
+          available_bikes: station.available_bikes,
+          available_bike_stands: station.available_bike_stands,
+          last_update: station.last_update,
+        },
+        timestamp,
+      };
+    });
+  }
 
   // Load station data from API
   async function loadStations() {
     try {
-      const response = await fetch("/stations");
-      if (!response.ok) throw new Error(`HTTP ${response.status}`);
-
-      const data = await response.json();
-      stationData = data.stations || [];
+      stationData = await fetchLiveStations();
 
       if (stationData.length === 0) {
         throw new Error("No station data available");
       }
 
+      // The same response carries availability for every station
+      cacheAvailability(stationData);
+
       // Add markers for initially visible stations only
       if (window.MapModule) {
         const initialStations = stationData.slice(0, 50);
         window.MapModule.addMarkers(initialStations);
-        // Only load availability for visible stations
-        await loadStationsAvailability(initialStations.map((s) => s.number));
       }
 
       if (window.UIModule) {
@@ -35,7 +55,7 @@ const StationsModule = (function () {
         window.UIModule.setupStationSearch();
       }
 
-      // Set up periodic refresh for visible stations
+      // Set up periodic refresh of availability
       setupPeriodicRefresh();
 
       return stationData;
@@ -46,155 +66,89 @@ const StationsModule = (function () {
     }
   }
 
-  // Process the request queue
-  async function processQueue() {
-    if (isProcessingQueue || REQUEST_QUEUE.length === 0) return;
-    
-    isProcessingQueue = true;
-    
-    try {
-      while (REQUEST_QUEUE.length > 0 && activeRequests < MAX_CONCURRENT_REQUESTS) {
-        const process = REQUEST_QUEUE.shift();
-        activeRequests++;
-        
-        try {
-          await process();
-        } catch (error) {
-          console.warn("Error processing request:", error);
-        } finally {
-          activeRequests--;
-        }
-      }
-    } finally {
-      isProcessingQueue = false;
-      
-      // If there are still items in the queue, schedule another processing run
-      if (REQUEST_QUEUE.length > 0) {
-        setTimeout(processQueue, 10);
-      }
-    }
-  }
-
-  async function throttledFetch(url, stationId) {
-    // Return existing promise if this station request is already in progress
-    if (stationId && PENDING_REQUESTS[stationId]) {
-      return PENDING_REQUESTS[stationId];
-    }
-
-    const fetchPromise = new Promise((resolve) => {
-      const process = async () => {
-        try {
-          const response = await fetch(url);
-          resolve(response.ok ? await response.json() : null);
-        } catch (error) {
-          console.warn(`Error fetching ${url}:`, error);
-          resolve(null);
-        } finally {
-          if (stationId) delete PENDING_REQUESTS[stationId];
-        }
-      };
-
-      if (activeRequests < MAX_CONCURRENT_REQUESTS) {
-        activeRequests++;
-        process().finally(() => {
-          activeRequests--;
-          processQueue();
+  // Refresh availability for all stations with one request, shared by concurrent callers
+  function refreshAvailability() {
+    if (!pendingRefresh) {
+      pendingRefresh = fetchLiveStations(AVAILABILITY_FIELDS)
+        .then(cacheAvailability)
+        .catch((error) => {
+          console.warn("Error refreshing availability:", error);
+        })
+        .finally(() => {
+          pendingRefresh = null;
         });
-      } else {
-        REQUEST_QUEUE.push(process);
-        processQueue();
-      }
-    });
-
-    if (stationId) {
-      PENDING_REQUESTS[stationId] = fetchPromise;
     }
+    return pendingRefresh;
+  }
 
-    return fetchPromise;
+  function isFresh(station_id) {
+    const cached = AVAILABILITY_CACHE[station_id];
+    return cached && Date.now() - cached.timestamp < CACHE_EXPIRY;
   }
 
   async function fetchAvailability(station_id) {
-    // Check cache first
-    if (
-      AVAILABILITY_CACHE[station_id] &&
-      Date.now() - AVAILABILITY_CACHE[station_id].timestamp < CACHE_EXPIRY
-    ) {
-      return AVAILABILITY_CACHE[station_id].data;
+    if (!isFresh(station_id)) {
+      await refreshAvailability();
     }
 
-    // Pass the station_id to track pending requests
-    const data = await throttledFetch(`/available/${station_id}`, station_id);
-    if (!data) {
+    const cached = AVAILABILITY_CACHE[station_id];
+    if (!cached) {
       console.warn(`⚠️ No availability data found for station ${station_id}`);
       return { available_bikes: 0, available_bike_stands: 0 };
     }
-
-    // Store in cache
-    AVAILABILITY_CACHE[station_id] = {
-      data,
-      timestamp: Date.now(),
-    };
-
-    return data;
+    return cached.data;
   }
 
   async function loadStationsAvailability(stationIds) {
     if (!stationIds || stationIds.length === 0) {
       return [];
     }
-    
-    // Filter out stations that already have valid cached data
-    const stationsToFetch = stationIds.filter(id => {
-      const cached = AVAILABILITY_CACHE[id];
-      return !cached || Date.now() - cached.timestamp >= CACHE_EXPIRY;
-    });
-    
-    if (stationsToFetch.length === 0) {
-      return stationIds.map(id => AVAILABILITY_CACHE[id]?.data);
-    }
-    
-    // Process in batches to avoid overwhelming the server
-    const batchSize = 5;
-    for (let i = 0; i < stationsToFetch.length; i += batchSize) {
-      const batch = stationsToFetch.slice(i, i + batchSize);
-      const availabilityPromises = batch.map(id => fetchAvailability(id));
-      await Promise.all(availabilityPromises);
+
+    if (!stationIds.every(isFresh)) {
+      await refreshAvailability();
     }
 
     return stationIds.map(id => AVAILABILITY_CACHE[id]?.data);
   }
 
-  // Load all availability data - only if necessary
+  // Load all availability data
   async function loadAllAvailability() {
-    console.warn("Loading ALL station availability - this is expensive!");
     const stationNumbers = stationData.map((station) => station.number);
     return loadStationsAvailability(stationNumbers);
   }
 
   function setupPeriodicRefresh() {
-    // Clear any existing interval
+    // Clear any existing interval or stream
     if (refreshInterval) {
       clearInterval(refreshInterval);
+      refreshInterval = null;
     }
-    
-    // Set a reasonable refresh interval (5 minutes)
-    refreshInterval = setInterval(() => {
-      // Get IDs of stations currently visible on the map
-      const visibleStationIds = window.MapModule?.getVisibleStations?.() || [];
-
-      // Only refresh what the user can see
-      if (visibleStationIds.length > 0) {
-        // Only refresh stations with expired cache
-        const stationsToRefresh = visibleStationIds.filter(id => {
-          const cached = AVAILABILITY_CACHE[id];
-          return !cached || Date.now() - cached.timestamp >= CACHE_EXPIRY;
+    if (availabilityStream) {
+      availabilityStream.close();
+      availabilityStream = null;
+    }
+
+    // Prefer pushed updates; fall back to polling every 5 minutes
+    if (window.EventSource) {
+      availabilityStream = new EventSource("/stream/availability");
+      const applyUpdate = (event) => {
+        const update = JSON.parse(event.data);
+        // Stations missing from an update are unchanged, so still current
+        const now = Date.now();
+        Object.values(AVAILABILITY_CACHE).forEach((cached) => {
+          cached.timestamp = now;
         });
-        
-        if (stationsToRefresh.length > 0) {
-          loadStationsAvailability(stationsToRefresh);
-        }
-      }
-    }, CACHE_EXPIRY);
+        cacheAvailability(update.reset ? update.stations : update.changed);
+        document.dispatchEvent(new CustomEvent("availabilitychange", { detail: update }));
+      };
+      availabilityStream.addEventListener("reset", applyUpdate);
+      availabilityStream.addEventListener("changes", applyUpdate);
+      // EventSource reconnects by itself and resumes from the last version it saw
+      return;
+    }
+
+    // One request covers every station
+    refreshInterval = setInterval(refreshAvailability, CACHE_EXPIRY);
   }
 
   // Get user's current location
@@ -267,7 +221,7 @@ const StationsModule = (function () {
         const cachedAvailability = AVAILABILITY_CACHE[station.number];
         if (cachedAvailability && 
             cachedAvailability.timestamp > Date.now() - CACHE_EXPIRY && 
-            cachedAvailability.available_bikes > 0 && 
+            cachedAvailability.data.available_bikes > 0 && 
             distance < minDistance) {
           minDistance = distance;
           nearestStation = station;
@@ -353,14 +307,7 @@ const StationsModule = (function () {
       delete AVAILABILITY_CACHE[key];
     });
     
-    // Clear all pending requests
-    Object.keys(PENDING_REQUESTS).forEach(key => {
-      delete PENDING_REQUESTS[key];
-    });
-    
-    // Reset request queue
-    REQUEST_QUEUE.length = 0;
-    activeRequests = 0;
+    pendingRefresh = null;
     
     // Reload stations
     loadStations();
@@ -0,0 +1,155 @@
+import json
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event, data, event_id=None):
+    """Encode one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One connected client: a bounded queue of events waiting to be sent"""
+
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    def get(self, timeout):
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broadcaster:
+    """
+    Fans events out to every subscriber. Publishing never blocks: a client
+    whose queue is full is too slow to keep up, so it is dropped and has to
+    reconnect, rather than holding up everyone else.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.total_connections = 0
+        self.dropped = 0
+        self.published = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self.total_connections += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(event)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                self.dropped += 1
+                logger.warning("Dropped a slow availability stream client")
+
+    def connections(self):
+        return len(self._subscribers)
+
+    def stats(self):
+        return {
+            'connections': self.connections(),
+            'total_connections': self.total_connections,
+            'dropped': self.dropped,
+            'published': self.published,
+        }
+
+
+class AvailabilityPoller:
+    """
+    Background thread that polls the bulk station API every `interval`
+    seconds and publishes the stations that changed. There is one poll per
+    interval however many clients are connected. The thread is started when
+    a client subscribes and stops once no clients are left, so nothing is
+    fetched while nobody is listening.
+    """
+
+    def __init__(self, poll, broadcaster, interval=30):
+        # poll() refreshes the stations and returns the changes to publish, or None
+        self.poll = poll
+        self.broadcaster = broadcaster
+        self.interval = interval
+        self.polls = 0
+        self.errors = 0
+        self.idle_stops = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='availability-poller', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll_once(self):
+        self.polls += 1
+        try:
+            changes = self.poll()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Availability poll failed: {str(e)}")
+            return
+        if changes:
+            self.broadcaster.publish(changes)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # Decided under the lock, so a start() racing with this sees
+            # either a running thread that will poll for its client, or none
+            with self._lock:
+                if self.broadcaster.connections() == 0:
+                    self._thread = None
+                    self.idle_stops += 1
+                    logger.info("No availability stream clients left, poller stopped")
+                    return
+            self.poll_once()
+
+    def reset(self):
+        """Forget the polling thread, its stop event and the lock guarding starts"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stats(self):
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval': self.interval,
+            'polls': self.polls,
+            'errors': self.errors,
+            'idle_stops': self.idle_stops,
+        }
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from Project.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class SWRCache:
+    """
+    Stale-while-revalidate cache for upstream-backed values.
+
+    - younger than soft_ttl: served as is
+    - between soft_ttl and hard_ttl: served immediately while one background
+      refresh fetches a new value
+    - older than hard_ttl (or missing): the caller waits for a refresh; if
+      that fails, a value younger than stale_if_error is still served
+
+    This keeps request latency bounded by the cache rather than the upstream
+    for as long as the upstream is within the hard TTL. Entries are kept in
+    the process unless `entries` gives a shared store (see
+    cachestore.CacheEntries).
+    """
+
+    def __init__(self, soft_ttl, hard_ttl, stale_if_error=None, flight=None, entries=None):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.stale_if_error = max(stale_if_error or self.hard_ttl, self.hard_ttl)
+        self.flight = flight or SingleFlight()
+        self._entries = entries if entries is not None else {}
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refresh_errors = 0
+
+    def age(self, key):
+        """Seconds since key was fetched, None if it never was"""
+        entry = self._entries.get(key)
+        return None if entry is None else time.time() - entry[1]
+
+    def fetched_at(self, key):
+        """When key was fetched as a UNIX timestamp, None if it never was"""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[1]
+
+    def peek(self, key):
+        """Return the cached value without refreshing, or None"""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def get(self, key, fetch):
+        return self.get_entry(key, fetch)[0]
+
+    def get_entry(self, key, fetch):
+        """
+        (value, fetched_at) for key, from one read of its entry, so the time
+        always belongs to the value even if a refresh replaces it meanwhile
+        """
+        entry = self._entries.get(key)
+        age = None if entry is None else time.time() - entry[1]
+
+        if age is not None and age < self.soft_ttl:
+            self.hits += 1
+            return entry
+
+        if age is not None and age < self.hard_ttl:
+            self.stale_hits += 1
+            self._revalidate_in_background(key, fetch)
+            return entry
+
+        self.misses += 1
+        try:
+            return self._refresh_entry(key, fetch)
+        except Exception as e:
+            self.refresh_errors += 1
+            if age is not None and age < self.stale_if_error:
+                logger.warning(f"Refreshing {key} failed, serving {age:.0f}s old value: {str(e)}")
+                return entry
+            raise
+
+    def refresh(self, key, fetch):
+        """Fetch a new value now, sharing the fetch with anyone else refreshing key"""
+        return self._refresh_entry(key, fetch)[0]
+
+    def _refresh_entry(self, key, fetch):
+        def load():
+            entry = (fetch(), time.time())
+            self._entries[key] = entry
+            return entry
+        return self.flight.do(key, load)
+
+    def _revalidate_in_background(self, key, fetch):
+        with self._lock:
+            running = self._refreshing.get(key)
+            if running is not None and running.is_alive():
+                return
+            thread = threading.Thread(target=self._background_refresh, args=(key, fetch), daemon=True)
+            self._refreshing[key] = thread
+        thread.start()
+
+    def _background_refresh(self, key, fetch):
+        try:
+            self.refresh(key, fetch)
+        except Exception as e:
+            self.refresh_errors += 1
+            logger.warning(f"Background refresh of {key} failed: {str(e)}")
+
+    def join(self, timeout=None):
+        """Wait for background refreshes to finish"""
+        for thread in list(self._refreshing.values()):
+            thread.join(timeout)
+
+    def clear(self):
+        self._entries.clear()
+
+    def reset(self):
+        """Forget which keys are being refreshed in the background, and the lock over them"""
+        self._lock = threading.Lock()
+        self._refreshing = {}
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'refresh_errors': self.refresh_errors,
+        }
@@ -1,6 +1,7 @@
 import unittest
 import sys
 import os
+import time
 from datetime import datetime, timezone, timedelta
 import json
 from unittest.mock import patch, MagicMock
@@ -9,6 +10,7 @@ import numpy as np
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Project.app import app, fetch_openweather_forecast
+from Project.fixtures import stations
 
 class TestBikeApp(unittest.TestCase):
     def setUp(self):
@@ -21,7 +23,7 @@ class TestBikeApp(unittest.TestCase):
         response = self.app.get('/')
         self.assertEqual(response.status_code, 200)
 
-    @patch('requests.get')
+    @patch('Project.app.http_client.get')
     def test_fetch_openweather_forecast(self, mock_get):
         """Test the weather forecast fetching function"""
         # Mock response data
@@ -147,5 +149,340 @@ class TestBikeApp(unittest.TestCase):
         response = self.app.get('/predict', query_string=test_params)
         self.assertEqual(response.status_code, 400)
 
+    @patch('Project.app.model')
+    @patch('Project.app.fetch_openweather_forecasts')
+    def test_predict_batch_route(self, mock_forecasts, mock_model):
+        """Test the batch prediction route makes a single model call"""
+        mock_model.predict.return_value = np.array([3.4, 55.0, -2.0])
+        forecast = {"temperature": 15.5, "humidity": 80, "pressure": 1013}
+        mock_forecasts.side_effect = lambda dts, interpolate=False: {dt: forecast for dt in dts}
+
+        future_time = datetime.now() + timedelta(hours=2)
+        items = [{
+            'station_id': station_id,
+            'date': future_time.strftime('%Y-%m-%d'),
+            'time': future_time.strftime('%H:%M:%S')
+        } for station_id in (1, 2, 3)]
+
+        response = self.app.post('/predict/batch', json={'items': items})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 3)
+        self.assertEqual([p['predicted_available_bikes'] for p in data['predictions']], [3, 40, 0])
+        self.assertEqual(mock_model.predict.call_count, 1)
+        self.assertEqual(len(mock_model.predict.call_args[0][0]), 3)
+
+    @patch('Project.app.model')
+    @patch('Project.app.fetch_openweather_forecasts')
+    def test_predict_batch_range(self, mock_forecasts, mock_model):
+        """Test the batch prediction route expands all stations over a time range"""
+        mock_model.predict.side_effect = lambda df: np.full(len(df), 7.0)
+        forecast = {"temperature": 15.5, "humidity": 80, "pressure": 1013}
+        mock_forecasts.side_effect = lambda dts, interpolate=False: {dt: forecast for dt in dts}
+
+        start = (datetime.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        end = start + timedelta(hours=2)
+        response = self.app.post('/predict/batch', json={
+            'start': start.strftime('%Y-%m-%d %H:%M:%S'),
+            'end': end.strftime('%Y-%m-%d %H:%M:%S'),
+            'step_minutes': 60
+        })
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 3 * 117)
+        self.assertEqual(mock_model.predict.call_count, 1)
+
+    def test_predict_batch_invalid(self):
+        """Test the batch prediction route rejects bad requests"""
+        response = self.app.post('/predict/batch', json={})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.app.post('/predict/batch', json={'items': [
+            {'station_id': 1, 'date': 'invalid-date', 'time': '12:00:00'}
+        ]})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.app.post('/predict/batch', json={'items': [1, 2]})
+        self.assertEqual(response.status_code, 400)
+
+        # A huge range is cut off after MAX_BATCH_SIZE steps, with or without stations
+        started = time.perf_counter()
+        for station_ids in ([], [1]):
+            response = self.app.post('/predict/batch', json={
+                'start': '2030-01-01 00:00:00', 'end': '9999-12-31 00:00:00',
+                'step_minutes': 1, 'station_ids': station_ids})
+            self.assertEqual(response.status_code, 400)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    @patch('Project.app.fetch_openweather_forecast')
+    def test_prediction_memo(self, mock_forecast):
+        """Test predictions with the same model inputs share a memo entry until the model is reloaded"""
+        import Project.app as app_module
+        mock_forecast.return_value = {"temperature": 15.5012, "humidity": 80, "pressure": 1013}
+        start = (datetime.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        first = MagicMock()
+        first.predict.return_value = np.array([10.0])
+
+        with patch('Project.app.model', first):
+            before = app_module.predict_inputs.stats()
+            for minute in (0, 20, 40):
+                self.assertEqual(app_module.predict_station_at(1, start.replace(minute=minute)), 10)
+            # Same inputs once the temperature is rounded to the forecast's resolution
+            mock_forecast.return_value = {"temperature": 15.4998, "humidity": 80.0, "pressure": 1013.0}
+            self.assertEqual(app_module.predict_station_at(1, start + timedelta(days=7)), 10)
+            self.assertEqual(first.predict.call_count, 1)
+            after = app_module.predict_inputs.stats()
+            self.assertEqual(after['hits'] - before['hits'], 3)
+            self.assertEqual(after['misses'] - before['misses'], 1)
+
+            self.assertEqual(app_module.predict_station_at(1, start + timedelta(hours=1)), 10)
+            self.assertEqual(first.predict.call_count, 2)
+
+        reloaded = MagicMock()
+        reloaded.predict.return_value = np.array([20.0])
+        with patch('Project.app.model', reloaded):
+            version = app_module.current_model_version()
+            self.assertEqual(app_module.predict_station_at(1, start), 20)
+        self.assertGreater(version, 0)
+        response = self.app.get('/api/cache/stats')
+        self.assertIn('hit_rate', json.loads(response.data)['memoized']['predict_inputs'])
+
+    @patch('Project.app.model')
+    def test_predict_curve_from_grid(self, mock_model):
+        """Test /predict/curve and /predict are answered from the precomputed grid without the model"""
+        from Project.forecast import ForecastStore, to_timestamp
+        from Project.grid import PredictionGrid
+        start = (datetime.now() + timedelta(hours=3)).replace(minute=0, second=0, microsecond=0)
+        store = ForecastStore(lambda: {"list": [{
+            "dt": to_timestamp(start + timedelta(hours=3 * i)),
+            "main": {"temp": 15.5, "humidity": 80, "pressure": 1013}
+        } for i in range(4)]})
+        score = lambda rows, forecasts: [7] * len(rows)
+        grid = PredictionGrid(store, score, lambda: 1, station_ids=range(1, 118))
+
+        with patch('Project.app.prediction_grid', grid):
+            response = self.app.get('/predict/curve', query_string={'station_id': '5'})
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data['station_id'], 5)
+            self.assertEqual(len(data['curve']), 4)
+            self.assertEqual(data['curve'][1]['time'], (start + timedelta(hours=3)).strftime('%H:%M:%S'))
+            self.assertEqual({p['predicted_available_bikes'] for p in data['curve']}, {7})
+
+            response = self.app.get('/predict', query_string={
+                'date': start.strftime('%Y-%m-%d'),
+                'time': start.strftime('%H:%M:%S'),
+                'station_id': '5'
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)['predicted_available_bikes'], 7)
+            mock_model.predict.assert_not_called()
+
+            response = self.app.get('/predict/curve', query_string={'station_id': 'abc'})
+            self.assertEqual(response.status_code, 400)
+
+        def fail():
+            raise ValueError("upstream down")
+        with patch('Project.app.prediction_grid', PredictionGrid(ForecastStore(fail), score, lambda: 1, [1])):
+            response = self.app.get('/predict/curve', query_string={'station_id': '1'})
+            self.assertEqual(response.status_code, 503)
+
+    @patch('Project.app.download_stations')
+    def test_station_routes_share_snapshot(self, mock_download):
+        """Test per-station routes are served from one bulk station fetch"""
+        from Project.app import station_snapshot
+        station_snapshot.clear()
+        mock_download.return_value = stations([1, 2])
+
+        for number in (1, 2):
+            response = self.app.get(f'/available/{number}')
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.data)
+            self.assertEqual(data['available_bikes'], number)
+            self.assertIn('snapshot_age', data)
+            self.assertIn('X-Snapshot-Age', response.headers)
+
+        response = self.app.get('/available/99')
+        self.assertEqual(response.status_code, 404)
+
+        response = self.app.get('/stations')
+        self.assertEqual(len(json.loads(response.data)['stations']), 2)
+        self.assertEqual(mock_download.call_count, 1)
+        station_snapshot.clear()
+
+    @patch.dict(os.environ, {'OPENWEATHER_API_KEY': 'test_key'})
+    @patch('Project.app.download_current_weather')
+    def test_weather_route_is_cached(self, mock_download):
+        """Test repeat weather requests are served from the cache"""
+        from Project.app import weather_cache
+        weather_cache.clear()
+        mock_download.return_value = {"main": {"temp": 12.0}}
+
+        for _ in range(3):
+            response = self.app.get('/api/weather')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)["main"]["temp"], 12.0)
+        self.assertEqual(mock_download.call_count, 1)
+        weather_cache.clear()
+
+    @patch('Project.app.download_stations')
+    def test_station_history_filters(self, mock_download):
+        """Test the history route slices the precomputed cube by weekday and temperature"""
+        import pandas as pd
+        import Project.app as app_module
+        from Project.history import HistoryIndex
+        app_module.station_snapshot.clear()
+        mock_download.return_value = [{"number": 1, "bike_stands": 40}]
+        history = pd.DataFrame({
+            'station_id': [1.0, 1.0, 1.0],
+            'hour': [8, 8, 8],
+            'day_of_week': [0, 5, 6],
+            'temperature': [12.0, 3.0, 12.0],
+            'num_bikes_available': [10, 20, 30]
+        })
+
+        with patch.object(app_module, 'history_index', HistoryIndex.from_frame(history)):
+            data = json.loads(self.app.get('/api/station/1/history').data)
+            self.assertEqual(data[8]['available_bikes'], 20)
+
+            data = json.loads(self.app.get('/api/station/1/history?day_type=weekend').data)
+            self.assertEqual(data[8]['available_bikes'], 25)
+
+            data = json.loads(self.app.get('/api/station/1/history?day_type=weekend&temp_band=mild').data)
+            self.assertEqual(data[8]['available_bikes'], 30)
+
+            data = json.loads(self.app.get('/api/station/1/history?dow=0').data)
+            self.assertEqual(data[8]['available_bikes'], 10)
+
+            response = self.app.get('/api/station/1/history?dow=9')
+            self.assertEqual(response.status_code, 400)
+
+            response = self.app.get('/api/station/1/history?dow=5&day_type=weekday')
+            self.assertEqual(response.status_code, 400)
+
+            # No cold readings on a weekday
+            response = self.app.get('/api/station/1/history?day_type=weekday&temp_band=cold')
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(json.loads(response.data)['error'], 'No historical data for this filter')
+        app_module.cache.clear()
+        app_module.station_snapshot.clear()
+
+    def test_after_fork_resets_process_state(self):
+        """Test a forked worker gets fresh pools and locks but keeps the loaded resources"""
+        import Project.app as app_module
+        app_module.http_client._session('example.com')
+        old_flight_lock = app_module.single_flight._lock
+        old_client_lock = app_module.http_client._lock
+        old_forecast_lock = app_module.forecast_store._lock
+        model = app_module.get_model()
+
+        with patch.object(app_module.prediction_grid, 'start') as grid_start:
+            app_module.after_fork()
+            grid_start.assert_called_once()
+
+        self.assertIsNot(app_module.single_flight._lock, old_flight_lock)
+        self.assertIsNot(app_module.http_client._lock, old_client_lock)
+        self.assertIsNot(app_module.forecast_store._lock, old_forecast_lock)
+        self.assertEqual(app_module.http_client._sessions, {})
+        self.assertIs(app_module.get_model(), model)
+
+    def test_warmup_starts_no_threads(self):
+        """Test warmup builds the grid once without starting its thread, as it may run in the gunicorn master"""
+        import Project.app as app_module
+        with patch.object(app_module.prediction_grid, 'refresh') as grid_refresh, \
+                patch.object(app_module.prediction_grid, 'start') as grid_start:
+            app_module.warmup()
+            grid_refresh.assert_called_once()
+            grid_start.assert_not_called()
+
+    @patch('Project.app.download_stations')
+    def test_stations_conditional_and_gzip(self, mock_download):
+        """Test /stations is encoded once per snapshot, gzipped on request and answers 304 to a matching ETag"""
+        import gzip
+        import Project.app as app_module
+        app_module.station_snapshot.clear()
+        app_module.payload_cache.clear()
+        self.addCleanup(app_module.station_snapshot.clear)
+        encodes = app_module.payload_cache.stats()['encodes']
+        mock_download.return_value = stations([5] * 29)
+
+        plain = self.app.get('/stations')
+        self.assertEqual(plain.status_code, 200)
+        etag = plain.headers['ETag']
+        self.assertEqual(len(json.loads(plain.data)['stations']), 29)
+
+        compressed = self.app.get('/stations', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(compressed.headers['ETag'], etag)
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+        self.assertLess(len(compressed.data), len(plain.data))
+
+        not_modified = self.app.get('/stations', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+
+        self.assertEqual(app_module.payload_cache.stats()['encodes'], encodes + 1)
+
+        # A refresh that finds the same stations keeps the ETag
+        app_module.station_snapshot.refresh(force=True)
+        not_modified = self.app.get('/stations', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(app_module.payload_cache.stats()['encodes'], encodes + 1)
+
+    @patch('Project.app.download_stations')
+    def test_live_stations(self, mock_download):
+        """Test /api/stations/live returns details and availability from one bulk fetch, projected by ?fields="""
+        import Project.app as app_module
+        app_module.station_snapshot.clear()
+        self.addCleanup(app_module.station_snapshot.clear)
+        mock_download.return_value = stations([1, 2, 3])
+
+        data = json.loads(self.app.get('/api/stations/live').data)
+        self.assertEqual(len(data['stations']), 3)
+        self.assertEqual(data['stations'][1]['name'], "Station 2")
+        self.assertEqual(data['stations'][1]['available_bikes'], 2)
+        self.assertEqual(data['stations'][1]['available_bike_stands'], 18)
+
+        data = json.loads(self.app.get('/api/stations/live?fields=available_bikes').data)
+        self.assertEqual(data['stations'][2], {'number': 3, 'available_bikes': 3})
+
+        response = self.app.get('/api/stations/live?fields=available_bikes,colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_download.call_count, 1)
+
+    @patch('Project.app.download_stations')
+    def test_station_changes(self, mock_download):
+        """Test /stations/changes sends a full reset first and then only changed stations"""
+        import Project.app as app_module
+        from Project.changes import ChangeLog
+        from Project.snapshot import SNAPSHOT_KEY
+        app_module.station_snapshot.clear()
+        self.addCleanup(app_module.station_snapshot.clear)
+
+        with patch.object(app_module, 'station_changes', ChangeLog()):
+            mock_download.return_value = stations([1, 2, 3])
+            app_module.station_snapshot.refresh(force=True)
+            # Age the snapshot so the refreshed one gets a later version
+            cache = app_module.station_snapshot.cache
+            value, fetched_at = cache._entries[SNAPSHOT_KEY]
+            cache._entries[SNAPSHOT_KEY] = (value, fetched_at - 5)
+
+            data = json.loads(self.app.get('/stations/changes').data)
+            self.assertTrue(data['reset'])
+            self.assertEqual(len(data['stations']), 3)
+            version = data['version']
+
+            mock_download.return_value = stations([1, 7, 3])
+            app_module.station_snapshot.refresh(force=True)
+
+            data = json.loads(self.app.get(f'/stations/changes?since={version}').data)
+            self.assertFalse(data['reset'])
+            self.assertGreater(data['version'], version)
+            self.assertEqual(data['changed'], [{"number": 2, "status": "OPEN", "available_bikes": 7,
+                                                "available_bike_stands": 13, "last_update": 1700000000002}])
+
+            response = self.app.get('/stations/changes?since=abc')
+            self.assertEqual(response.status_code, 400)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
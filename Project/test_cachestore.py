@@ -0,0 +1,110 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.cachestore import ByteCache, CacheEntries, make_store, SHM_DIR
+from Project.swr import SWRCache
+
+class TestByteCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def round_trip(self, backend, cache_dir=None):
+        cache = ByteCache(make_store(backend, cache_dir=cache_dir), backend)
+        payload = {'stations': [{'number': 1, 'bikes': 3}], 'fetched': 1.5}
+        self.assertTrue(cache.set('key', payload))
+        self.assertEqual(cache.get('key'), payload)
+        self.assertIsNone(cache.get('missing'))
+        cache.delete('key')
+        self.assertIsNone(cache.get('key'))
+        return cache
+
+    def test_simple_backend(self):
+        """Test the in-process backend stores pickled payloads"""
+        cache = self.round_trip('simple')
+        cache.set('raw', [1, 2])
+        self.assertIsInstance(cache.store.get('raw'), bytes)
+
+    def test_filesystem_backend_is_shared(self):
+        """Test two caches on the same directory (two workers) see each other's writes"""
+        self.round_trip('filesystem', self.tmp.name)
+        first = ByteCache(make_store('filesystem', cache_dir=self.tmp.name), 'filesystem')
+        second = ByteCache(make_store('filesystem', cache_dir=self.tmp.name), 'filesystem')
+        first.set('shared', [1, 2, 3])
+        self.assertEqual(second.get('shared'), [1, 2, 3])
+
+    @unittest.skipUnless(os.path.isdir(SHM_DIR), "needs /dev/shm")
+    def test_shm_backend(self):
+        """Test the shared memory backend"""
+        cache_dir = os.path.join(SHM_DIR, f"test-cache-{os.getpid()}")
+        self.addCleanup(shutil.rmtree, cache_dir, True)
+        self.round_trip('shm', cache_dir)
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected"""
+        with self.assertRaises(ValueError):
+            make_store('memcached')
+
+    def test_stats(self):
+        """Test hits, misses, bytes and latencies are recorded"""
+        cache = ByteCache(make_store('simple'), 'simple')
+        cache.set('a', 'x' * 100)
+        cache.get('a')
+        cache.get('b')
+        stats = cache.stats()
+        self.assertEqual(stats['backend'], 'simple')
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['get']['count'], 2)
+        self.assertEqual(stats['set']['count'], 1)
+        self.assertGreater(stats['set']['bytes'], 100)
+        self.assertIsNotNone(stats['get']['avg_ms'])
+
+    def test_store_errors_are_misses(self):
+        """Test a failing store is reported as a miss rather than raising"""
+        class BrokenStore:
+            def get(self, key):
+                raise ConnectionError("down")
+            def set(self, key, value, timeout=None):
+                raise ConnectionError("down")
+        cache = ByteCache(BrokenStore(), 'redis')
+        self.assertFalse(cache.set('a', 1))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['errors'], 2)
+
+    def test_expiry(self):
+        """Test entries expire after their timeout"""
+        cache = ByteCache(make_store('filesystem', cache_dir=self.tmp.name), 'filesystem')
+        cache.set('short', 1, timeout=1)
+        self.assertEqual(cache.get('short'), 1)
+        time.sleep(1.1)
+        self.assertIsNone(cache.get('short'))
+
+class TestCacheEntries(unittest.TestCase):
+    def test_swr_entries_shared_between_workers(self):
+        """Test SWR caches backed by one shared store fetch only once between them"""
+        with tempfile.TemporaryDirectory() as tmp:
+            calls = []
+            def fetch():
+                calls.append(1)
+                return {'temp': 10}
+            workers = [
+                SWRCache(60, 600, entries=CacheEntries(ByteCache(make_store('filesystem', cache_dir=tmp)), 'swr', 600))
+                for _ in range(2)
+            ]
+            self.assertEqual(workers[0].get('weather', fetch), {'temp': 10})
+            self.assertEqual(workers[1].get('weather', fetch), {'temp': 10})
+            self.assertEqual(len(calls), 1)
+
+            workers[0].clear()
+            self.assertIsNone(workers[1].peek('weather'))
+
+if __name__ == '__main__':
+    unittest.main()
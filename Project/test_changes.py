@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.changes import ChangeLog
+
+def stations(bikes, status='OPEN'):
+    """Stations numbered from 1 with the given bike counts"""
+    return [{
+        'number': number,
+        'name': f"Station {number}",
+        'status': status,
+        'available_bikes': count,
+        'available_bike_stands': 20 - count,
+        'last_update': 1700000000000,
+    } for number, count in enumerate(bikes, start=1)]
+
+class TestChangeLog(unittest.TestCase):
+    def test_first_snapshot_is_a_reset(self):
+        """Test a client without a version gets every station"""
+        log = ChangeLog()
+        log.update(1000, stations([1, 2, 3]))
+        result = log.since(None)
+        self.assertTrue(result['reset'])
+        self.assertEqual(result['version'], 1000)
+        self.assertEqual([row['number'] for row in result['stations']], [1, 2, 3])
+        self.assertNotIn('name', result['stations'][0])
+
+    def test_only_changed_stations(self):
+        """Test only stations whose counts changed are returned"""
+        log = ChangeLog()
+        log.update(1000, stations([1, 2, 3]))
+        changed = log.update(2000, stations([1, 5, 3]))
+        self.assertEqual([row['number'] for row in changed], [2])
+        log.update(3000, stations([0, 5, 3]))
+
+        result = log.since(1000)
+        self.assertFalse(result['reset'])
+        self.assertEqual(result['version'], 3000)
+        self.assertEqual([(row['number'], row['available_bikes']) for row in result['changed']], [(1, 0), (2, 5)])
+
+        result = log.since(2000)
+        self.assertEqual([row['number'] for row in result['changed']], [1])
+
+        result = log.since(3000)
+        self.assertEqual(result['changed'], [])
+
+    def test_unchanged_snapshot_keeps_version(self):
+        """Test a snapshot with the same counts does not bump the version"""
+        log = ChangeLog()
+        log.update(1000, stations([1, 2]))
+        self.assertEqual(log.update(2000, stations([1, 2])), [])
+        self.assertEqual(log.version, 1000)
+        self.assertEqual(log.update(500, stations([9, 9])), [])
+
+    def test_removed_stations(self):
+        """Test stations missing from a new snapshot are reported as removed"""
+        log = ChangeLog()
+        log.update(1000, stations([1, 2, 3]))
+        log.update(2000, stations([1, 2]))
+        result = log.since(1000)
+        self.assertEqual(result['removed'], [3])
+        self.assertEqual(result['changed'], [])
+
+    def test_evicted_version_resets(self):
+        """Test a version older than the log gets a full reset"""
+        log = ChangeLog(maxlen=2)
+        log.update(1000, stations([0]))
+        for version in (2000, 3000, 4000):
+            log.update(version, stations([version // 1000]))
+        self.assertTrue(log.since(1000)['reset'])
+        self.assertFalse(log.since(2000)['reset'])
+        self.assertEqual(log.since(2000)['changed'][0]['available_bikes'], 4)
+        self.assertTrue(log.since(99999)['reset'])
+
+    def test_version_from_another_log_resets(self):
+        """Test a version this log never issued gets a full reset, even inside its range"""
+        # Another worker saw station 1 at 6 bikes as version 2000; this one went straight from 1000 to 3000
+        log = ChangeLog()
+        log.update(1000, stations([5, 1]))
+        log.update(3000, stations([5, 2]))
+        result = log.since(2000)
+        self.assertTrue(result['reset'])
+        self.assertEqual([row['available_bikes'] for row in result['stations']], [5, 2])
+        self.assertFalse(log.since(1000)['reset'])
+        self.assertEqual(log.since(3000)['changed'], [])
+
+if __name__ == '__main__':
+    unittest.main()
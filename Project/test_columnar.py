@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.columnar import build, ColumnarDataset
+from Project.history import HistoryIndex
+
+def sample_csv(path, rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'station_id': rng.integers(1, 118, rows).astype(float),
+        'temperature': rng.uniform(-3, 22, rows).round(2),
+        'humidity': rng.uniform(40, 100, rows).round(1),
+        'pressure': rng.uniform(980, 1040, rows).round(0),
+        'hour': rng.integers(0, 24, rows),
+        'day_of_week': rng.integers(0, 7, rows),
+        'num_bikes_available': rng.integers(0, 40, rows),
+    })
+    frame.to_csv(path, index=False)
+    return frame
+
+class TestColumnarDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = os.path.join(self.tmp.name, 'data.csv')
+        self.out = os.path.join(self.tmp.name, 'columns')
+        self.frame = sample_csv(self.csv)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """Test the columnar copy holds the same values in smaller dtypes"""
+        report = build(self.csv, self.out)
+        dataset = ColumnarDataset(self.out)
+
+        self.assertEqual(len(dataset), len(self.frame))
+        np.testing.assert_array_equal(dataset['station_id'], self.frame['station_id'].astype(int))
+        np.testing.assert_array_equal(dataset['hour'], self.frame['hour'])
+        np.testing.assert_array_equal(dataset['num_bikes_available'], self.frame['num_bikes_available'])
+        np.testing.assert_allclose(dataset['temperature'], self.frame['temperature'], rtol=1e-6)
+        self.assertEqual(dataset.columns['station_id'].dtype, np.uint8)
+        self.assertEqual(dataset.columns['num_bikes_available'].dtype, np.uint8)
+        self.assertEqual(dataset.columns['temperature'].dtype, np.float32)
+
+        self.assertGreater(report['saved_bytes'], 0)
+        self.assertEqual(report['columnar_bytes'], dataset.nbytes)
+
+    def test_memory_mapped_read_only(self):
+        """Test columns are memory-mapped and cannot be written to"""
+        build(self.csv, self.out)
+        dataset = ColumnarDataset(self.out)
+        self.assertIsInstance(dataset.columns['hour'], np.memmap)
+        with self.assertRaises(ValueError):
+            dataset.columns['hour'][0] = 1
+
+    def test_history_index_from_columns(self):
+        """Test the history index built from columns matches the one built from the CSV"""
+        build(self.csv, self.out)
+        from_csv = HistoryIndex.from_frame(self.frame)
+        from_columns = HistoryIndex.from_frame(ColumnarDataset(self.out))
+        for station_id in (1, 50, 117):
+            expected = from_csv.profile(station_id)
+            actual = from_columns.profile(station_id)
+            if expected is None:
+                self.assertIsNone(actual)
+                continue
+            np.testing.assert_array_equal(actual[1], expected[1])
+            np.testing.assert_allclose(actual[0], expected[0])
+
+    def test_to_frame(self):
+        """Test the dataset can be turned back into a DataFrame with the CSV dtypes"""
+        build(self.csv, self.out)
+        frame = ColumnarDataset(self.out).to_frame()
+        self.assertEqual(frame['station_id'].dtype, float)
+        pd.testing.assert_series_equal(frame['hour'], self.frame['hour'])
+
+if __name__ == '__main__':
+    unittest.main()
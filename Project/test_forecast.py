@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.forecast import ForecastStore, to_timestamp
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+def forecast_response(slots):
+    """Build an OpenWeather forecast payload from (datetime, temp) pairs"""
+    return {"list": [{
+        "dt": to_timestamp(dt),
+        "main": {"temp": temp, "humidity": 80, "pressure": 1000 + temp}
+    } for dt, temp in slots]}
+
+class TestForecastStore(unittest.TestCase):
+    def setUp(self):
+        # Slots deliberately out of order
+        self.fetch = MagicMock(return_value=forecast_response([
+            (BASE + timedelta(hours=3), 13.0),
+            (BASE, 10.0),
+            (BASE + timedelta(hours=6), 16.0),
+        ]))
+        self.store = ForecastStore(self.fetch, refresh_interval=600)
+
+    def test_nearest_slot(self):
+        """Test lookups pick the nearest slot, preferring the earlier one on a tie"""
+        self.assertEqual(self.store.lookup(BASE + timedelta(hours=1))["temperature"], 10.0)
+        self.assertEqual(self.store.lookup(BASE + timedelta(hours=2))["temperature"], 13.0)
+        self.assertEqual(self.store.lookup(BASE + timedelta(hours=1, minutes=30))["temperature"], 10.0)
+        self.assertEqual(self.store.lookup(BASE + timedelta(days=3))["temperature"], 16.0)
+        self.assertEqual(self.store.lookup(BASE - timedelta(days=1))["pressure"], 1010.0)
+
+    def test_interpolation(self):
+        """Test optional linear interpolation between slots"""
+        result = self.store.lookup(BASE + timedelta(hours=4), interpolate=True)
+        self.assertAlmostEqual(result["temperature"], 14.0)
+        self.assertAlmostEqual(result["pressure"], 1014.0)
+
+    def test_fetches_once_per_interval(self):
+        """Test the forecast is only downloaded again once it is stale"""
+        self.store.lookup_many([BASE, BASE + timedelta(hours=5)])
+        self.store.lookup(BASE)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertIsNotNone(self.store.fetched_at())
+
+        self.store.last_fetched -= 600
+        self.store.lookup(BASE)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_serves_previous_forecast_on_error(self):
+        """Test a failed refresh keeps the previous forecast"""
+        self.store.refresh()
+        self.fetch.side_effect = Exception("upstream down")
+        self.store.refresh(force=True)
+        self.assertEqual(self.store.lookup(BASE)["temperature"], 10.0)
+
+        self.store.clear()
+        with self.assertRaises(Exception):
+            self.store.lookup(BASE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.forecast import ForecastStore, to_timestamp
+from Project.grid import PredictionGrid, GridMiss
+
+BASE = datetime(2026, 3, 1, 12, 0, 0)
+
+def forecast_response(temps):
+    """OpenWeather forecast payload with 3-hourly slots from BASE"""
+    return {"list": [{
+        "dt": to_timestamp(BASE + timedelta(hours=3 * i)),
+        "main": {"temp": temp, "humidity": 80, "pressure": 1000}
+    } for i, temp in enumerate(temps)]}
+
+def score(rows, forecasts):
+    """Fake model: station * 100 + hour + temperature, unknown station 3"""
+    return [None if station_id == 3 else int(station_id * 100 + dt.hour + forecast['temperature'])
+            for (station_id, dt), forecast in zip(rows, forecasts)]
+
+class TestPredictionGrid(unittest.TestCase):
+    def setUp(self):
+        self.fetch = MagicMock(return_value=forecast_response([10, 20, 30]))
+        self.store = ForecastStore(self.fetch, refresh_interval=600)
+        self.score = MagicMock(side_effect=score)
+        self.model_version = 1
+        self.grid = PredictionGrid(self.store, self.score, lambda: self.model_version, station_ids=range(1, 5))
+
+    def test_lookup_matches_direct_scoring(self):
+        """Test every covered time gives what scoring it directly with its nearest slot would"""
+        self.grid.refresh()
+        self.assertTrue(self.grid.ready())
+        for minutes in range(-120, 8 * 60, 20):
+            dt = BASE + timedelta(minutes=minutes)
+            expected = score([(2, dt)], [self.store.lookup(dt)])[0]
+            self.assertEqual(self.grid.lookup(2, dt), expected, dt)
+        # A tie goes to the earlier slot
+        self.assertEqual(self.grid.lookup(1, BASE + timedelta(hours=1, minutes=30)), 100 + 13 + 10)
+        self.assertEqual(self.grid.lookup(1, BASE + timedelta(hours=2)), 100 + 14 + 20)
+
+    def test_misses(self):
+        """Test times and stations outside the grid raise GridMiss and unknown stations give None"""
+        with self.assertRaises(GridMiss):
+            self.grid.lookup(1, BASE)
+        self.grid.refresh()
+        with self.assertRaises(GridMiss):
+            self.grid.lookup(1, BASE + timedelta(days=2))
+        with self.assertRaises(GridMiss):
+            self.grid.lookup(1, BASE - timedelta(hours=3))
+        with self.assertRaises(GridMiss):
+            self.grid.lookup(9, BASE)
+        self.assertIsNone(self.grid.lookup(3, BASE))
+
+    def test_rebuilds_only_on_new_version(self):
+        """Test the grid is scored in one call and rebuilt only when the forecast or model changes"""
+        self.grid.refresh()
+        self.grid.refresh()
+        self.assertEqual(self.score.call_count, 1)
+        self.assertEqual(len(self.score.call_args[0][0]), 4 * 3 * 4)
+
+        self.model_version = 2
+        self.grid.refresh()
+        self.assertEqual(self.score.call_count, 2)
+
+        self.fetch.return_value = forecast_response([0, 0, 0])
+        self.store.refresh(force=True)
+        self.grid.refresh()
+        self.assertEqual(self.grid.lookup(1, BASE), 112)
+        self.assertEqual(self.grid.stats()['builds'], 3)
+
+    def test_curve(self):
+        """Test the curve gives one prediction per forecast slot"""
+        self.grid.refresh()
+        curve = self.grid.curve(2)
+        self.assertEqual([dt for dt, _ in curve], [BASE + timedelta(hours=3 * i) for i in range(3)])
+        self.assertEqual([bikes for _, bikes in curve], [222, 235, 248])
+        self.assertEqual([bikes for _, bikes in self.grid.curve(3)], [None] * 3)
+
+    def test_failed_refresh_keeps_grid(self):
+        """Test a failed forecast download is counted and the previous grid is kept"""
+        self.grid.refresh()
+        self.fetch.side_effect = ValueError("upstream down")
+        self.store.refresh(force=True)
+        self.model_version = 2
+        self.score.side_effect = ValueError("model broken")
+        self.grid.refresh()
+        self.assertEqual(self.grid.stats()['errors'], 1)
+        self.assertEqual(self.grid.lookup(1, BASE), 122)
+
+if __name__ == '__main__':
+    unittest.main()
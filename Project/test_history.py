@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.history import HistoryIndex, WEEKEND, BAND_NAMES
+
+def sample_history(rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'station_id': rng.integers(1, 30, rows).astype(float),
+        'hour': rng.integers(0, 24, rows),
+        'day_of_week': rng.integers(0, 7, rows),
+        'temperature': rng.uniform(-3, 22, rows),
+        'num_bikes_available': rng.integers(0, 40, rows),
+    })
+
+class TestHistoryIndex(unittest.TestCase):
+    def test_matches_groupby(self):
+        """Test the precomputed profile matches a pandas groupby by hour"""
+        data = sample_history()
+        index = HistoryIndex.from_frame(data)
+
+        for station_id in (1, 7, 29):
+            expected = data[data['station_id'] == float(station_id)].groupby('hour')['num_bikes_available'].agg(['mean', 'count'])
+            means, counts = index.profile(station_id)
+            for hour, row in expected.iterrows():
+                self.assertAlmostEqual(means[hour], row['mean'])
+                self.assertEqual(counts[hour], row['count'])
+            missing = [h for h in range(24) if h not in expected.index]
+            self.assertTrue(all(counts[h] == 0 for h in missing))
+
+    def test_slices_match_filtered_groupby(self):
+        """Test weekday and temperature band slices match filtering the raw data"""
+        data = sample_history(rows=20000)
+        index = HistoryIndex.from_frame(data)
+
+        station = data[data['station_id'] == 4.0]
+        weekend = station[station['day_of_week'].isin(WEEKEND)]
+        expected = weekend.groupby('hour')['num_bikes_available'].mean()
+        means, _ = index.profile(4, days=WEEKEND)
+        for hour, mean in expected.items():
+            self.assertAlmostEqual(means[hour], mean)
+
+        mild_tuesday = station[(station['day_of_week'] == 1) & (station['temperature'] >= 10) & (station['temperature'] < 15)]
+        expected = mild_tuesday.groupby('hour')['num_bikes_available'].agg(['mean', 'count'])
+        means, counts = index.profile(4, days=[1], bands=[BAND_NAMES.index('mild')])
+        self.assertEqual(counts.sum(), len(mild_tuesday))
+        for hour, row in expected.iterrows():
+            self.assertAlmostEqual(means[hour], row['mean'])
+
+    def test_unknown_station(self):
+        """Test stations without history have no profile"""
+        index = HistoryIndex.from_frame(sample_history())
+        self.assertIsNone(index.profile(999))
+
+    def test_incremental_add_matches_full_build(self):
+        """Test folding in new rows gives the same index as rebuilding"""
+        old = sample_history(seed=1)
+        new = sample_history(rows=500, seed=2)
+        new.loc[:10, 'station_id'] = 120.0  # a station not seen before
+
+        incremental = HistoryIndex.from_frame(old)
+        incremental.add(new['station_id'], new['hour'], new['day_of_week'], new['temperature'], new['num_bikes_available'])
+        full = HistoryIndex.from_frame(pd.concat([old, new]))
+
+        for station_id in (3, 15, 120):
+            np.testing.assert_allclose(incremental.profile(station_id)[0], full.profile(station_id)[0])
+            np.testing.assert_array_equal(incremental.profile(station_id)[1], full.profile(station_id)[1])
+
+if __name__ == '__main__':
+    unittest.main()
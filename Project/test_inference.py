@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+import pickle
+from unittest.mock import MagicMock
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.inference import compile_model, CompiledModel, PipelineModel
+
+COLUMNS = ['station_id', 'temperature', 'humidity', 'pressure', 'hour', 'station_hour', 'day_of_week']
+
+class TestInference(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Load the trained model once for all tests"""
+        model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'bike_availability_model.pkl')
+        with open(model_path, 'rb') as f:
+            cls.model = pickle.load(f)
+
+    def features(self, station_ids, hours):
+        return {
+            'station_id': np.array(station_ids),
+            'temperature': np.linspace(-2, 25, len(station_ids)),
+            'humidity': np.linspace(40, 100, len(station_ids)),
+            'pressure': np.linspace(980, 1040, len(station_ids)),
+            'hour': np.array(hours),
+            'station_hour': [f"{s}_{h}" for s, h in zip(station_ids, hours)],
+            'day_of_week': np.arange(len(station_ids)) % 7,
+        }
+
+    def test_compiled_matches_pipeline(self):
+        """Test the compiled engine agrees with model.predict"""
+        engine = compile_model(self.model, COLUMNS)
+        self.assertIsInstance(engine, CompiledModel)
+
+        station_ids = [1, 5, 32, 100, 117, 2]
+        hours = [0, 16, 8, 23, 12, 5]
+        features = self.features(station_ids, hours)
+        expected = self.model.predict(pd.DataFrame(features, columns=COLUMNS))
+        np.testing.assert_allclose(engine.predict(features), expected, rtol=1e-9, atol=1e-9)
+
+    def test_unknown_station_is_nan(self):
+        """Test rows with a station the model never saw come back as NaN"""
+        engine = compile_model(self.model, COLUMNS)
+        result = engine.predict(self.features([5, 500], [16, 16]))
+        self.assertFalse(np.isnan(result[0]))
+        self.assertTrue(np.isnan(result[1]))
+
+    def test_fallback_for_unsupported_model(self):
+        """Test models that cannot be compiled use the full pipeline"""
+        mock_model = MagicMock()
+        mock_model.predict.return_value = np.array([10.0])
+        engine = compile_model(mock_model, COLUMNS)
+        self.assertIsInstance(engine, PipelineModel)
+        self.assertEqual(engine.predict(self.features([1], [9]))[0], 10.0)
+        self.assertEqual(mock_model.predict.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
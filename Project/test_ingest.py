@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.ingest import IngestEngine
+from Project.upstream import UpstreamClient
+from Project.fixtures import StubJCDecaux
+
+class TestIngestEngine(unittest.TestCase):
+    def setUp(self):
+        self.contracts = [f"city{i}" for i in range(8)]
+        self.stub = StubJCDecaux({
+            contract: [{"number": n, "contract_name": contract} for n in range(1, i + 2)]
+            for i, contract in enumerate(self.contracts)
+        }, delay=0.1)
+        client = UpstreamClient(retries=0)
+        def fetch(contract):
+            response = client.get(self.stub.url, params={"contract": contract})
+            response.raise_for_status()
+            return response.json()
+        self.fetch = fetch
+
+    def tearDown(self):
+        self.stub.close()
+
+    def test_contracts_fetched_concurrently(self):
+        """Test contracts are fetched in parallel, up to the concurrency limit"""
+        engine = IngestEngine(self.fetch, self.contracts, concurrency=4)
+        started = time.perf_counter()
+        results = engine.poll()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(sorted(results), self.contracts)
+        self.assertEqual(len(results["city3"]), 4)
+        # Eight 0.1s requests four at a time
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(self.stub.max_active, 4)
+
+        stats = engine.stats()
+        self.assertEqual(stats["polls"], 1)
+        self.assertEqual(stats["contracts"]["city0"]["requests"], 1)
+        self.assertEqual(stats["contracts"]["city7"]["stations"], 8)
+        self.assertGreaterEqual(stats["contracts"]["city0"]["last_latency_ms"], 100)
+
+    def test_failing_contract_left_out(self):
+        """Test a contract that fails does not stop the others being returned"""
+        engine = IngestEngine(self.fetch, ["city0", "missing", "city1"], concurrency=2)
+        results = engine.poll()
+        self.assertEqual(sorted(results), ["city0", "city1"])
+        self.assertEqual(engine.stats()["contracts"]["missing"]["errors"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
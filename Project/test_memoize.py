@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+from unittest.mock import MagicMock, patch
+from cachelib import SimpleCache
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.memoize import ttl_cache, CachelibBackend
+
+class TestTTLCache(unittest.TestCase):
+    def test_entries_expire(self):
+        """Test cached results are recomputed once their TTL passes"""
+        source = MagicMock(return_value=5)
+        cached = ttl_cache(ttl=60, key_prefix='test.expire')(source)
+
+        with patch('Project.memoize.time.time', return_value=1000.0):
+            self.assertEqual(cached(1), 5)
+            self.assertEqual(cached(1), 5)
+        with patch('Project.memoize.time.time', return_value=1061.0):
+            self.assertEqual(cached(1), 5)
+        self.assertEqual(source.call_count, 2)
+
+        stats = cached.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['expirations']), (1, 2, 1))
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when full"""
+        source = MagicMock(side_effect=lambda x: x * 2)
+        cached = ttl_cache(ttl=60, maxsize=2, key_prefix='test.lru')(source)
+        cached(1)
+        cached(2)
+        cached(1)
+        cached(3)  # evicts 2
+        cached(1)
+        cached(2)
+        self.assertEqual(source.call_count, 4)
+        self.assertEqual(cached.stats()['evictions'], 2)
+
+    def test_invalidation(self):
+        """Test single entries and whole functions can be invalidated"""
+        source = MagicMock(return_value='station')
+        cached = ttl_cache(ttl=60, key_prefix='test.invalidate')(source)
+        cached(1)
+        cached(2)
+        cached.invalidate(1)
+        cached(1)
+        cached(2)
+        self.assertEqual(source.call_count, 3)
+
+        cached.invalidate_all()
+        cached(2)
+        self.assertEqual(source.call_count, 4)
+
+    def test_none_not_cached(self):
+        """Test failed lookups returning None are retried"""
+        source = MagicMock(return_value=None)
+        cached = ttl_cache(ttl=60, key_prefix='test.none')(source)
+        cached(1)
+        cached(1)
+        self.assertEqual(source.call_count, 2)
+
+    def test_shared_backend(self):
+        """Test two memoized functions over one shared cache see each other's entries"""
+        shared = SimpleCache()
+        first = MagicMock(return_value={'bikes': 3})
+        second = MagicMock(return_value={'bikes': 9})
+        cached_first = ttl_cache(ttl=60, backend=CachelibBackend(shared), key_prefix='test.shared')(first)
+        cached_second = ttl_cache(ttl=60, backend=CachelibBackend(shared), key_prefix='test.shared')(second)
+
+        self.assertEqual(cached_first(7), {'bikes': 3})
+        self.assertEqual(cached_second(7), {'bikes': 3})
+        self.assertEqual(second.call_count, 0)
+
+        cached_first.invalidate_all()
+        self.assertEqual(cached_second(7), {'bikes': 9})
+
+if __name__ == '__main__':
+    unittest.main()
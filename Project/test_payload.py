@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import gzip
+import json
+from flask import Flask, request
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.payload import EncodedPayload, PayloadCache
+
+class TestEncodedPayload(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.data = {'stations': [{'number': n, 'name': f"Station {n}"} for n in range(50)]}
+
+    def respond(self, payload, headers=None):
+        with self.app.test_request_context('/', headers=headers or {}):
+            return payload.respond(request, self.app.response_class)
+
+    def test_encoded_once(self):
+        """Test the body, gzip copy and ETag are computed up front"""
+        payload = EncodedPayload.from_data(self.data)
+        self.assertEqual(json.loads(payload.body), self.data)
+        self.assertEqual(gzip.decompress(payload.gzipped), payload.body)
+        self.assertEqual(payload.etag, EncodedPayload.from_data(self.data).etag)
+        self.assertNotEqual(payload.etag, EncodedPayload.from_data({'stations': []}).etag)
+
+    def test_small_bodies_not_compressed(self):
+        """Test tiny payloads are always served plain"""
+        payload = EncodedPayload.from_data({'a': 1})
+        self.assertIsNone(payload.gzipped)
+        response = self.respond(payload, {'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_negotiation(self):
+        """Test gzip is only sent to clients that accept it, and a matching ETag gets 304"""
+        payload = EncodedPayload.from_data(self.data)
+
+        response = self.respond(payload)
+        self.assertEqual(response.get_data(), payload.body)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        response = self.respond(payload, {'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.get_data(), payload.gzipped)
+
+        response = self.respond(payload, {'Accept-Encoding': 'gzip;q=0'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+        response = self.respond(payload, {'If-None-Match': f'"{payload.etag}"'})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.respond(payload, {'If-None-Match': '"other"'})
+        self.assertEqual(response.status_code, 200)
+
+class TestPayloadCache(unittest.TestCase):
+    def test_reencodes_on_new_version(self):
+        """Test build() only runs when the version changes"""
+        cache = PayloadCache()
+        calls = []
+        build = lambda: calls.append(1) or {'v': len(calls)}
+        first = cache.get('stations', 1, build)
+        self.assertIs(cache.get('stations', 1, build), first)
+        second = cache.get('stations', 2, build)
+        self.assertIsNot(second, first)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.stats()['reuses'], 1)
+
+    def test_unchanged_content_keeps_payload(self):
+        """Test a new version with identical content keeps the same payload and ETag"""
+        cache = PayloadCache()
+        data = {'stations': [{'number': n} for n in range(50)]}
+        first = cache.get('stations', 1, lambda: data)
+        self.assertIs(cache.get('stations', 2, lambda: dict(data)), first)
+        self.assertIs(cache.get('stations', 2, lambda: {}), first)
+        self.assertEqual(cache.stats()['encodes'], 1)
+        self.assertEqual(cache.stats()['unchanged'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
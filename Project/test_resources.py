@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+import subprocess
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.resources import LazyResource
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+class TestLazyResource(unittest.TestCase):
+    def test_loads_once_on_first_use(self):
+        """Test the loader only runs on first use, once, and is timed"""
+        calls = []
+        resource = LazyResource('thing', lambda: calls.append(1) or 'value')
+        self.assertFalse(resource.loaded)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(resource.get(), 'value')
+        self.assertEqual(resource.get(), 'value')
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(resource.stats()['loaded'])
+        self.assertIsNotNone(resource.stats()['seconds'])
+
+    def test_concurrent_first_use(self):
+        """Test threads asking at the same time share one load"""
+        calls = []
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return 'value'
+        resource = LazyResource('slow', loader)
+        threads = [threading.Thread(target=resource.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_load(self):
+        """Test a failing loader gives None and records the error"""
+        def loader():
+            raise IOError("missing")
+        resource = LazyResource('broken', loader)
+        self.assertIsNone(resource.get())
+        self.assertEqual(resource.stats()['error'], "missing")
+
+        resource.reset()
+        self.assertFalse(resource.loaded)
+
+    def test_app_import_is_lazy(self):
+        """Test importing the app loads neither pandas nor the model"""
+        code = (
+            "import sys; import Project.app as app; "
+            "print('pandas' in sys.modules, 'sklearn' in sys.modules, app.model_resource.loaded)"
+        )
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.stdout.split()[-3:], ['False', 'False', 'False'])
+
+if __name__ == '__main__':
+    unittest.main()
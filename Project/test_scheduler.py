@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.scheduler import Scheduler
+
+class TestScheduler(unittest.TestCase):
+    def test_aligned_ticks(self):
+        """Test runs land on multiples of the interval, whatever the run time"""
+        scheduler = Scheduler()
+        started = []
+        def job():
+            started.append(time.time())
+            time.sleep(0.02)
+            if len(started) == 4:
+                scheduler.stop()
+        scheduler.run_every(0.1, job, name='aligned', run_now=False)
+        for at in started:
+            self.assertLess(min(at % 0.1, 0.1 - at % 0.1), 0.03)
+        stats = scheduler.stats()['aligned']
+        self.assertEqual(stats['runs'], 4)
+        self.assertEqual(stats['missed'], 0)
+        self.assertGreater(stats['utilisation'], 0.1)
+
+    def test_overrun_counts_missed_ticks(self):
+        """Test a run longer than the interval skips, and counts, the ticks it overlapped"""
+        scheduler = Scheduler()
+        runs = []
+        def job():
+            runs.append(1)
+            if len(runs) == 2:
+                time.sleep(0.25)
+            if len(runs) == 3:
+                scheduler.stop()
+        job_stats = scheduler.run_every(0.1, job, run_now=False)
+        self.assertEqual(job_stats.runs, 3)
+        self.assertGreaterEqual(job_stats.missed, 2)
+
+    def test_errors_do_not_stop_the_job(self):
+        """Test a failing run is counted and the job carries on"""
+        scheduler = Scheduler()
+        calls = []
+        def job():
+            calls.append(1)
+            if len(calls) == 2:
+                scheduler.stop()
+            raise ValueError("upstream down")
+        scheduler.run_every(0.02, job, name='failing')
+        self.assertEqual(scheduler.stats()['failing']['errors'], 2)
+
+    def test_run_for_duration(self):
+        """Test run() stops every job after the duration and joins their threads"""
+        scheduler = Scheduler()
+        finished = threading.Event()
+        def target():
+            scheduler.run_every(0.01, lambda: None, name='quick')
+            finished.set()
+        started = time.perf_counter()
+        stats = scheduler.run([target], duration=0.1)
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertTrue(finished.is_set())
+        self.assertGreaterEqual(stats['quick']['runs'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+import mysql.connector
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from scripts import twelve_hr_scrape as scrape
+from Project.fixtures import stations
+
+class TestJCDecauxIngest(unittest.TestCase):
+    def test_one_transaction_per_poll(self):
+        """Test a poll is written with one executemany per table and a single commit"""
+        conn, cursor = MagicMock(), MagicMock()
+        polled_at = datetime(2026, 3, 1, 12, 0)
+        rows = scrape.insert_jcdecaux(conn, cursor, stations([1, 2, 3]), polled_at=polled_at)
+        self.assertEqual(rows, 6)
+        self.assertEqual(cursor.execute.call_count, 0)
+        self.assertEqual(cursor.executemany.call_count, 2)
+        (station_sql, station_data), (availability_sql, availability_data) = [
+            call.args for call in cursor.executemany.call_args_list]
+        self.assertIn("INTO station", station_sql)
+        self.assertEqual(len(station_data), 3)
+        self.assertEqual(availability_data[1], (2, "dublin", 2, 18, polled_at))
+        conn.commit.assert_called_once()
+
+    def test_failed_poll_rolled_back(self):
+        """Test a database error rolls the whole poll back"""
+        conn, cursor = MagicMock(), MagicMock()
+        cursor.executemany.side_effect = [None, mysql.connector.Error("lost connection")]
+        with self.assertRaises(mysql.connector.Error):
+            scrape.insert_jcdecaux(conn, cursor, stations([1, 2]))
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
+
+    def test_daily_weather_batched(self):
+        """Test every forecast day is inserted with one executemany"""
+        cursor = MagicMock()
+        data = {"current": {"dt": 1700000000}, "daily": [
+            {"dt": 1700000000 + day * 86400, "temp": {"max": 10, "min": 5}} for day in range(8)]}
+        self.assertEqual(scrape.insert_daily_weather(cursor, data), 8)
+        self.assertEqual(cursor.executemany.call_count, 1)
+        self.assertEqual(len(cursor.executemany.call_args.args[1]), 8)
+
+class TestChangeTracker(unittest.TestCase):
+    def written(self, cursor):
+        """(station numbers, availability numbers) written by the last poll"""
+        written = {"station": [], "availability": []}
+        for call in cursor.executemany.call_args_list:
+            table = "station" if "INTO station" in call.args[0] else "availability"
+            written[table] = [row[0] for row in call.args[1]]
+        cursor.executemany.reset_mock()
+        return written["station"], written["availability"]
+
+    def test_only_changed_stations_written(self):
+        """Test unchanged stations are suppressed and metadata is only written when it changes"""
+        conn, cursor = MagicMock(), MagicMock()
+        tracker = scrape.ChangeTracker()
+        polled = stations([1, 2, 3])
+        self.assertEqual(scrape.insert_jcdecaux(conn, cursor, polled, tracker), 6)
+        self.assertEqual(self.written(cursor), ([1, 2, 3], [1, 2, 3]))
+
+        self.assertEqual(scrape.insert_jcdecaux(conn, cursor, polled, tracker), 0)
+        self.assertEqual(cursor.executemany.call_count, 0)
+        self.assertEqual(tracker.stats()['suppressed'], 6)
+
+        polled = stations([1, 5, 3])
+        polled[1]["last_update"] += 60000
+        polled[2]["status"] = "CLOSED"
+        scrape.insert_jcdecaux(conn, cursor, polled, tracker)
+        self.assertEqual(self.written(cursor), ([3], [2]))
+
+    def test_failed_write_not_recorded(self):
+        """Test stations from a rolled back poll are written again next time"""
+        conn, cursor = MagicMock(), MagicMock()
+        tracker = scrape.ChangeTracker()
+        cursor.executemany.side_effect = mysql.connector.Error("lost connection")
+        with self.assertRaises(mysql.connector.Error):
+            scrape.insert_jcdecaux(conn, cursor, stations([1, 2]), tracker)
+        cursor.executemany.side_effect = None
+        scrape.insert_jcdecaux(conn, cursor, stations([1, 2]), tracker)
+        self.assertEqual(self.written(cursor), ([1, 2], [1, 2]))
+
+    def test_seeded_from_database(self):
+        """Test stations already in the database are not written again after a restart"""
+        polled = stations([4, 7])
+        cursor = MagicMock()
+        metadata_rows = [{
+            "number": station["number"], "contract_name": "dublin", "name": station["name"],
+            "address": station["address"], "position_lat": 53.35, "position_lng": -6.26,
+            "banking": 0, "bike_stands": 20, "bonus": 0, "status": "OPEN"
+        } for station in polled]
+        cursor.fetchall.side_effect = [metadata_rows, [
+            {"number": 1, "contract_name": "dublin", "available_bikes": 4, "available_bike_stands": 16},
+            {"number": 2, "contract_name": "dublin", "available_bikes": 6, "available_bike_stands": 14},
+        ]]
+        tracker = scrape.ChangeTracker()
+        tracker.seed(cursor)
+
+        conn, cursor = MagicMock(), MagicMock()
+        scrape.insert_jcdecaux(conn, cursor, polled, tracker)
+        self.assertEqual(self.written(cursor), ([], [2]))
+
+class TestSpooledPolls(unittest.TestCase):
+    def test_replayed_after_outage(self):
+        """Test polls spooled while MySQL is down are loaded once it is back, keeping their poll time"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        spool = scrape.Spool(directory.name)
+        self.addCleanup(spool.close)
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 0).timestamp(), "stations": stations([1, 2])})
+        later = stations([3, 2])
+        later[0]["last_update"] += 300000
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 5).timestamp(), "stations": later})
+
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.fetchone.return_value = {"found": 1}
+        cursor.fetchall.return_value = []
+        writer = scrape.DatabaseWriter({})
+        flusher = scrape.SpoolFlusher(spool, writer.write, retry_on=scrape.RETRY_ON)
+        with patch.object(scrape.mysql.connector, "connect",
+                          side_effect=[mysql.connector.InterfaceError("Can't connect"), conn]):
+            with self.assertRaises(mysql.connector.Error):
+                flusher.flush_once()
+            self.assertEqual(flusher.flush_once(), 2)
+
+        availability = [call.args[1] for call in cursor.executemany.call_args_list
+                        if call.args[0] == scrape.AVAILABILITY_SQL]
+        self.assertEqual([[row[4] for row in rows] for rows in availability],
+                         [[datetime(2026, 3, 1, 12, 0)] * 2, [datetime(2026, 3, 1, 12, 5)]])
+        self.assertEqual(conn.commit.call_count, 2)
+
+    def test_malformed_poll_quarantined(self):
+        """Test a poll with a malformed station is rolled back and set aside, and later polls still load"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        spool = scrape.Spool(directory.name)
+        self.addCleanup(spool.close)
+        malformed = stations([1, 2])
+        del malformed[1]["position"]
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 0).timestamp(), "stations": malformed})
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 5).timestamp(), "stations": stations([3, 4])})
+
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.fetchone.return_value = {"found": 1}
+        cursor.fetchall.return_value = []
+        flusher = scrape.SpoolFlusher(spool, scrape.DatabaseWriter({}).write, retry_on=scrape.RETRY_ON)
+        with patch.object(scrape.mysql.connector, "connect", return_value=conn):
+            self.assertEqual(flusher.flush_once(), 1)
+        self.assertEqual(flusher.stats()["quarantined"], 1)
+        conn.commit.assert_called_once()
+        self.assertEqual(flusher.flush_once(), 0)
+
+    def test_rejected_poll_quarantined(self):
+        """Test a poll the database rejects is set aside rather than retried forever"""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        spool = scrape.Spool(directory.name)
+        self.addCleanup(spool.close)
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 0).timestamp(), "stations": stations([1, 2])})
+        spool.append({"type": "jcdecaux", "polled_at": datetime(2026, 3, 1, 12, 5).timestamp(), "stations": stations([3, 4])})
+
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.fetchone.return_value = {"found": 1}
+        cursor.fetchall.return_value = []
+        cursor.executemany.side_effect = [mysql.connector.DataError("Data too long for column 'name'"), None, None]
+        flusher = scrape.SpoolFlusher(spool, scrape.DatabaseWriter({}).write, retry_on=scrape.RETRY_ON)
+        with patch.object(scrape.mysql.connector, "connect", return_value=conn):
+            self.assertEqual(flusher.flush_once(), 1)
+        self.assertEqual(flusher.stats()["quarantined"], 1)
+        conn.rollback.assert_called_once()
+        conn.commit.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
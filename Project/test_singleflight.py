@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def run_concurrently(self, flight, fn, count=8, key='stations'):
+        results = []
+        errors = []
+
+        def worker():
+            try:
+                results.append(flight.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test concurrent misses for the same key wait on one fetch"""
+        flight = SingleFlight()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'payload'
+
+        results, errors = self.run_concurrently(flight, fetch)
+        self.assertEqual(errors, [])
+        self.assertEqual(results, ['payload'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()['coalesced'], 7)
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_errors_are_shared(self):
+        """Test waiters see the leader's exception"""
+        flight = SingleFlight()
+
+        def fetch():
+            time.sleep(0.2)
+            raise ValueError("upstream down")
+
+        results, errors = self.run_concurrently(flight, fetch, count=4)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(flight.stats()['executions'], 1)
+
+    def test_different_keys_run_separately(self):
+        """Test calls for different keys are not coalesced"""
+        flight = SingleFlight()
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+        self.assertEqual(flight.do('b', lambda: 2), 2)
+        self.assertEqual(flight.stats()['executions'], 2)
+
+    def test_file_lock_checks_shared_result(self):
+        """Test a worker holding the file lock reuses a value another worker produced"""
+        with tempfile.TemporaryDirectory() as lock_dir:
+            flight = SingleFlight(lock_dir=lock_dir)
+            shared = {}
+
+            def fetch():
+                shared['stations'] = 'payload'
+                return 'payload'
+
+            self.assertEqual(flight.do('stations', fetch, check=lambda: shared.get('stations')), 'payload')
+            self.assertEqual(flight.do('stations', fetch, check=lambda: shared.get('stations')), 'payload')
+            stats = flight.stats()
+            self.assertEqual(stats['executions'], 1)
+            self.assertEqual(stats['coalesced_across_workers'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.snapshot import StationSnapshot, SnapshotUnavailable, SNAPSHOT_KEY
+
+STATIONS = [
+    {"number": 1, "bike_stands": 20, "available_bikes": 5},
+    {"number": 2, "bike_stands": 30, "available_bikes": 0},
+]
+
+class TestStationSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.fetch = MagicMock(return_value=STATIONS)
+        self.snapshot = StationSnapshot(self.fetch, max_age=60, max_stale=600)
+
+    def make_older(self, seconds):
+        """Pretend the snapshot was fetched `seconds` earlier"""
+        value, fetched_at = self.snapshot.cache._entries[SNAPSHOT_KEY]
+        self.snapshot.cache._entries[SNAPSHOT_KEY] = (value, fetched_at - seconds)
+
+    def test_lookup_by_number(self):
+        """Test stations are indexed by number from one bulk fetch"""
+        self.assertEqual(self.snapshot.get(2)["bike_stands"], 30)
+        self.assertIsNone(self.snapshot.get(3))
+        self.assertEqual(len(self.snapshot.all()), 2)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertLess(self.snapshot.age(), 60)
+
+    def test_refresh_after_max_age(self):
+        """Test an old snapshot is served while it is refreshed in the background"""
+        self.snapshot.get(1)
+        self.make_older(61)
+        self.assertEqual(self.snapshot.get(1)["available_bikes"], 5)
+        self.snapshot.cache.join(timeout=5)
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertLess(self.snapshot.age(), 60)
+
+    def test_stale_bounds(self):
+        """Test a failed refresh serves the old snapshot only until max_stale"""
+        self.snapshot.get(1)
+        self.fetch.side_effect = Exception("upstream down")
+
+        self.make_older(120)
+        self.assertEqual(self.snapshot.get(1)["available_bikes"], 5)
+        self.snapshot.cache.join(timeout=5)
+
+        self.make_older(600)
+        with self.assertRaises(SnapshotUnavailable):
+            self.snapshot.get(1)
+
+    def test_stations_come_with_their_fetch_time(self):
+        """Test snapshot() pairs the stations with the time of the fetch they came from, across a background refresh"""
+        stations, fetched_at = self.snapshot.snapshot()
+        self.assertEqual(stations, STATIONS)
+        self.make_older(61)
+        old_fetched_at = self.snapshot.fetched_at()
+
+        refreshed = threading.Event()
+        def fetch():
+            # The background refresh lands between the stale read and anything after it
+            refreshed.set()
+            return [{"number": 1, "bike_stands": 20, "available_bikes": 9}]
+        self.fetch.side_effect = fetch
+        stations, fetched_at = self.snapshot.snapshot()
+        self.assertEqual((stations, fetched_at), (STATIONS, old_fetched_at))
+        self.snapshot.cache.join(timeout=5)
+        self.assertTrue(refreshed.is_set())
+
+        stations, fetched_at = self.snapshot.snapshot()
+        self.assertEqual(stations[0]["available_bikes"], 9)
+        self.assertGreater(fetched_at, old_fetched_at)
+
+if __name__ == '__main__':
+    unittest.main()
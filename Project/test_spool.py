@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.spool import Spool, SpoolFlusher, SpoolLocked
+
+class TestSpool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_append_and_read(self):
+        """Test records come back in order from compressed segments that rotate by size"""
+        spool = Spool(self.directory, segment_bytes=200)
+        self.addCleanup(spool.close)
+        for i in range(10):
+            spool.append({'poll': i, 'stations': [{'number': n} for n in range(5)]})
+        segments = spool.segments()
+        self.assertGreater(len(segments), 1)
+        records = [record for name in segments for record in spool.read(name)]
+        self.assertEqual([record['poll'] for record in records], list(range(10)))
+
+        # Each record's offset is where the next one starts
+        entries = spool.entries(segments[0])
+        self.assertEqual(spool.read(segments[0], entries[0][1]), [record for record, _ in entries[1:]])
+        self.assertEqual(entries[-1][1], os.path.getsize(os.path.join(self.directory, segments[0])))
+        self.assertEqual(spool.entries(segments[0], entries[-1][1]), [])
+
+    def test_damaged_tail(self):
+        """Test a record cut short by a crash is ignored and a restart starts a new segment"""
+        spool = Spool(self.directory)
+        for i in range(3):
+            spool.append({'poll': i})
+        path = os.path.join(self.directory, spool.active)
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 5)
+        self.assertEqual([record['poll'] for record in spool.read(spool.active)], [0, 1])
+        spool.close()
+
+        restarted = Spool(self.directory)
+        self.addCleanup(restarted.close)
+        self.assertNotEqual(restarted.active, spool.active)
+        restarted.append({'poll': 3})
+        self.assertEqual(len(restarted.segments()), 2)
+
+    def test_one_process_at_a_time(self):
+        """Test a spool that is already open can't be opened again until it is closed"""
+        spool = Spool(self.directory)
+        spool.append({'poll': 0})
+        with self.assertRaises(SpoolLocked):
+            Spool(self.directory)
+        spool.close()
+        reopened = Spool(self.directory)
+        self.addCleanup(reopened.close)
+        self.assertEqual(len(reopened.segments()), 1)
+
+class TestSpoolFlusher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.spool = Spool(self.directory, segment_bytes=100)
+        self.addCleanup(self.spool.close)
+        for i in range(6):
+            self.spool.append({'poll': i})
+
+    def test_resumes_from_checkpoint(self):
+        """Test a failed write stops the flush and the next flush carries on from the checkpoint"""
+        written = []
+        def write(record):
+            if record['poll'] == 3 and not written.count('failed'):
+                written.append('failed')
+                raise ConnectionError("database down")
+            written.append(record['poll'])
+        flusher = SpoolFlusher(self.spool, write)
+        with self.assertRaises(ConnectionError):
+            flusher.flush_once()
+        segment, offset = self.spool.checkpoint()
+        self.assertEqual(self.spool.read(segment, offset)[0]['poll'], 3)
+        self.assertEqual(flusher.flush_once(), 3)
+        self.assertEqual([w for w in written if w != 'failed'], list(range(6)))
+
+        # Only the segment still being appended to is kept
+        self.assertEqual(self.spool.segments(), [self.spool.active])
+        self.assertEqual(flusher.flush_once(), 0)
+        self.spool.append({'poll': 6})
+        self.assertEqual(flusher.flush_once(), 1)
+
+    def test_bad_record_quarantined(self):
+        """Test a record that fails with a non-retryable error is set aside instead of stalling the spool"""
+        loaded = []
+        def write(record):
+            if record['poll'] == 2:
+                raise KeyError('position')
+            loaded.append(record['poll'])
+        flusher = SpoolFlusher(self.spool, write)
+        self.assertEqual(flusher.flush_once(), 5)
+        self.assertEqual(loaded, [0, 1, 3, 4, 5])
+        self.assertEqual(flusher.stats()['quarantined'], 1)
+        with open(os.path.join(self.directory, 'quarantine.ndjson')) as f:
+            quarantined = [json.loads(line) for line in f]
+        self.assertEqual(quarantined, [{'error': "KeyError: 'position'", 'record': {'poll': 2}}])
+
+    def test_backs_off_until_the_database_returns(self):
+        """Test the flusher retries with backoff while writes fail and loads everything once they work"""
+        stop = threading.Event()
+        attempts = []
+        loaded = []
+        def write(record):
+            attempts.append(record['poll'])
+            if len(attempts) < 4:
+                raise ConnectionError("database down")
+            loaded.append(record['poll'])
+            if len(loaded) == 6:
+                stop.set()
+        flusher = SpoolFlusher(self.spool, write, interval=0.01, backoff=0.001)
+        thread = threading.Thread(target=flusher.run, args=(stop,))
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(loaded, list(range(6)))
+        stats = flusher.stats()
+        self.assertEqual(stats['failures'], 3)
+        self.assertEqual(stats['flushed'], 6)
+
+if __name__ == '__main__':
+    unittest.main()
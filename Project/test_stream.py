@@ -0,0 +1,155 @@
+import unittest
+import sys
+import os
+import json
+import threading
+from unittest.mock import patch
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.stream import Broadcaster, AvailabilityPoller, format_event
+from Project.fixtures import StubJCDecaux, stations
+
+class TestBroadcaster(unittest.TestCase):
+    def test_fan_out(self):
+        """Test every subscriber gets each event"""
+        broadcaster = Broadcaster()
+        subscribers = [broadcaster.subscribe() for _ in range(3)]
+        broadcaster.publish({'version': 1})
+        for subscriber in subscribers:
+            self.assertEqual(subscriber.get(0.1), {'version': 1})
+        self.assertEqual(broadcaster.stats()['connections'], 3)
+
+        broadcaster.unsubscribe(subscribers[0])
+        self.assertEqual(broadcaster.connections(), 2)
+
+    def test_slow_consumer_dropped(self):
+        """Test a client with a full queue is dropped without blocking the others"""
+        broadcaster = Broadcaster(queue_size=2)
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe()
+        for version in range(3):
+            broadcaster.publish({'version': version})
+            self.assertEqual(fast.get(0.1), {'version': version})
+        self.assertTrue(slow.dropped)
+        self.assertFalse(fast.dropped)
+        self.assertEqual(broadcaster.stats()['dropped'], 1)
+        self.assertEqual(broadcaster.connections(), 1)
+
+    def test_format_event(self):
+        """Test events are encoded as SSE frames"""
+        self.assertEqual(format_event('changes', {'a': 1}, 5), 'id: 5\nevent: changes\ndata: {"a":1}\n\n')
+
+class TestAvailabilityPoller(unittest.TestCase):
+    def test_publishes_only_changes(self):
+        """Test polls with nothing new publish nothing and failures are counted"""
+        broadcaster = Broadcaster()
+        subscriber = broadcaster.subscribe()
+        results = [{'version': 1}, None, ValueError("upstream down")]
+        def poll():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        poller = AvailabilityPoller(poll, broadcaster, interval=60)
+        for _ in range(3):
+            poller.poll_once()
+        self.assertEqual(subscriber.get(0.1), {'version': 1})
+        self.assertIsNone(subscriber.get(0.01))
+        self.assertEqual(poller.stats()['errors'], 1)
+
+    def test_background_thread(self):
+        """Test the poller thread polls on its interval and stops"""
+        polled = threading.Event()
+        broadcaster = Broadcaster()
+        broadcaster.subscribe()
+        poller = AvailabilityPoller(lambda: polled.set(), broadcaster, interval=0.01)
+        poller.start()
+        self.assertTrue(polled.wait(1))
+        poller.stop(1)
+        self.assertFalse(poller.stats()['running'])
+
+    def test_stops_without_clients(self):
+        """Test the poller stops polling once the last client leaves and starts again for the next one"""
+        polled = threading.Event()
+        broadcaster = Broadcaster()
+        poller = AvailabilityPoller(lambda: polled.set(), broadcaster, interval=0.01)
+        self.addCleanup(poller.stop, 1)
+        subscriber = broadcaster.subscribe()
+        poller.start()
+        self.assertTrue(polled.wait(1))
+
+        broadcaster.unsubscribe(subscriber)
+        thread = poller._thread
+        if thread is not None:
+            thread.join(1)
+        self.assertFalse(poller.stats()['running'])
+        self.assertEqual(poller.stats()['idle_stops'], 1)
+        polls = poller.stats()['polls']
+        polled.clear()
+        self.assertFalse(polled.wait(0.05))
+        self.assertEqual(poller.stats()['polls'], polls)
+
+        broadcaster.subscribe()
+        poller.start()
+        self.assertTrue(polled.wait(1))
+
+class TestAvailabilityStream(unittest.TestCase):
+    def setUp(self):
+        self.bikes = [1, 2, 3]
+        self.stub = StubJCDecaux({'dublin': lambda: stations(self.bikes)})
+        self.env = patch.dict(os.environ, {'JCDECAUX_STATIONS_URL': self.stub.url})
+        self.env.start()
+        import Project.app as app_module
+        from Project.changes import ChangeLog
+        self.app_module = app_module
+        app_module.station_snapshot.clear()
+        self.changes = patch.object(app_module, 'station_changes', ChangeLog())
+        self.changes.start()
+
+    def tearDown(self):
+        self.changes.stop()
+        self.env.stop()
+        self.app_module.station_snapshot.clear()
+        self.stub.close()
+
+    def test_one_poll_serves_every_client(self):
+        """Test the stream sends all stations first, then only changed stations from each poll"""
+        app_module = self.app_module
+        client = app_module.app.test_client()
+        # Fetch the first snapshot and age it, so the next poll gets a newer version
+        app_module.station_snapshot.refresh(force=True)
+        cache = app_module.station_snapshot.cache
+        for key, (value, fetched_at) in list(cache._entries.items()):
+            cache._entries[key] = (value, fetched_at - 5)
+
+        with patch.object(app_module, 'availability_poller') as poller:
+            streams = [client.get('/stream/availability', buffered=False) for _ in range(3)]
+            self.assertEqual(poller.start.call_count, 3)
+        self.assertEqual(app_module.availability_broadcaster.connections(), 3)
+        self.assertEqual(streams[0].mimetype, 'text/event-stream')
+
+        bodies = [stream.response for stream in streams]
+        for body in bodies:
+            first = next(body).decode()
+            self.assertTrue(first.startswith('id: '))
+            self.assertIn('event: reset', first)
+            self.assertEqual(len(json.loads(first.split('data: ')[1])['stations']), 3)
+
+        requests_before = self.stub.requests
+        self.bikes = [1, 9, 3]
+        app_module.availability_poller.poll_once()
+        self.assertEqual(self.stub.requests, requests_before + 1)
+
+        for body in bodies:
+            event = next(body).decode()
+            self.assertIn('event: changes', event)
+            data = json.loads(event.split('data: ')[1])
+            self.assertEqual([(row['number'], row['available_bikes']) for row in data['changed']], [(2, 9)])
+
+        for stream in streams:
+            stream.close()
+        self.assertEqual(app_module.availability_broadcaster.connections(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.swr import SWRCache
+
+class TestSWRCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SWRCache(soft_ttl=60, hard_ttl=300, stale_if_error=900)
+
+    def make_older(self, key, seconds):
+        value, fetched_at = self.cache._entries[key]
+        self.cache._entries[key] = (value, fetched_at - seconds)
+
+    def test_fresh_value_is_served_from_cache(self):
+        """Test values younger than the soft TTL don't go upstream"""
+        fetch = MagicMock(return_value='sunny')
+        self.assertEqual(self.cache.get('weather', fetch), 'sunny')
+        self.assertEqual(self.cache.get('weather', fetch), 'sunny')
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_stale_value_served_while_revalidating(self):
+        """Test a value past the soft TTL is returned immediately and refreshed in the background"""
+        self.cache.get('weather', MagicMock(return_value='sunny'))
+        self.make_older('weather', 120)
+
+        release = threading.Event()
+        def slow_fetch():
+            release.wait(5)
+            return 'rain'
+
+        self.assertEqual(self.cache.get('weather', slow_fetch), 'sunny')
+        self.assertEqual(self.cache.get('weather', slow_fetch), 'sunny')
+        release.set()
+        self.cache.join(timeout=5)
+        self.assertEqual(self.cache.peek('weather'), 'rain')
+        self.assertEqual(self.cache.stats()['stale_hits'], 2)
+
+    def test_hard_ttl_blocks_and_stale_on_error(self):
+        """Test past the hard TTL the caller waits, falling back to stale on error"""
+        self.cache.get('weather', MagicMock(return_value='sunny'))
+        self.make_older('weather', 400)
+        self.assertEqual(self.cache.get('weather', MagicMock(return_value='rain')), 'rain')
+
+        self.make_older('weather', 400)
+        failing = MagicMock(side_effect=Exception("upstream down"))
+        self.assertEqual(self.cache.get('weather', failing), 'rain')
+
+        self.make_older('weather', 600)
+        with self.assertRaises(Exception):
+            self.cache.get('weather', failing)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import time
+from unittest.mock import patch, MagicMock
+import requests
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.upstream import UpstreamClient
+
+def make_response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+class TestUpstreamClient(unittest.TestCase):
+    def setUp(self):
+        self.client = UpstreamClient(connect_timeout=1, read_timeout=2, retries=2, backoff=0)
+
+    def test_reuses_session_per_host(self):
+        """Test one pooled session is kept per upstream host"""
+        with patch('requests.Session.get', return_value=make_response(200)) as mock_get:
+            self.client.get('https://api.jcdecaux.com/vls/v1/stations')
+            self.client.get('https://api.jcdecaux.com/vls/v1/stations')
+            self.client.get('https://api.openweathermap.org/data/2.5/weather')
+        self.assertEqual(len(self.client._sessions), 2)
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], (1, 2))
+        self.assertEqual(self.client.stats()['api.jcdecaux.com']['requests'], 2)
+
+    def test_retries_then_succeeds(self):
+        """Test connection errors and 503s are retried"""
+        responses = [requests.exceptions.ConnectionError("reset"), make_response(503), make_response(200)]
+        with patch('requests.Session.get', side_effect=responses):
+            response = self.client.get('https://api.jcdecaux.com/vls/v1/stations')
+        self.assertEqual(response.status_code, 200)
+        stats = self.client.stats()['api.jcdecaux.com']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['errors'], 2)
+        self.assertEqual(stats['retries'], 2)
+
+    def test_retries_are_bounded(self):
+        """Test the client gives up after the configured number of retries"""
+        with patch('requests.Session.get', side_effect=requests.exceptions.Timeout("slow")) as mock_get:
+            with self.assertRaises(requests.exceptions.Timeout):
+                self.client.get('https://api.jcdecaux.com/vls/v1/stations')
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_deadline_bounds_retries(self):
+        """Test a call with its retries stays within the deadline, cutting each attempt's timeout to what is left"""
+        client = UpstreamClient(connect_timeout=1, read_timeout=2, retries=5, backoff=0, deadline=0.3)
+        def slow(*args, **kwargs):
+            time.sleep(0.2)
+            raise requests.exceptions.Timeout("slow")
+        started = time.monotonic()
+        with patch('requests.Session.get', side_effect=slow) as mock_get:
+            with self.assertRaises(requests.exceptions.Timeout):
+                client.get('https://api.jcdecaux.com/vls/v1/stations')
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertLessEqual(max(mock_get.call_args_list[0].kwargs['timeout']), 0.3)
+        self.assertLess(max(mock_get.call_args_list[1].kwargs['timeout']), 0.15)
+
+    def test_client_errors_not_retried(self):
+        """Test 4xx responses are returned to the caller straight away"""
+        with patch('requests.Session.get', return_value=make_response(429)) as mock_get:
+            response = self.client.get('https://api.openweathermap.org/data/2.5/weather')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(mock_get.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
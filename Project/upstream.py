@@ -0,0 +1,149 @@
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying; 429 is left to the caller so we don't burn quota
+RETRY_STATUSES = {502, 503, 504}
+
+
+class UpstreamStats:
+    """Latency and error counters for one upstream host (or JCDecaux contract)"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.last_latency = None
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency, error):
+        self.requests += 1
+        self.last_latency = latency
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if error:
+            self.errors += 1
+
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'last_latency_ms': round(1000 * self.last_latency, 1) if self.last_latency is not None else None,
+            'avg_latency_ms': round(1000 * self.total_latency / self.requests, 1) if self.requests else None,
+            'max_latency_ms': round(1000 * self.max_latency, 1),
+        }
+
+
+class UpstreamClient:
+    """
+    Shared HTTP client for JCDecaux and OpenWeather. Keeps one pooled
+    keep-alive session per host, applies connect/read timeouts to every call
+    and retries connection failures and 502/503/504 with jittered backoff.
+
+    With a `deadline`, a call and all its retries together take at most that
+    many seconds: each attempt's timeouts are cut to what is left and no
+    retry starts once it has run out. Keep it below the gunicorn worker
+    timeout, or a slow upstream gets the worker killed mid-request.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.5, pool_size=10, deadline=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                # Retries are handled in get() so they can be counted and jittered
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+                self._stats.setdefault(host, UpstreamStats())
+            return session
+
+    def _remaining(self, started):
+        """Seconds left of the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return self.deadline - (time.monotonic() - started)
+
+    def _sleep_before_retry(self, attempt, remaining=None):
+        # Full jitter: anywhere between 0 and the exponential backoff
+        delay = random.uniform(0, self.backoff * (2 ** attempt))
+        time.sleep(delay if remaining is None else max(0, min(delay, remaining)))
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        """GET with pooling, timeouts and bounded retries. Returns the final response."""
+        host = urlsplit(url).netloc
+        session = self._session(host)
+        stats = self._stats[host]
+        timeout = timeout or self.timeout
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            remaining = self._remaining(started)
+            call_timeout = timeout if remaining is None else tuple(min(t, remaining) for t in timeout)
+            start = time.monotonic()
+            try:
+                response = session.get(url, params=params, headers=headers, timeout=call_timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                stats.record(time.monotonic() - start, error=True)
+                if attempt == self.retries or self._out_of_time(started):
+                    raise
+                logger.warning(f"Upstream {host} failed ({str(e)}), retrying")
+            else:
+                failed = response.status_code >= 400
+                stats.record(time.monotonic() - start, error=failed)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries or self._out_of_time(started):
+                    return response
+                logger.warning(f"Upstream {host} returned {response.status_code}, retrying")
+            stats.retries += 1
+            self._sleep_before_retry(attempt, self._remaining(started))
+            if self._out_of_time(started):
+                # The backoff used up the rest of the deadline
+                raise requests.exceptions.Timeout(f"Upstream {host} deadline of {self.deadline}s exceeded")
+
+    def _out_of_time(self, started):
+        remaining = self._remaining(started)
+        return remaining is not None and remaining <= 0
+
+    def stats(self):
+        """Per-host request, error, retry and latency counters"""
+        return {host: stats.as_dict() for host, stats in self._stats.items()}
+
+    def reset(self):
+        """Drop all pooled connections and the lock guarding them"""
+        # The old lock may have been held by a thread that did not survive the fork
+        self._lock = threading.Lock()
+        for session in self._sessions.values():
+            session.close()
+        self._sessions = {}
+
+
+# Process-wide client shared by the web app and the scrapers
+client = UpstreamClient(
+    connect_timeout=float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10)),
+    retries=int(os.environ.get('UPSTREAM_RETRIES', 2)),
+    # Below the 30s gunicorn worker timeout, retries included
+    deadline=float(os.environ.get('UPSTREAM_DEADLINE', 20)),
+)
@@ -0,0 +1,23 @@
+"""
+WSGI entry point for running the app under gunicorn with several workers:
+
+    gunicorn -c Project/gunicorn.conf.py Project.wsgi:app
+
+With preload_app (the default in gunicorn.conf.py) this module is imported
+once in the gunicorn master, so the model, historical data and compiled
+inference engine are loaded before the workers fork and are shared with
+them copy-on-write. Background refresh threads are only started in the
+workers, by the hooks in gunicorn.conf.py.
+"""
+import gc
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from Project.app import app, warmup
+
+warmup()
+
+# Move everything loaded so far out of the garbage collector's reach, so
+# collections in the workers do not write to (and so copy) the shared pages
+gc.freeze()
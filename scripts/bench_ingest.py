@@ -0,0 +1,93 @@
+import argparse
+import glob
+import json
+import os
+import sys
+
+# Benchmark polling many JCDecaux contracts at different concurrency limits,
+# offline, against a local server replaying recorded payloads. Record some
+# first with --record (needs JCDECAUX_API_KEY), or let it make up payloads.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from Project.fixtures import StubJCDecaux
+from Project.ingest import IngestEngine
+from Project.upstream import UpstreamClient
+
+JCDECAUX_URL = "https://api.jcdecaux.com/vls/v1"
+
+
+def record(out_dir):
+    """Save the current stations of every JCDecaux contract as <contract>.json"""
+    client = UpstreamClient()
+    api_key = os.environ["JCDECAUX_API_KEY"]
+    os.makedirs(out_dir, exist_ok=True)
+    contracts = client.get(f"{JCDECAUX_URL}/contracts", params={"apiKey": api_key}).json()
+    for contract in contracts:
+        name = contract["name"]
+        response = client.get(f"{JCDECAUX_URL}/stations", params={"apiKey": api_key, "contract": name})
+        if response.ok:
+            with open(os.path.join(out_dir, f"{name}.json"), "w") as f:
+                f.write(response.text)
+    print(f"Recorded {len(contracts)} contracts to {out_dir}")
+
+
+def load_payloads(payload_dir, contracts):
+    """Recorded payloads by contract, or made-up ones if there are none"""
+    payloads = {}
+    for path in sorted(glob.glob(os.path.join(payload_dir or "", "*.json"))):
+        with open(path, "rb") as f:
+            payloads[os.path.splitext(os.path.basename(path))[0]] = f.read()
+    if payloads:
+        return payloads
+    return {
+        f"contract{i}": json.dumps([{
+            "number": n, "contract_name": f"contract{i}", "name": f"Station {n}", "address": "",
+            "position": {"lat": 0.0, "lng": 0.0}, "banking": False, "bonus": False, "status": "OPEN",
+            "bike_stands": 20, "available_bikes": n % 20, "available_bike_stands": 20 - n % 20,
+            "last_update": 1700000000000
+        } for n in range(1, 121)]).encode()
+        for i in range(contracts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent multi-contract ingestion offline")
+    parser.add_argument("--payloads", help="Directory of recorded <contract>.json payloads")
+    parser.add_argument("--record", action="store_true", help="Record live payloads into --payloads and exit")
+    parser.add_argument("--contracts", type=int, default=25, help="Made-up contracts when nothing is recorded")
+    parser.add_argument("--latency", type=float, default=0.15, help="Simulated upstream latency in seconds")
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Concurrency limits to compare")
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.payloads or os.path.join(ROOT, "data", "recorded_contracts"))
+        return
+
+    payloads = load_payloads(args.payloads, args.contracts)
+    # Serves the payloads on a local port, each answer delayed by the latency
+    server = StubJCDecaux(payloads, delay=args.latency)
+    client = UpstreamClient(pool_size=32)
+
+    def fetch(contract):
+        response = client.get(server.url, params={"contract": contract})
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            engine = IngestEngine(fetch, sorted(payloads), concurrency=concurrency)
+            durations, stations = [], 0
+            for _ in range(args.polls):
+                results = engine.poll()
+                durations.append(engine.last_duration)
+                stations = sum(len(s) for s in results.values())
+            latencies = [c["avg_latency_ms"] for c in engine.stats()["contracts"].values()]
+            print(f"concurrency {concurrency:>3}: {len(results)} contracts, {stations} stations, "
+                  f"best poll {min(durations):.3f}s, mean contract latency {sum(latencies) / len(latencies):.1f}ms")
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
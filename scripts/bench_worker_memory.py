@@ -0,0 +1,90 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import requests
+
+# Compare memory per gunicorn worker with and without preloading the app.
+# Linux only: reads /proc/<pid>/smaps_rollup.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def children(pid):
+    """Pids of the direct children of a process"""
+    found = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The process name can contain spaces, the fields after it cannot
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            found.append(int(entry))
+    return found
+
+
+def memory(pid):
+    """Rss, Pss and private memory of a process in kB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0].rstrip(':') in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': values.get('Rss', 0),
+        'pss': values.get('Pss', 0),
+        'private': values.get('Private_Clean', 0) + values.get('Private_Dirty', 0),
+    }
+
+
+def measure(preload, workers, port):
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0',
+               WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f'127.0.0.1:{port}')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'Project/gunicorn.conf.py', 'Project.wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # Wait until every worker has booted and the app answers
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            try:
+                if len(children(master.pid)) == workers and \
+                        requests.get(f'http://127.0.0.1:{port}/api/startup/stats', timeout=1).ok:
+                    break
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        else:
+            raise RuntimeError("gunicorn did not start")
+        # Let the last workers finish importing
+        time.sleep(2)
+        return memory(master.pid), [memory(pid) for pid in children(master.pid)]
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per gunicorn worker with and without preload")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=5599)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'process':<8} {'rss MB':>8} {'pss MB':>8} {'private MB':>11}")
+    for preload in (False, True):
+        mode = 'preload' if preload else 'no-preload'
+        master, workers = measure(preload, args.workers, args.port)
+        average = {key: sum(w[key] for w in workers) / len(workers) for key in ('rss', 'pss', 'private')}
+        for name, usage in (('master', master), ('worker', average)):
+            print(f"{mode:<10} {name:<8} {usage['rss'] / 1024:8.1f} {usage['pss'] / 1024:8.1f} {usage['private'] / 1024:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import argparse
+import os
+import sys
+
+# Build the columnar copy of the ML dataset that the web app memory-maps
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Project.columnar import build
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the historical CSV to memory-mappable columns")
+    parser.add_argument('--csv', default=os.path.join(DATA_DIR, 'final_data_for_ml.csv'))
+    parser.add_argument('--out', default=os.path.join(DATA_DIR, 'final_data_for_ml'))
+    args = parser.parse_args()
+
+    report = build(args.csv, args.out)
+    print(f"Rows:            {report['rows']}")
+    print(f"CSV on disk:     {report['csv_bytes'] / 1e6:.1f} MB")
+    print(f"DataFrame:       {report['dataframe_bytes'] / 1e6:.1f} MB")
+    print(f"Columnar:        {report['columnar_bytes'] / 1e6:.1f} MB")
+    print(f"Saved:           {report['saved_bytes'] / 1e6:.1f} MB ({report['saved_percent']}%)")
+
+
+if __name__ == "__main__":
+    main()
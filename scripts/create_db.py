@@ -1,14 +1,18 @@
-import requests
+import argparse
 from sqlalchemy import create_engine, text
-import traceback
-import time
 import json
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Project', '.env'))
 
+# Use the web app's pooled HTTP client for upstream calls
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Project.upstream import client as http_client
+from Project.scheduler import Scheduler
+
 # Database configuration from environment variables
 USER = os.getenv("DB_USER", "root")
 PASSWORD = os.getenv("DB_PASSWORD")
@@ -51,6 +55,7 @@ with engine.connect() as connection:
     sql = text("""
     CREATE TABLE IF NOT EXISTS availability (
         number INTEGER,
+        contract_name VARCHAR(256),
         available_bikes INTEGER,
         available_bike_stands INTEGER,
         last_update DATETIME
@@ -155,24 +160,30 @@ def write_to_db(data):
         # Insert into availability table
         with engine.connect() as connection:
             connection.execute(text("""
-                INSERT INTO availability (number, available_bikes, available_bike_stands, last_update)
-                VALUES (:number, :available_bikes, :available_bike_stands, :last_update)
+                INSERT INTO availability (number, contract_name, available_bikes, available_bike_stands, last_update)
+                VALUES (:number, :contract_name, :available_bikes, :available_bike_stands, :last_update)
             """), {
                 "number": number,
+                "contract_name": station.get('contract_name'),
                 "available_bikes": available_bikes,
                 "available_bike_stands": available_bike_stands,
                 "last_update": last_update
             })
             connection.commit()
 
-def main():
-    while True:
-        try:
-            r = requests.get(STATIONS_URI, params={"apiKey": JCKEY, "contract": NAME})
-            write_to_db(r.json())
-            time.sleep(5*60)
-        except Exception:
-            print(traceback.format_exc())
+def poll_availability():
+    r = http_client.get(STATIONS_URI, params={"apiKey": JCKEY, "contract": NAME})
+    write_to_db(r.text)
+
+def main(duration=None):
+    # Poll every 5 minutes on the clock until the duration is up or interrupted
+    scheduler = Scheduler()
+    scheduler.stop_on_signals()
+    stats = scheduler.run([lambda: scheduler.run_every(5 * 60, poll_availability, name="availability")], duration)
+    print(stats)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the database and collect station availability")
+    parser.add_argument("--duration", type=float, default=0, help="Seconds to run for, 0 to run until stopped")
+    args = parser.parse_args()
+    main(args.duration or None)
\ No newline at end of file
@@ -1,24 +1,52 @@
+import argparse
 import requests
 import mysql.connector
 import datetime
+import hashlib
+import logging
 import time
-import traceback
-import threading
 import os
+import sys
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Project', '.env'))
 
+# Use the web app's pooled HTTP client for upstream calls
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Project.upstream import client as http_client
+from Project.scheduler import Scheduler
+from Project.ingest import IngestEngine
+from Project.spool import Spool, SpoolFlusher, SpoolLocked
+
 # JCDecaux API constants
 JCKEY = os.getenv("JCDECAUX_API_KEY")
 NAME = "dublin"
-STATIONS_URI = "https://api.jcdecaux.com/vls/v1/stations"
+STATIONS_URI = os.getenv("JCDECAUX_STATIONS_URL", "https://api.jcdecaux.com/vls/v1/stations")
+
+# Contracts to collect, polled concurrently, e.g. "dublin,lyon,toulouse"
+CONTRACTS = [c.strip() for c in os.getenv("JCDECAUX_CONTRACTS", NAME).split(",") if c.strip()]
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 8))
+
+# Every poll is appended to a local spool first and loaded into MySQL from
+# there, so polls keep being collected while the database is down
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "spool"))
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 8 * 1024 * 1024))
+SPOOL_FLUSH_INTERVAL = int(os.getenv("SPOOL_FLUSH_INTERVAL", 10))
+# Errors that mean the database is unavailable, so the poll is retried
+# later. A poll failing with anything else, including the database
+# rejecting it (DataError, IntegrityError, ProgrammingError), is
+# quarantined in the spool.
+RETRY_ON = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError, OSError)
 
 # OpenWeatherMap API constants
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 OPENWEATHER_URL = "https://api.openweathermap.org/data/3.0/onecall"
 
+# Seconds between polls, aligned to the clock
+JCDECAUX_INTERVAL = int(os.getenv("JCDECAUX_POLL_INTERVAL", 5 * 60))
+WEATHER_INTERVAL = int(os.getenv("WEATHER_POLL_INTERVAL", 60 * 60))
+
 # Dublin coordinates (latitude and longitude)
 DUBLIN_LAT = 53.349805
 DUBLIN_LNG = -6.26031
@@ -32,93 +60,248 @@ db_config = {
     "port": int(os.getenv("DB_PORT", "3306"))
 }
 
-# Function to fetch and insert JCDecaux data
-def fetch_and_insert_jcdecaux():
-    print("JCDecaux thread started.")
-    try:
-        # Connect to MySQL
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-
-        while True:
-            # Fetch data from JCDecaux API
-            response = requests.get(STATIONS_URI, params={"apiKey": JCKEY, "contract": NAME})
-
-            stations = response.json()
-
-            # Insert data into station table
-            station_sql = """
-            INSERT INTO station (number, contract_name, name, address, position_lat, position_lng, banking, bike_stands, bonus, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON DUPLICATE KEY UPDATE name=VALUES(name), address=VALUES(address), 
-            position_lat=VALUES(position_lat), position_lng=VALUES(position_lng), bike_stands=VALUES(bike_stands);
-            """
-
-            # Insert into availability table
-            availability_sql = """
-            INSERT INTO availability (number, available_bikes, available_bike_stands, last_update)
-            VALUES (%s, %s, %s, NOW());
-            """
-
-            for station in stations:
-                station_data = (
-                    station["number"], station["contract_name"], station["name"], station["address"],
-                    station["position"]["lat"], station["position"]["lng"], station["banking"], station["bike_stands"], station["bonus"], station["status"]
-                )
-                availability_data = (
-                    station["number"], station["available_bikes"], station["available_bike_stands"]
-                )
-
-                try:
-                    cursor.execute(station_sql, station_data)
-                    cursor.execute(availability_sql, availability_data)
-                    conn.commit()  # Commit after each station is processed
-                    print(f"Inserted data for station {station['number']}.")
-                except mysql.connector.Error as e:
-                    print(f"Error inserting data for station {station['number']}: {e}")
-
-            time.sleep(5 * 60)  # Wait for 5 minutes before making another request
+# Insert data into station table
+STATION_SQL = """
+INSERT INTO station (number, contract_name, name, address, position_lat, position_lng, banking, bike_stands, bonus, status)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE name=VALUES(name), address=VALUES(address), 
+position_lat=VALUES(position_lat), position_lng=VALUES(position_lng), bike_stands=VALUES(bike_stands)
+"""
+
+# Insert into availability table
+AVAILABILITY_SQL = """
+INSERT INTO availability (number, contract_name, available_bikes, available_bike_stands, last_update)
+VALUES (%s, %s, %s, %s, %s)
+"""
+
+# Station numbers are only unique within a contract, so availability rows
+# record theirs. Databases created before this get the column added.
+CONTRACT_COLUMN_SQL = """
+SELECT COUNT(*) AS found FROM information_schema.columns
+WHERE table_schema = DATABASE() AND table_name = 'availability' AND column_name = 'contract_name'
+"""
+
+def ensure_schema(cursor):
+    cursor.execute(CONTRACT_COLUMN_SQL)
+    if not cursor.fetchone()["found"]:
+        cursor.execute("ALTER TABLE availability ADD COLUMN contract_name VARCHAR(256)")
+        print("Added contract_name to the availability table.")
+
+METADATA_COLUMNS = ("number", "contract_name", "name", "address", "position_lat", "position_lng",
+                    "banking", "bike_stands", "bonus", "status")
+
+def station_values(station):
+    return (
+        station["number"], station["contract_name"], station["name"], station["address"],
+        station["position"]["lat"], station["position"]["lng"], station["banking"], station["bike_stands"], station["bonus"], station["status"]
+    )
+
+def availability_values(station, polled_at):
+    return (station["number"], station["contract_name"], station["available_bikes"], station["available_bike_stands"], polled_at)
+
+def station_key(station):
+    return (station["contract_name"], station["number"])
+
+def metadata_hash(values):
+    """Hash of a station's static columns, the same whether read from the API or the station table"""
+    normalised = tuple(int(v) if isinstance(v, bool) else v for v in values)
+    return hashlib.blake2b(repr(normalised).encode(), digest_size=8).hexdigest()
+
+# Newest availability row of each station. Rows from before contracts were
+# recorded belong to the default contract.
+LATEST_AVAILABILITY_SQL = f"""
+SELECT a.number, COALESCE(a.contract_name, '{NAME}') AS contract_name, a.available_bikes, a.available_bike_stands
+FROM availability a
+JOIN (
+    SELECT number, COALESCE(contract_name, '{NAME}') AS contract_name, MAX(last_update) AS last_update
+    FROM availability GROUP BY number, COALESCE(contract_name, '{NAME}')
+) latest
+ON a.number = latest.number AND COALESCE(a.contract_name, '{NAME}') = latest.contract_name
+AND a.last_update = latest.last_update
+"""
+
+STATION_METADATA_SQL = """
+SELECT number, contract_name, name, address, position_lat, position_lng, banking, bike_stands, bonus, status
+FROM station
+"""
+
+class ChangeTracker:
+    """
+    What was last written for each station, so a poll only writes the
+    stations that changed: availability when JCDecaux's last_update moves,
+    and the station row when its metadata hash changes. State is only
+    recorded once a poll has been committed, so a rolled back poll is
+    written again next time.
+    """
+
+    def __init__(self):
+        self.last_update = {}
+        # Counts from the database, used until a station's last_update is known
+        self.counts = {}
+        self.metadata = {}
+        self.suppressed = 0
+
+    def seed(self, cursor):
+        """Load the last written state of every station from the database"""
+        cursor.execute(STATION_METADATA_SQL)
+        # The station table has no key, so later rows win
+        for row in cursor.fetchall():
+            values = tuple(row[column] for column in METADATA_COLUMNS)
+            self.metadata[station_key(row)] = metadata_hash(values)
+        cursor.execute(LATEST_AVAILABILITY_SQL)
+        for row in cursor.fetchall():
+            self.counts[station_key(row)] = (row["available_bikes"], row["available_bike_stands"])
+        print(f"Change tracker seeded with {len(self.metadata)} stations and {len(self.counts)} availability rows.")
+
+    def availability_changed(self, station):
+        key = station_key(station)
+        if key in self.last_update:
+            return station["last_update"] != self.last_update[key]
+        return (station["available_bikes"], station["available_bike_stands"]) != self.counts.get(key)
+
+    def metadata_changed(self, station):
+        return metadata_hash(station_values(station)) != self.metadata.get(station_key(station))
+
+    def record(self, station_rows, availability_rows):
+        for station in station_rows:
+            self.metadata[station_key(station)] = metadata_hash(station_values(station))
+        for station in availability_rows:
+            key = station_key(station)
+            self.last_update[key] = station["last_update"]
+            self.counts[key] = (station["available_bikes"], station["available_bike_stands"])
+
+    def stats(self):
+        return {'stations': len(self.metadata), 'suppressed': self.suppressed}
+
+def log_ingest(name, rows, started, suppressed=0):
+    """Print how long writing one poll took"""
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"{name}: ingested {rows} rows in {elapsed:.3f}s ({rate:.0f} rows/s), {suppressed} unchanged rows suppressed")
+
+def insert_jcdecaux(conn, cursor, stations, tracker=None, polled_at=None):
+    """
+    Write one poll of stations in a single transaction. Each table gets one
+    executemany, which mysql.connector sends as a multi-row INSERT, so a poll
+    costs two round trips and one commit however many stations there are.
+    With a ChangeTracker only the stations that changed are written.
+    Availability rows are stamped with polled_at (default now), so polls
+    loaded late from the spool keep their own time.
+    Returns the number of rows written.
+    """
+    started = time.perf_counter()
+    polled_at = polled_at or datetime.datetime.now()
+    station_rows, availability_rows = stations, stations
+    if tracker is not None:
+        station_rows = [station for station in stations if tracker.metadata_changed(station)]
+        availability_rows = [station for station in stations if tracker.availability_changed(station)]
+    suppressed = 2 * len(stations) - len(station_rows) - len(availability_rows)
 
-    except Exception as e:
-        print(f"JCDecaux Error: {traceback.format_exc()}")
-    finally:
-        # Close the connection only when the program is done
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-            print("JCDecaux MySQL connection closed.")
-        print("JCDecaux thread stopped.")
-
-# Function to fetch and insert weather data
-def fetch_and_insert_weather():
-    print("Weather thread started.")
     try:
-        # Connect to MySQL
-        conn = mysql.connector.connect(**db_config)
+        if station_rows:
+            cursor.executemany(STATION_SQL, [station_values(station) for station in station_rows])
+        if availability_rows:
+            cursor.executemany(AVAILABILITY_SQL, [availability_values(station, polled_at) for station in availability_rows])
+        conn.commit()
+    except Exception:
+        # Nothing from a failed poll is kept, whether the database or the
+        # poll itself (a station missing a field, say) was at fault
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            # The connection is gone, taking the transaction with it
+            pass
+        raise
+    if tracker is not None:
+        tracker.record(station_rows, availability_rows)
+        tracker.suppressed += suppressed
+    rows = len(station_rows) + len(availability_rows)
+    log_ingest("JCDecaux", rows, started, suppressed)
+    return rows
+
+# Fetch one contract's stations from the JCDecaux API
+def fetch_contract(contract):
+    response = http_client.get(STATIONS_URI, params={"apiKey": JCKEY, "contract": contract})
+    response.raise_for_status()
+    return response.json()
+
+# One JCDecaux poll: every contract fetched concurrently, spooled as one record
+def poll_jcdecaux(spool, engine):
+    polled_at = time.time()
+    results = engine.poll()
+    stations = [station for contract in results for station in results[contract]]
+    print(f"JCDecaux: fetched {len(results)}/{len(engine.contracts)} contracts in {engine.last_duration:.3f}s")
+    if stations:
+        spool.append({"type": "jcdecaux", "polled_at": polled_at, "stations": stations})
+
+# One weather poll
+def poll_weather(spool):
+    # Fetch weather data for Dublin
+    weather_data = fetch_weather_data(DUBLIN_LAT, DUBLIN_LNG)
+    if weather_data:
+        spool.append({"type": "weather", "polled_at": time.time(), "data": weather_data})
+
+# Write one weather poll in a single transaction
+def insert_weather(conn, cursor, weather_data):
+    started = time.perf_counter()
+    # Insert current weather data
+    rows = insert_current_weather(cursor, weather_data)
+    # Insert daily weather data
+    rows += insert_daily_weather(cursor, weather_data)
+    conn.commit()  # Commit after inserting weather data
+    log_ingest("Weather", rows, started)
+    return rows
+
+class DatabaseWriter:
+    """
+    Loads spooled polls into MySQL for the SpoolFlusher. Connects on first
+    use, and again after any database error, which is raised so the
+    flusher backs off and retries the same record later. The change
+    tracker is seeded on the first successful connection.
+    """
+
+    def __init__(self, config=db_config):
+        self.config = config
+        self.conn = None
+        self.cursor = None
+        self.tracker = None
+
+    def connect(self):
+        conn = mysql.connector.connect(**self.config)
         cursor = conn.cursor(dictionary=True)
-
-        while True:
-            # Fetch weather data for Dublin
-            weather_data = fetch_weather_data(DUBLIN_LAT, DUBLIN_LNG)
-            if weather_data:
-                # Insert current weather data
-                insert_current_weather(cursor, weather_data)
-                # Insert daily weather data
-                insert_daily_weather(cursor, weather_data)
-                conn.commit()  # Commit after inserting weather data
-                print("Weather data inserted successfully.")
-
-            time.sleep(60 * 60)  # Wait for 1 hour before making another request
-
-    except Exception as e:
-        print(f"Weather Error: {traceback.format_exc()}")
-    finally:
-        # Close the connection only when the program is done
-        if conn.is_connected():
-            cursor.close()
-            conn.close()
-            print("Weather MySQL connection closed.")
-        print("Weather thread stopped.")
+        ensure_schema(cursor)
+        if self.tracker is None:
+            # Only stations that changed since the last write are inserted
+            tracker = ChangeTracker()
+            tracker.seed(cursor)
+            self.tracker = tracker
+        self.conn, self.cursor = conn, cursor
+        print("MySQL connection opened.")
+
+    def write(self, record):
+        if self.conn is None:
+            self.connect()
+        try:
+            if record["type"] == "jcdecaux":
+                polled_at = datetime.datetime.fromtimestamp(record["polled_at"])
+                insert_jcdecaux(self.conn, self.cursor, record["stations"], self.tracker, polled_at)
+            elif record["type"] == "weather":
+                insert_weather(self.conn, self.cursor, record["data"])
+            else:
+                print(f"Skipping spooled record of unknown type {record['type']}")
+        except mysql.connector.Error:
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.cursor.close()
+                self.conn.close()
+                print("MySQL connection closed.")
+            except mysql.connector.Error:
+                pass
+        self.conn = self.cursor = None
 
 # Function to fetch weather data from OpenWeatherMap API
 def fetch_weather_data(lat, lng):
@@ -130,7 +313,7 @@ def fetch_weather_data(lat, lng):
             "units": "metric",
             "exclude": "minutely,hourly"
         }
-        r = requests.get(OPENWEATHER_URL, params=params)
+        r = http_client.get(OPENWEATHER_URL, params=params)
         r.raise_for_status()
         return r.json()
     except requests.exceptions.RequestException as e:
@@ -142,7 +325,7 @@ def insert_current_weather(cursor, data):
     try:
         if "current" not in data:
             print("No 'current' data found.")
-            return
+            return 0
 
         query = """
         INSERT INTO current (dt, feels_like, humidity, pressure, sunrise, sunset, temp, uvi, weather_id, wind_gust, wind_speed, rain_1h, snow_1h)
@@ -174,15 +357,17 @@ def insert_current_weather(cursor, data):
 
         cursor.execute(query, values)
         print("Inserted current weather data.")
-    except Exception as e:
+        return 1
+    except (KeyError, IndexError, TypeError, ValueError) as e:
         print(f"Error inserting current weather: {e}")
+        return 0
 
 # Function to insert daily weather data
 def insert_daily_weather(cursor, data):
     try:
         if "daily" not in data:
             print("No 'daily' data found.")
-            return
+            return 0
 
         query = """
         INSERT INTO daily (dt, future_dt, humidity, pop, pressure, temp_max, temp_min, uvi, weather_id, wind_speed, wind_gust, rain, snow)
@@ -195,8 +380,9 @@ def insert_daily_weather(cursor, data):
                                 snow=VALUES(snow);
         """
 
-        for day in data["daily"]:
-            values = (
+        # Every forecast day in one multi-row INSERT
+        values = [
+            (
                 datetime.datetime.fromtimestamp(data["current"]["dt"]),
                 datetime.datetime.fromtimestamp(day.get("dt")),
                 day.get("humidity"),
@@ -211,29 +397,71 @@ def insert_daily_weather(cursor, data):
                 day.get("rain", 0),
                 day.get("snow", 0),
             )
-
-            cursor.execute(query, values)
+            for day in data["daily"]
+        ]
+        cursor.executemany(query, values)
 
         print("Inserted daily weather data.")
-    except Exception as e:
+        return len(values)
+    except (KeyError, IndexError, TypeError, ValueError) as e:
         print(f"Error inserting daily weather: {e}")
+        return 0
 
 # Main function to run both scripts
-def main():
-    # Create threads for JCDecaux and Weather scripts
-    jcdecaux_thread = threading.Thread(target=fetch_and_insert_jcdecaux)
-    weather_thread = threading.Thread(target=fetch_and_insert_weather)
-
-    # Start the threads
-    jcdecaux_thread.start()
-    weather_thread.start()
-
-    # Run for 12 hours (43200 seconds)
-    time.sleep(43200)
-
-    # Stop the threads after 12 hours
-    jcdecaux_thread.join()
-    weather_thread.join()
+def main(duration=43200, contracts=CONTRACTS):
+    scheduler = Scheduler()
+    scheduler.stop_on_signals()
+    engine = IngestEngine(fetch_contract, contracts, concurrency=INGEST_CONCURRENCY)
+    try:
+        spool = Spool(SPOOL_DIR, segment_bytes=SPOOL_SEGMENT_BYTES)
+    except SpoolLocked:
+        sys.exit(f"Another scraper or --flush is using {SPOOL_DIR}, not starting.")
+    writer = DatabaseWriter()
+    flusher = SpoolFlusher(spool, writer.write, interval=SPOOL_FLUSH_INTERVAL, retry_on=RETRY_ON)
+
+    # Poll JCDecaux and Weather into the spool, and load the spool into the
+    # database, for `duration` seconds (12 hours by default) or until
+    # interrupted, then let the current polls finish
+    stats = scheduler.run([
+        lambda: scheduler.run_every(JCDECAUX_INTERVAL, lambda: poll_jcdecaux(spool, engine), name="jcdecaux"),
+        lambda: scheduler.run_every(WEATHER_INTERVAL, lambda: poll_weather(spool), name="weather"),
+        lambda: flusher.run(scheduler.stop_event),
+    ], duration)
+
+    # Load the last polls too if the database is up, otherwise they wait in the spool
+    flush(flusher)
+    writer.close()
+    spool.close()
+
+    for name, job in stats.items():
+        print(f"{name}: {job}")
+    for contract, contract_stats in engine.stats()["contracts"].items():
+        print(f"{contract}: {contract_stats}")
+    print(f"spool: {flusher.stats()}")
+
+# Load everything in the spool into the database once
+def flush(flusher):
+    try:
+        print(f"Loaded {flusher.flush_once()} spooled polls.")
+    except Exception as e:
+        print(f"Polls left in the spool at {flusher.spool.directory}: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Collect JCDecaux and weather data into MySQL")
+    parser.add_argument("--duration", type=float, default=43200, help="Seconds to run for, 0 to run until stopped")
+    parser.add_argument("--contracts", default=",".join(CONTRACTS), help="Comma-separated JCDecaux contracts to collect")
+    parser.add_argument("--flush", action="store_true", help="Only load the spool into the database, e.g. after an outage")
+    args = parser.parse_args()
+    if args.flush:
+        try:
+            spool = Spool(SPOOL_DIR, segment_bytes=SPOOL_SEGMENT_BYTES)
+        except SpoolLocked:
+            # The running scraper loads the spool itself
+            sys.exit(f"The scraper is running and loading {SPOOL_DIR} already, not flushing.")
+        writer = DatabaseWriter()
+        flush(SpoolFlusher(spool, writer.write, retry_on=RETRY_ON))
+        writer.close()
+        spool.close()
+    else:
+        main(args.duration or None, [c.strip() for c in args.contracts.split(",") if c.strip()])